@@ -7,14 +7,17 @@ import conf_logging
 import logging
 import models
 from models import Model
+from models import CompactModel
 from datas import Data
+from datas import TideSeries
+import datas
 import math
+import numpy
 from models import ModelError
-import copy 
 
 logger=logging.getLogger(__name__)
 
-def fourier_transform(model:Model,data_list:list[Data]) -> ModelError:
+def fourier_transform(model:Model,data_list:TideSeries|list[Data]|tuple) -> ModelError:
     """
     Uses Fourier transformation to compute amplitudes of model. If any data was already present they are overriden.
     
@@ -23,35 +26,110 @@ def fourier_transform(model:Model,data_list:list[Data]) -> ModelError:
     where w: rotation speed (°/h)
     and N: number of data
 
+    Sums are vectorized by chunks of models.CHUNK_SIZE datas.
+
     :param model: Model to compute (full reset of model's data)
     :type model: Model
-    :param data_list: List of data used to compute the model
-    :type model: list[Data]
+    :param data_list: Datas used to compute the model
+    :type model: TideSeries or list[Data] or tuple(numpy.ndarray,numpy.ndarray) (hours, see datas.as_hours, and heights)
     :return: Error measurement of model
     :rtype: ModelError
     :return: The model error computed with the list of data provided
     :rtype: ModelError
     """
-    N=len(data_list)
-    for i in range(len(model.harmonics)):
-        model.amplitudes_cos[i]=0
-        model.amplitudes_sin[i]=0
-    for data in data_list:
-        dh=models.get_hour(data.t) # time from T0 in hours 
+    series=datas.as_series(data_list)
+    sums=FourierSums(model)
+    sums.add(series)
+    sums.apply(model)
+    return ModelError(model,series)
+
+class FourierSums:
+    """
+    This class accumulates the sums of Fourier transformation of a model (see fourier_transform), so that datas may be given by parts.
+
+    :param speeds: Rotation speeds of harmonics of model (°/h).
+    :type speeds: numpy.ndarray
+    :param sum_cos: Ʃ data(dh) * cos(w(i)*dh) for each harmonic.
+    :type sum_cos: numpy.ndarray
+    :param sum_sin: Ʃ data(dh) * sin(w(i)*dh) for each harmonic.
+    :type sum_sin: numpy.ndarray
+    :param N: Number of datas added.
+    :type N: int
+    """
+
+    def __init__(self,model:Model):
+        """
+        Constructor of empty sums for harmonics of a model.
+
+        :param model: Model whose amplitudes are computed.
+        :type model: Model
+        """
+        self.speeds=numpy.array(model.speeds,dtype=numpy.float64)
+        self.sum_cos=numpy.zeros(len(self.speeds))
+        self.sum_sin=numpy.zeros(len(self.speeds))
+        self.N=0
+
+    def add(self,series:TideSeries):
+        """
+        Adds datas to sums.
+
+        :param series: Datas to add.
+        :type series: TideSeries
+        """
+        for start in range(0,len(series),models.CHUNK_SIZE):
+            dh=series.hours[start:start+models.CHUNK_SIZE] # time from T0 in hours
+            angles=numpy.radians(numpy.outer(dh,self.speeds))
+            heights=series.heights[start:start+models.CHUNK_SIZE]
+            self.sum_cos+=heights@numpy.cos(angles)
+            self.sum_sin+=heights@numpy.sin(angles)
+        self.N+=len(series)
+
+    def apply(self,model:Model):
+        """
+        Sets amplitudes of model from sums.
+
+        :param model: Model to compute (full reset of model's data)
+        :type model: Model
+        """
+        N=self.N
+        if N==0:
+            raise ValueError("No data to compute model")
         for i in range(len(model.harmonics)):
-            angle=math.radians(model.harmonics[i].get_speed()*dh)
-            model.amplitudes_cos[i]+=data.height*math.cos(angle)
-            model.amplitudes_sin[i]+=data.height*math.sin(angle)
-    for i in range(len(model.harmonics)):
-        if model.harmonics[i].get_speed()!=0.0:
-            model.amplitudes_cos[i]=model.amplitudes_cos[i]*2/N
-            model.amplitudes_sin[i]=model.amplitudes_sin[i]*2/N
-        else:
-            model.amplitudes_cos[i]=model.amplitudes_cos[i]/N
-            model.amplitudes_sin[i]=model.amplitudes_sin[i]/N
-    return ModelError(model,data_list)
-
-def tune_harmonic_grid(model:Model,harmonic_index:int,R:float,N:int,data_list:list[Data]) -> Model:
+            if self.speeds[i]!=0.0:
+                model.amplitudes_cos[i]=float(self.sum_cos[i]*2/N)
+                model.amplitudes_sin[i]=float(self.sum_sin[i]*2/N)
+            else:
+                model.amplitudes_cos[i]=float(self.sum_cos[i]/N)
+                model.amplitudes_sin[i]=float(self.sum_sin[i]/N)
+
+def _compact(model:Model|CompactModel) -> CompactModel:
+    """
+    Gives the compact version of a model, whose variants are cheap to derive.
+    """
+    return model if isinstance(model,CompactModel) else model.compact()
+
+def _same_kind(model:Model|CompactModel,tuned:CompactModel) -> Model|CompactModel:
+    """
+    Gives a tuned model of the same kind as the model given to a tuning: CompactModel, or a mutable Model.
+    """
+    return tuned if isinstance(model,CompactModel) else tuned.to_model()
+
+def _harmonic_terms(model:Model|CompactModel,harmonic_index:int,series:TideSeries):
+    """
+    Computes the parts of model's prediction needed to try amplitudes of a single harmonic without evaluating the model again:
+    heights = base + c*cos(w*dh) + s*sin(w*dh)
+    where base: prediction of other harmonics
+
+    :return: base, cos(w*dh) and sin(w*dh) at times of series
+    :rtype: tuple(numpy.ndarray,numpy.ndarray,numpy.ndarray)
+    """
+    angles=numpy.radians(model.speeds[harmonic_index]*series.hours)
+    cos=numpy.cos(angles)
+    sin=numpy.sin(angles)
+    base=model.predict(series.hours)-model.amplitudes_cos[harmonic_index]*cos-model.amplitudes_sin[harmonic_index]*sin
+    return base,cos,sin
+
+def tune_harmonic_grid(model:Model|CompactModel,harmonic_index:int,R:float,N:int,data_list:TideSeries|list[Data]|tuple) -> tuple[Model|CompactModel,ModelError]:
     """
     Fine tunes a single harmonic using grid method in a model using a data list. This tuning is made adjusting slightly both amplitudes (cos and sin) to reduce error.  
 
@@ -61,44 +139,44 @@ def tune_harmonic_grid(model:Model,harmonic_index:int,R:float,N:int,data_list:li
     with d = R/N * sqrt(c0^2 + s0^2)
     and n, m in [-N, -N+1, ..., N-1, N]
 
-    :param model: Model to be tuned
-    :type model: Model
+    :param model: Model to be tuned (not modified)
+    :type model: Model or CompactModel
     :param harmonic_index: Index of sole harmonic in the model that is to be modified
     :type harmonic: int
     :param R: Fraction of module amplitude that will be used as max step for modification of amplitudes
     :type R: float
     :param N: Number of steps explored
     :type N: int
-    :param data_list: Data list to measure error and evaluate the best tuning
-    :type data_list: list[Data]
-    :return: The best model obtained according to above exploration 
-    :rtype: Model
+    :param data_list: Datas to measure error and evaluate the best tuning
+    :type data_list: TideSeries or list[Data] or tuple(numpy.ndarray,numpy.ndarray) (hours, see datas.as_hours, and heights)
+    :return: The best model obtained according to above exploration, of the same kind as model (Model or CompactModel)
+    :rtype: Model or CompactModel
     :return: Error of tuned model
     :rtype: ModelError
     """
-    c0=model.amplitudes_cos[harmonic_index]
-    s0=model.amplitudes_sin[harmonic_index]
+    data_list=datas.as_series(data_list) # converted once for all tunings
+    compact=_compact(model)
+    c0=compact.amplitudes_cos[harmonic_index]
+    s0=compact.amplitudes_sin[harmonic_index]
     d=R/N*math.sqrt(c0**2+s0**2)
-    model_best=copy.copy(model)
-    err_best=ModelError(model_best,data_list)
+    base,cos,sin=_harmonic_terms(compact,harmonic_index,data_list) # candidates are evaluated without trigonometry
+    best=(c0,s0) # candidates are only amplitudes, best model is derived once
+    err_best=ModelError(compact,data_list,base+c0*cos+s0*sin)
 
     for c_step in range(-N,N+1):
         c=c0+c_step*d
         for s_step in range(-N,N+1):
             s=s0+s_step*d
-            model_tune=copy.copy(model)
-            model_tune.amplitudes_cos[harmonic_index]=c
-            model_tune.amplitudes_sin[harmonic_index]=s
-            err_tune=ModelError(model_tune,data_list)
+            err_tune=ModelError(compact,data_list,base+c*cos+s*sin)
             if max(err_tune.max,math.fabs(err_tune.min))<max(err_best.max,math.fabs(err_best.min)):
 #            if err_tune.max<=err_best.max and err_tune.min>=err_best.min:
 #            if err_tune.var<err_best.var:
 #            if err_tune.abs<err_best.abs:
-                model_best=model_tune
+                best=(c,s)
                 err_best=err_tune    
-    return model_best,err_best
+    return _same_kind(model,compact.with_amplitude(harmonic_index,*best)),err_best
 
-def tune_harmonic_amp(model:Model,harmonic_index:int,R:float,N:int,data_list:list[Data]) -> Model:
+def tune_harmonic_amp(model:Model|CompactModel,harmonic_index:int,R:float,N:int,data_list:TideSeries|list[Data]|tuple) -> tuple[Model|CompactModel,ModelError]:
     """
     Fine tunes a single harmonic using amplitude method in a model using a data list. This tuning is made adjusting slightly both amplitudes (cos and sin) to reduce error.  
 
@@ -108,27 +186,28 @@ def tune_harmonic_amp(model:Model,harmonic_index:int,R:float,N:int,data_list:lis
     with d = R/N
     and n in [-N, -N+1, ..., N-1, N]
 
-    :param model: Model to be tuned
-    :type model: Model
+    :param model: Model to be tuned (not modified)
+    :type model: Model or CompactModel
     :param harmonic_index: Index of sole harmonic in the model that is to be modified
     :type harmonic: int
     :param R: Fraction of module amplitude that will be used as max step for modification of amplitudes
     :type R: float
     :param N: Number of steps explored
     :type N: int
-    :param data_list: Data list to measure error and evaluate the best tuning
-    :type data_list: list[Data]
-    :return: The best model obtained according to above exploration 
-    :rtype: Model
+    :param data_list: Datas to measure error and evaluate the best tuning
+    :type data_list: TideSeries or list[Data] or tuple(numpy.ndarray,numpy.ndarray) (hours, see datas.as_hours, and heights)
+    :return: The best model obtained according to above exploration, of the same kind as model (Model or CompactModel)
+    :rtype: Model or CompactModel
     :return: Error of tuned model
     :rtype: ModelError
     """
-    c0=model.amplitudes_cos[harmonic_index]
-    s0=model.amplitudes_sin[harmonic_index]
-    model_best=Model(model.harmonics.copy())
-    model_best.amplitudes_cos=model.amplitudes_cos.copy()
-    model_best.amplitudes_sin=model.amplitudes_sin.copy()
-    err_best=ModelError(model_best,data_list)
+    data_list=datas.as_series(data_list) # converted once for all tunings
+    compact=_compact(model)
+    c0=compact.amplitudes_cos[harmonic_index]
+    s0=compact.amplitudes_sin[harmonic_index]
+    base,cos,sin=_harmonic_terms(compact,harmonic_index,data_list) # candidates are evaluated without trigonometry
+    best=(c0,s0) # candidates are only amplitudes, best model is derived once
+    err_best=ModelError(compact,data_list,base+c0*cos+s0*sin)
 
     for n in range(-N,N+1):
         # -N ≤ n ≤ N
@@ -137,22 +216,17 @@ def tune_harmonic_amp(model:Model,harmonic_index:int,R:float,N:int,data_list:lis
         c=c0*(1+n*R/N)
         # s0(1-R) ≤ s ≤ s0(1+R)
         s=s0*(1+n*R/N)
-        model_tune=Model(model.harmonics.copy())
-        model_tune.amplitudes_cos=model.amplitudes_cos.copy()
-        model_tune.amplitudes_sin=model.amplitudes_sin.copy()
-        model_tune.amplitudes_cos[harmonic_index]=c
-        model_tune.amplitudes_sin[harmonic_index]=s
-        err_tune=ModelError(model_tune,data_list)
+        err_tune=ModelError(compact,data_list,base+c*cos+s*sin)
         if max(err_tune.max,math.fabs(err_tune.min))<max(err_best.max,math.fabs(err_best.min)):
 #        if err_tune.max<=err_best.max and err_tune.min>=err_best.min:
 #        if err_tune.var<err_best.var:
 #        if err_tune.abs<err_best.abs:
-            model_best=model_tune
+            best=(c,s)
             err_best=err_tune
     
-    return model_best,err_best
+    return _same_kind(model,compact.with_amplitude(harmonic_index,*best)),err_best
 
-def tune_harmonic_ang(model:Model,harmonic_index:int,R:float,N:int,data_list:list[Data]) -> Model:
+def tune_harmonic_ang(model:Model|CompactModel,harmonic_index:int,R:float,N:int,data_list:TideSeries|list[Data]|tuple) -> tuple[Model|CompactModel,ModelError]:
     """
     Fine tunes a single harmonic using aangular method in a model using a data list. This tuning is made adjusting slightly angular composition of cos and sin to reduce error.  
 
@@ -165,29 +239,30 @@ def tune_harmonic_ang(model:Model,harmonic_index:int,R:float,N:int,data_list:lis
     with d = R/N
     and n in [-N, -N+1, ..., N-1, N]
 
-    :param model: Model to be tuned
-    :type model: Model
+    :param model: Model to be tuned (not modified)
+    :type model: Model or CompactModel
     :param harmonic_index: Index of sole harmonic in the model that is to be modified
     :type harmonic: int
     :param R: Fraction of PI rad (or 180°) that will be used as max step for modification of amplitudes
     :type R: float
     :param N: Number of steps explored
     :type N: int
-    :param data_list: Data list to measure error and evaluate the best tuning
-    :type data_list: list[Data]
-    :return: The best model obtained according to above exploration 
-    :rtype: Model
+    :param data_list: Datas to measure error and evaluate the best tuning
+    :type data_list: TideSeries or list[Data] or tuple(numpy.ndarray,numpy.ndarray) (hours, see datas.as_hours, and heights)
+    :return: The best model obtained according to above exploration, of the same kind as model (Model or CompactModel)
+    :rtype: Model or CompactModel
     :return: Error of tuned model
     :rtype: ModelError
     """
-    c0=model.amplitudes_cos[harmonic_index]
-    s0=model.amplitudes_sin[harmonic_index]
+    data_list=datas.as_series(data_list) # converted once for all tunings
+    compact=_compact(model)
+    c0=compact.amplitudes_cos[harmonic_index]
+    s0=compact.amplitudes_sin[harmonic_index]
     a0=math.atan2(c0,s0)
     M=math.sqrt(c0**2 + s0**2)
-    model_best=Model(model.harmonics.copy())
-    model_best.amplitudes_cos=model.amplitudes_cos.copy()
-    model_best.amplitudes_sin=model.amplitudes_sin.copy()
-    err_best=ModelError(model_best,data_list)
+    base,cos,sin=_harmonic_terms(compact,harmonic_index,data_list) # candidates are evaluated without trigonometry
+    best=(c0,s0) # candidates are only amplitudes, best model is derived once
+    err_best=ModelError(compact,data_list,base+c0*cos+s0*sin)
 
     for n in range(-N,N+1):
         # -N ≤ n ≤ N
@@ -197,17 +272,12 @@ def tune_harmonic_ang(model:Model,harmonic_index:int,R:float,N:int,data_list:lis
         a=a0+math.pi*(1+n*R/N)
         c=M*math.cos(a)
         s=M*math.sin(a)
-        model_tune=Model(model.harmonics.copy())
-        model_tune.amplitudes_cos=model.amplitudes_cos.copy()
-        model_tune.amplitudes_sin=model.amplitudes_sin.copy()
-        model_tune.amplitudes_cos[harmonic_index]=c
-        model_tune.amplitudes_sin[harmonic_index]=s
-        err_tune=ModelError(model_tune,data_list)
+        err_tune=ModelError(compact,data_list,base+c*cos+s*sin)
         if max(err_tune.max,math.fabs(err_tune.min))<max(err_best.max,math.fabs(err_best.min)):
 #        if err_tune.max<=err_best.max and err_tune.min>=err_best.min:
 #        if err_tune.var<err_best.var:
 #        if err_tune.abs<err_best.abs:
-            model_best=model_tune
+            best=(c,s)
             err_best=err_tune
     
-    return model_best,err_best
+    return _same_kind(model,compact.with_amplitude(harmonic_index,*best)),err_best
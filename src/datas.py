@@ -9,6 +9,17 @@ from datetime import datetime
 from pathlib import Path
 import re
 import datetime
+import numpy
+import harmonics as H
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import math
+import gzip
+import bz2
+import lzma
+import zipfile
 
 logger=logging.getLogger(__name__)
 
@@ -41,32 +52,930 @@ class Data:
             return self.t==other.t and self.height==other.height
         return NotImplemented
 
+HOUR_TOLERANCE=0.5/3600
+"Tolerance (h) of time lookups: times are known at the second."
 
+FLAG_UNKNOWN=0
+"Quality flag of datas whose quality is unknown (ex: not read from a REFMAR file)."
+FLAG_VALIDATED=3
+"REFMAR quality flag of validated datas (delayed mode)."
+FLAG_FILLED=255
+"Quality flag of synthetic datas filling gaps (not a REFMAR code)."
 
+class TideSeries:
+    """
+    This class holds a series of datas in columns: times as hours elapsed from H.T0 and tide's heights.  
+    Data objects are not stored, they are only created on demand when series is iterated or indexed.
+
+    :param hours: Times of datas as number of hours (decimal) elapsed from H.T0.
+    :type hours: numpy.ndarray[float64]
+    :param heights: Tide's heights (m), same order as hours.
+    :type heights: numpy.ndarray[float64]
+    :param meta: Optional metadata of series (ex: source files).
+    :type meta: dict
+    :param ordered: True if datas are in time order. Lookups by time (slice, index, at, nearest) need it.
+    :type ordered: bool
+    :param flags: Quality flags (REFMAR codes) of datas, same order as hours.
+    :type flags: numpy.ndarray[uint8]
+    """
+
+    def __init__(self,hours,heights,meta:dict=None,ordered:bool=None,flags=None):
+        """
+        Constructor.
+
+        :param hours: Times of datas as number of hours (decimal) elapsed from H.T0.
+        :type hours: array like of float
+        :param heights: Tide's heights (m), same order as hours.
+        :type heights: array like of float
+        :param meta: Optional metadata of series (ex: source files).
+        :type meta: dict
+        :param ordered: True if datas are known to be in time order, None to check it.
+        :type ordered: bool
+        :param flags: Quality flags of datas, same order as hours. Default FLAG_UNKNOWN for all datas.
+        :type flags: array like of int
+        """
+        self.hours=numpy.asarray(hours,dtype=numpy.float64)
+        self.heights=numpy.asarray(heights,dtype=numpy.float64)
+        if flags is None:
+            flags=numpy.full(self.hours.shape,FLAG_UNKNOWN,dtype=numpy.uint8)
+        self.flags=numpy.asarray(flags,dtype=numpy.uint8)
+        if self.hours.shape!=self.heights.shape or self.hours.shape!=self.flags.shape:
+            raise ValueError(f"Columns length differ: hours={self.hours.shape}, heights={self.heights.shape}, flags={self.flags.shape}")
+        self.meta={} if meta is None else meta
+        if ordered is None:
+            ordered=not numpy.any(self.hours[1:]<self.hours[:-1])
+        self.ordered=ordered
+
+    @classmethod
+    def from_list(cls,data_list:list[Data]):
+        """
+        Builds a series from a list of Data.
+
+        :param data_list: List of data to convert.
+        :type data_list: list[Data]
+        :return: The series holding the same datas.
+        :rtype: TideSeries
+        """
+        hours=numpy.fromiter((get_hour(d.t) for d in data_list),dtype=numpy.float64,count=len(data_list))
+        heights=numpy.fromiter((d.height for d in data_list),dtype=numpy.float64,count=len(data_list))
+        return cls(hours,heights)
+
+    def to_list(self) -> list[Data]:
+        """
+        Materializes the series as a list of Data. Costly for big series, prefer columns.
+
+        :return: List of Data.
+        :rtype: list[Data]
+        """
+        return list(self)
+
+    def __len__(self):
+        return len(self.hours)
+
+    def is_sorted(self) -> bool:
+        """
+        Tells if datas are in time order. Series given by reader are always sorted.
+
+        :return: True if sorted.
+        :rtype: bool
+        """
+        return self.ordered
+
+    def _check_sorted(self):
+        """
+        Raises ValueError if series is not in time order, as lookups by binary search would give wrong results.
+        """
+        if not self.ordered:
+            raise ValueError("Series is not in time order, use sort() before lookups by time")
+
+    def sort(self):
+        """
+        Gives the series in time order (stable sort). Series itself if already sorted.
+
+        :return: The sorted series.
+        :rtype: TideSeries
+        """
+        if self.is_sorted():
+            return self
+        return self.take(numpy.argsort(self.hours,kind='stable'),ordered=True)
+
+    def take(self,key,ordered:bool=None):
+        """
+        Gives the series of datas selected by an index array, a mask or a slice (which gives views).
+
+        :param key: Selection of datas.
+        :type key: numpy.ndarray or slice
+        :param ordered: True if selection is known to be in time order, None to check it.
+        :type ordered: bool
+        :return: The series of selected datas.
+        :rtype: TideSeries
+        """
+        return TideSeries(self.hours[key],self.heights[key],self.meta,ordered=ordered,flags=self.flags[key])
+
+    def select(self,qualities):
+        """
+        Gives datas whose quality flag is among accepted ones.
+
+        :param qualities: Accepted quality flags (ex: (3,) for validated datas). None: all datas.
+        :type qualities: list[int]
+        :return: The series of accepted datas.
+        :rtype: TideSeries
+        """
+        if qualities is None:
+            return self
+        keep=numpy.isin(self.flags,qualities)
+        if keep.all():
+            return self # no copy (columns may be memory mapped)
+        return self.take(keep,ordered=self.ordered or None)
+
+    def slice(self,t_start,t_end):
+        """
+        Gives datas from t_start (included) to t_end (excluded), using binary search. Series MUST be sorted (ValueError otherwise). The result is a view (no copy).
+
+        :param t_start: Start of slice.
+        :type t_start: datetime or float (hours from H.T0)
+        :param t_end: End of slice.
+        :type t_end: datetime or float (hours from H.T0)
+        :return: Datas of the slice.
+        :rtype: TideSeries
+        """
+        self._check_sorted()
+        lo=int(numpy.searchsorted(self.hours,as_hour(t_start),side='left'))
+        hi=max(lo,int(numpy.searchsorted(self.hours,as_hour(t_end),side='left')))
+        return self[lo:hi]
+
+    def index(self,t) -> int:
+        """
+        Gives the index of data at time t, using binary search. Series MUST be sorted (ValueError otherwise). Times match at the second.
+
+        :param t: Time of the data.
+        :type t: datetime or float (hours from H.T0)
+        :return: Index of the data, -1 if no data at that time.
+        :rtype: int
+        """
+        self._check_sorted()
+        hour=as_hour(t)
+        i=int(numpy.searchsorted(self.hours,hour-HOUR_TOLERANCE,side='left'))
+        if i<len(self.hours) and self.hours[i]<=hour+HOUR_TOLERANCE:
+            return i
+        return -1
+
+    def at(self,t) -> Data:
+        """
+        Gives data at time t, using binary search. Series MUST be sorted (ValueError otherwise). Times match at the second.
+
+        :param t: Time of the data.
+        :type t: datetime or float (hours from H.T0)
+        :return: The data, None if no data at that time.
+        :rtype: Data
+        """
+        i=self.index(t)
+        if i<0:
+            return None
+        return self[i]
+
+    def nearest(self,t) -> Data:
+        """
+        Gives data which time is the nearest to t, using binary search. Series MUST be sorted (ValueError otherwise).
+
+        :param t: Time of the data.
+        :type t: datetime or float (hours from H.T0)
+        :return: The nearest data.
+        :rtype: Data
+        """
+        if len(self.hours)==0:
+            raise ValueError("No data in empty series")
+        self._check_sorted()
+        hour=as_hour(t)
+        i=int(numpy.searchsorted(self.hours,hour,side='left'))
+        if i==len(self.hours) or (i>0 and hour-self.hours[i-1]<=self.hours[i]-hour):
+            i-=1
+        return self[i]
+
+    def __iter__(self):
+        for i in range(len(self.hours)):
+            yield Data(get_time(self.hours[i]),float(self.heights[i]))
+
+    def __getitem__(self,key):
+        if isinstance(key,slice):
+            # Slices of numpy arrays are views: no copy of datas.
+            ordered=self.ordered if key.step is None or key.step>0 else None
+            return self.take(key,ordered=ordered)
+        return Data(get_time(self.hours[key]),float(self.heights[key]))
+
+    def __contains__(self,data):
+        if not isinstance(data,Data):
+            return False
+        return bool(numpy.any((self.hours==get_hour(data.t)) & (self.heights==data.height)))
+
+    def __eq__(self,other):
+        if isinstance(other,TideSeries):
+            return numpy.array_equal(self.hours,other.hours) and numpy.array_equal(self.heights,other.heights) and numpy.array_equal(self.flags,other.flags)
+        return NotImplemented
+
+    def __str__(self):
+        if len(self)==0:
+            return "TideSeries(empty)"
+        return f"TideSeries({len(self)} datas from {get_time(self.hours[0])} to {get_time(self.hours[-1])})"
+
+def get_hour(t:datetime) -> float:
+    """
+    Computes the number of hours (float) elapsed from H.T0 (seconds resolution).
+
+    :param t: Time to convert to time relative to T0.
+    :type datetime: MUST be aware (oposite to naive).
+    :return: Number of hours (decimal) eplapsed from T0 to t.
+    :rtype: float.
+    """
+    if t.tzinfo is None:
+        raise ValueError("t is not datetime aware")
+    # dt=(t-H.T0) is timedelta
+    # dh=dt.days*24+dt.seconds/3600 is hours (float) from H.T0.
+    dt=t-H.T0
+    dh=dt.days*24+dt.seconds/3600
+    return dh
+
+def get_time(hour:float) -> datetime:
+    """
+    Computes the date time (UTC) matching a number of hours elapsed from H.T0. Resolution is the second, as for get_hour.
+
+    :param hour: Number of hours (decimal) eplapsed from T0.
+    :type hour: float
+    :return: The aware date time.
+    :rtype: datetime
+    """
+    return H.T0+datetime.timedelta(seconds=round(float(hour)*3600))
+
+def as_hour(t) -> float:
+    """
+    Gives the number of hours elapsed from H.T0 of a time given either as an aware date time or already as a number of hours.
+
+    :param t: Time to convert.
+    :type t: datetime or float
+    :return: Number of hours (decimal) eplapsed from T0 to t.
+    :rtype: float
+    """
+    if isinstance(t,datetime.datetime):
+        return get_hour(t)
+    return float(t)
+
+_T0_SECOND=numpy.datetime64(H.T0.replace(tzinfo=None),'s')
+"H.T0 as numpy date time (UTC)."
+_POSIX_T0=round((datetime.datetime(1970,1,1,tzinfo=datetime.timezone.utc)-H.T0).total_seconds())
+"Seconds elapsed from H.T0 to POSIX epoch."
+
+def get_hours(times) -> numpy.ndarray:
+    """
+    Computes the number of hours elapsed from H.T0 of many times at once (batch version of get_hour, same values).
+
+    :param times: Times to convert: numpy array of datetime64 (UTC), or list of aware date times.
+    :type times: numpy.ndarray[datetime64] or list[datetime]
+    :return: Number of hours (decimal) eplapsed from T0 to each time.
+    :rtype: numpy.ndarray[float64]
+    """
+    if isinstance(times,numpy.ndarray) and numpy.issubdtype(times.dtype,numpy.datetime64):
+        return _to_hours((times.astype('datetime64[s]')-_T0_SECOND).astype(numpy.int64))
+    return numpy.fromiter((get_hour(t) for t in times),dtype=numpy.float64,count=len(times))
+
+def get_hours_posix(seconds) -> numpy.ndarray:
+    """
+    Computes the number of hours elapsed from H.T0 of POSIX times (seconds elapsed from 1970-01-01 UTC), same values as get_hour.
+
+    :param seconds: POSIX times.
+    :type seconds: array like of float
+    :return: Number of hours (decimal) eplapsed from T0 to each time.
+    :rtype: numpy.ndarray[float64]
+    """
+    return _to_hours(numpy.floor(numpy.asarray(seconds,dtype=numpy.float64)).astype(numpy.int64)+_POSIX_T0)
+
+def as_hours(times) -> numpy.ndarray:
+    """
+    Gives hours elapsed from H.T0 of times given in any form, so that conversion is done once for all computations.
+
+    :param times: Times: hours already computed, series, list of Data, numpy datetime64 array or list of aware date times.
+    :type times: numpy.ndarray[float64] or TideSeries or list[Data] or numpy.ndarray[datetime64] or list[datetime]
+    :return: Number of hours (decimal) eplapsed from T0 to each time.
+    :rtype: numpy.ndarray[float64]
+    """
+    if isinstance(times,TideSeries):
+        return times.hours
+    if isinstance(times,numpy.ndarray):
+        if numpy.issubdtype(times.dtype,numpy.datetime64):
+            return get_hours(times)
+        return numpy.asarray(times,dtype=numpy.float64)
+    if len(times)>0 and isinstance(times[0],Data):
+        return get_hours([d.t for d in times])
+    if len(times)>0 and isinstance(times[0],datetime.datetime):
+        return get_hours(times)
+    return numpy.asarray(times,dtype=numpy.float64)
+
+def as_series(datas) -> TideSeries:
+    """
+    Gives a TideSeries view of datas, either already a series, a list of Data, or a pair of hours (see as_hours) and heights.
+
+    :param datas: Datas to view as series.
+    :type datas: TideSeries or list[Data] or tuple(numpy.ndarray,numpy.ndarray)
+    :return: The series.
+    :rtype: TideSeries
+    """
+    if isinstance(datas,TideSeries):
+        return datas
+    if isinstance(datas,tuple):
+        hours,heights=datas
+        return TideSeries(as_hours(hours),heights)
+    return TideSeries.from_list(datas)
 
+def concatenate(series_list:list[TideSeries],meta:dict=None) -> TideSeries:
+    """
+    Concatenates series in the order given.
+
+    :param series_list: Series to concatenate.
+    :type series_list: list[TideSeries]
+    :param meta: Optional metadata of the resulting series.
+    :type meta: dict
+    :return: The series holding all datas.
+    :rtype: TideSeries
+    """
+    if len(series_list)==0:
+        return TideSeries([],[],meta)
+    hours=numpy.concatenate([s.hours for s in series_list])
+    heights=numpy.concatenate([s.heights for s in series_list])
+    flags=numpy.concatenate([s.flags for s in series_list])
+    return TideSeries(hours,heights,meta,flags=flags)
 
 from zoneinfo import ZoneInfo
 RE_COMMENT_PATTERN=re.compile(r'\s*#.*')
-RE_DATA_PATTERN=re.compile(r'\s*([0-9]{2}/[0-9]{2}/[0-9]{4} [0-9]{2}:[0-9]{2}:[0-9]{2});([0-9\.]+);3\s*')
-def reader(files:list[Path],tzinfo="UTC"):
-    data_list=[]
-    for file in files:
-        logger.debug(file)
-        with open(file, 'r') as f:
-            logger.info(f"Read {file}")
-            for line in f:
-                line=line.strip()
-                m=RE_DATA_PATTERN.fullmatch(line)
-                if m:
-                    t=datetime.datetime.strptime(m.group(1),"%d/%m/%Y %H:%M:%S")
-                    t=t.replace(tzinfo=ZoneInfo(tzinfo))
-                    height=float(m.group(2))
-                    logger.debug(f"DATA: {t.strftime("%d/%m/%Y %H:%M:%S [%z]")}: {height}")
-                    data_list.append(Data(t,height))
-                else:
-                    m=RE_COMMENT_PATTERN.fullmatch(line)
-                    if m:
-                        logger.debug(f"COMMENT: {line}")
-                    else:
-                        logger.warn(f"ERROR: '{line}'")    
-    return data_list
\ No newline at end of file
+RE_DATA_PATTERN=re.compile(r'\s*([0-9]{2}/[0-9]{2}/[0-9]{4} [0-9]{2}:[0-9]{2}:[0-9]{2});([0-9\.]+);([0-9])\s*')
+
+BLOCK_SIZE=4*1024*1024
+"Number of bytes read at once from a file by the bulk parser. Parsing a block needs about 6 times its size of temporary memory (about 25 MB per process)."
+
+_DATE_SEPARATORS=numpy.array([2,5,10,13,16,19])
+"Positions of separators in the fixed width time stamp 'dd/mm/YYYY HH:MM:SS;'."
+_DATE_SEPARATORS_VALUES=numpy.frombuffer(b"// ::;",dtype=numpy.uint8)
+"Separators expected at _DATE_SEPARATORS positions."
+_HEIGHT_MAX_WIDTH=15
+"Height fields wider than this are left to the regex parser (int64 mantissa must not overflow)."
+CACHE_DIR=Path(os.environ.get("TIDES_CACHE_DIR") or Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "tides")
+"Default directory of the cache of parsed files (None: no cache): $TIDES_CACHE_DIR, else tides in user's cache directory ($XDG_CACHE_HOME, default ~/.cache)."
+CACHE_VERSION=3
+"Version of cache entries, to be increased each time parsed content changes."
+_CACHE_COLUMNS=("hours","heights","flags")
+"Columns of series saved in a cache entry, one .npy file each."
+
+_EPOCH_DAY=numpy.datetime64(H.T0.replace(tzinfo=None),'D')
+"Day of H.T0 as numpy day."
+
+def _parse_line(line:str,tzinfo="UTC"):
+    """
+    Parses a single line using regular expressions. Slow path of the parser, used for lines the bulk parser does not recognize.
+
+    :param line: Line to parse.
+    :type line: str
+    :param tzinfo: Time zone of the time in line.
+    :type tzinfo: str
+    :return: Hour (from H.T0), height and quality flag of the data, None if line is not a data.
+    :rtype: tuple(float,float,int)
+    """
+    line=line.strip()
+    m=RE_DATA_PATTERN.fullmatch(line)
+    if m:
+        try:
+            t=datetime.datetime.strptime(m.group(1),"%d/%m/%Y %H:%M:%S")
+            t=t.replace(tzinfo=ZoneInfo(tzinfo))
+            return get_hour(t),float(m.group(2)),int(m.group(3))
+        except ValueError as e:
+            # Invalid date (ex: 31/02) or height (ex: 7.6.2): line is rejected, not the whole file.
+            logger.warn(f"ERROR: '{line}' ({e})")
+            return None
+    m=RE_COMMENT_PATTERN.fullmatch(line)
+    if m:
+        logger.debug(f"COMMENT: {line}")
+    else:
+        logger.warn(f"ERROR: '{line}'")
+    return None
+
+def _utc_offsets(seconds,tzinfo="UTC"):
+    """
+    Computes UTC offsets of local times. Offsets are computed once per day, and per quarter of hour only for days where offset changes.
+
+    :param seconds: Local times as seconds elapsed from H.T0 (wall clock).
+    :type seconds: numpy.ndarray[int64]
+    :param tzinfo: Time zone of local times.
+    :type tzinfo: str
+    :return: UTC offsets (s) of local times.
+    :rtype: numpy.ndarray[int64]
+    """
+    if tzinfo=="UTC" or len(seconds)==0:
+        return numpy.zeros(len(seconds),dtype=numpy.int64)
+    zone=ZoneInfo(tzinfo)
+    t0=H.T0.replace(tzinfo=None)
+    def offset(s):
+        return int((t0+datetime.timedelta(seconds=int(s))).replace(tzinfo=zone).utcoffset().total_seconds())
+    days,days_index=numpy.unique(seconds//86400,return_inverse=True)
+    first=numpy.array([offset(d*86400) for d in days],dtype=numpy.int64)
+    last=numpy.array([offset(d*86400+86399) for d in days],dtype=numpy.int64)
+    offsets=first[days_index]
+    changing=(first!=last)[days_index]
+    if numpy.any(changing):
+        quarters,quarters_index=numpy.unique(seconds[changing]//900,return_inverse=True)
+        offsets[changing]=numpy.array([offset(q*900) for q in quarters],dtype=numpy.int64)[quarters_index]
+    return offsets
+
+def _to_hours(seconds):
+    """
+    Converts seconds elapsed from H.T0 to hours with the same computation as get_hour, so that both give identical values.
+    """
+    return (seconds//86400)*24+(seconds%86400)/3600
+
+def _select(seconds,t_start=None,t_end=None,step=None):
+    """
+    Gives the mask of times kept by a time window and a sampling interval.
+
+    :param seconds: Times as seconds elapsed from H.T0 (UTC).
+    :type seconds: numpy.ndarray[int64]
+    :param t_start: Start of window (included), None: no start.
+    :type t_start: datetime or float (hours from H.T0)
+    :param t_end: End of window (excluded), None: no end.
+    :type t_end: datetime or float (hours from H.T0)
+    :param step: Sampling interval, times kept are multiples of step from H.T0 (so aligned on midnight UTC for divisors of a day). None: all times.
+    :type step: timedelta or float (hours)
+    :return: Mask of kept times.
+    :rtype: numpy.ndarray[bool]
+    """
+    keep=numpy.ones(len(seconds),dtype=bool)
+    if t_start is not None:
+        keep&=seconds>=round(as_hour(t_start)*3600)
+    if t_end is not None:
+        keep&=seconds<round(as_hour(t_end)*3600)
+    if step is not None:
+        step_seconds=round(step.total_seconds()) if isinstance(step,datetime.timedelta) else round(step*3600)
+        if step_seconds<=0:
+            raise ValueError(f"Sampling interval must be positive: {step}")
+        keep&=seconds%step_seconds==0
+    return keep
+
+def parse(buffer:bytes,tzinfo="UTC",t_start=None,t_end=None,step=None,qualities=None) -> TideSeries:
+    """
+    Parses a buffer of REFMAR lines (format: dd/mm/YYYY HH:MM:SS;height;flag).
+
+    Lines are decoded all at once using numpy on the fixed width time stamps, instead of regular expressions and strptime for each line.
+    Lines that do not match the exact layout (comments, errors, extra spaces...) are passed to the regular expressions parser which logs them as before.
+    Time window, sampling interval and accepted quality flags are applied as soon as time stamps are decoded: heights of excluded lines are never decoded.
+
+    :param buffer: Whole lines of a REFMAR file.
+    :type buffer: bytes
+    :param tzinfo: Time zone of the times in buffer.
+    :type tzinfo: str
+    :param t_start: Start of window (included), None: no start.
+    :type t_start: datetime or float (hours from H.T0)
+    :param t_end: End of window (excluded), None: no end.
+    :type t_end: datetime or float (hours from H.T0)
+    :param step: Sampling interval, only times multiple of step from H.T0 are kept. None: all times.
+    :type step: timedelta or float (hours)
+    :param qualities: Accepted quality flags (ex: (3,) for validated datas). None: all datas.
+    :type qualities: list[int]
+    :return: The series of datas read, in the order of lines.
+    :rtype: TideSeries
+    """
+    accepted=numpy.ones(10,dtype=bool) if qualities is None else numpy.isin(numpy.arange(10),qualities)
+    buf=numpy.frombuffer(buffer,dtype=numpy.uint8)
+    ends=numpy.flatnonzero(buf==ord('\n'))
+    if len(buf)>0 and buf[-1]!=ord('\n'):
+        ends=numpy.append(ends,len(buf))
+    starts=numpy.concatenate(([0],ends[:-1]+1)).astype(numpy.int64)
+    stops=ends.copy()
+    # Ignore '\r' of Windows end of lines
+    cr=stops>starts
+    cr[cr]=buf[stops[cr]-1]==ord('\r')
+    stops[cr]-=1
+
+    # Candidates for fast path: 'dd/mm/YYYY HH:MM:SS;' + height + ';' + one digit flag
+    width=stops-starts-22
+    fast=(width>=1) & (width<=_HEIGHT_MAX_WIDTH)
+    fast[fast]=(buf[stops[fast]-2]==ord(';')) & (buf[stops[fast]-1]-numpy.uint8(ord('0'))<=9)
+    index=numpy.flatnonzero(fast)
+    first=starts[index]
+    flags=buf[stops[index]-1]-numpy.uint8(ord('0'))
+    # Columns are gathered one at a time as uint8, so temporaries stay a few bytes per line.
+    ok=numpy.ones(len(index),dtype=bool)
+    for position,separator in zip(_DATE_SEPARATORS,_DATE_SEPARATORS_VALUES):
+        ok&=buf[first+position]==separator
+    def number(positions):
+        value=numpy.zeros(len(index),dtype=numpy.int32)
+        for position in positions:
+            digit=buf[first+position]-numpy.uint8(ord('0')) # uint8: characters below '0' wrap above 9
+            numpy.logical_and(ok,digit<=9,out=ok)
+            value=value*10+digit
+        return value
+    day=number([0,1])
+    month=number([3,4])
+    year=number([6,7,8,9])
+    hour=number([11,12])
+    minute=number([14,15])
+    second=number([17,18])
+    ok&=(month>=1) & (month<=12) & (day>=1) & (hour<=23) & (minute<=59) & (second<=59) & (year>=1)
+    months=((year-1970)*12+month-1).astype('datetime64[M]')
+    ok&=day<=((months+numpy.timedelta64(1,'M')).astype('datetime64[D]')-months.astype('datetime64[D]')).astype(numpy.int64)
+
+    days=(months.astype('datetime64[D]')-_EPOCH_DAY).astype(numpy.int64)+day-1
+    seconds=days*86400+hour*3600+minute*60+second
+    seconds[ok]-=_utc_offsets(seconds[ok],tzinfo)
+    # Lines with a valid time stamp outside the selection are dropped here, before heights are decoded.
+    keep=_select(seconds,t_start,t_end,step) & accepted[flags]
+    excluded=index[ok & ~keep]
+    selected=ok & keep
+    index=index[selected]
+    first=first[selected]
+    seconds=seconds[selected]
+    flags=flags[selected]
+    ok=numpy.ones(len(index),dtype=bool)
+
+    # Height: digits with at most one dot, converted as integer mantissa / 10^decimals which is exactly float(text).
+    w=width[index]
+    mantissa=numpy.zeros(len(index),dtype=numpy.int64)
+    decimals=numpy.zeros(len(index),dtype=numpy.int32)
+    dots=numpy.zeros(len(index),dtype=numpy.int32)
+    count=numpy.zeros(len(index),dtype=numpy.int32)
+    for column in range(int(w.max()) if len(w)>0 else 0):
+        inside=column<w
+        char=buf[numpy.minimum(first+20+column,len(buf)-1)]
+        dot=inside & (char==ord('.'))
+        digit=inside & ~dot
+        value=char-numpy.uint8(ord('0'))
+        ok&=~digit | (value<=9)
+        mantissa=numpy.where(digit,mantissa*10+value,mantissa)
+        decimals+=digit & (dots>0)
+        dots+=dot
+        count+=digit
+    ok&=(dots<=1) & (count>=1)
+    heights=(mantissa/10.0**decimals)[ok]
+    hours=_to_hours(seconds[ok])
+    flags=flags[ok]
+    lines=index[ok]
+
+    # Slow path for all other lines
+    slow=numpy.ones(len(starts),dtype=bool)
+    slow[lines]=False
+    slow[excluded]=False
+    slow_lines=[]
+    slow_hours=[]
+    slow_heights=[]
+    slow_flags=[]
+    for i in numpy.flatnonzero(slow):
+        line=bytes(buf[starts[i]:stops[i]]).decode('utf-8',errors='replace')
+        parsed=_parse_line(line,tzinfo)
+        if parsed is not None and accepted[parsed[2]] and _select(numpy.array([round(parsed[0]*3600)]),t_start,t_end,step)[0]:
+            slow_lines.append(i)
+            slow_hours.append(parsed[0])
+            slow_heights.append(parsed[1])
+            slow_flags.append(parsed[2])
+    if len(slow_lines)>0:
+        order=numpy.argsort(numpy.concatenate((lines,slow_lines)),kind='stable')
+        hours=numpy.concatenate((hours,slow_hours))[order]
+        heights=numpy.concatenate((heights,slow_heights))[order]
+        flags=numpy.concatenate((flags,slow_flags))[order]
+    return TideSeries(hours,heights,flags=flags)
+
+def _read_blocks(f,block_size:int=BLOCK_SIZE):
+    """
+    Reads a binary file by blocks of whole lines.
+
+    :param f: File opened in binary mode.
+    :type f: BinaryIO
+    :param block_size: Approximative size of blocks (bytes).
+    :type block_size: int
+    :return: Generator of blocks, each ending with an end of line (except last one if file does not).
+    :rtype: Generator[bytes]
+    """
+    remainder=b""
+    while True:
+        block=f.read(block_size)
+        if not block:
+            break
+        block=remainder+block
+        last=block.rfind(b"\n")
+        if last<0:
+            remainder=block
+            continue
+        remainder=block[last+1:]
+        yield block[:last+1]
+    if remainder:
+        yield remainder
+
+_DECOMPRESSORS={".gz":gzip.open,".bz2":bz2.open,".xz":lzma.open}
+"Openers of compressed files by suffix. Content is decompressed while it is read."
+
+def is_compressed(file:Path) -> bool:
+    """
+    Tells if a file is compressed or a zip archive (according to its suffix).
+    """
+    suffix=Path(file).suffix.lower()
+    return suffix in _DECOMPRESSORS or suffix==".zip"
+
+def _open_streams(file:Path):
+    """
+    Opens the streams of datas of a file: the file itself, its decompressed content (.gz, .bz2, .xz) or each member of a zip archive (.zip).
+    Decompression is done by chunks while blocks are read, nothing is written on disk.
+
+    :param file: REFMAR file, compressed file or zip archive.
+    :type file: Path
+    :return: Generator of name and binary stream of each content, stream is closed when next one is asked.
+    :rtype: Generator[tuple(str,BinaryIO)]
+    """
+    suffix=Path(file).suffix.lower()
+    if suffix==".zip":
+        with zipfile.ZipFile(file) as archive:
+            for member in archive.infolist():
+                if not member.is_dir():
+                    with archive.open(member) as f:
+                        yield f"{file}:{member.filename}",f
+    else:
+        with _DECOMPRESSORS.get(suffix,open)(file,'rb') as f:
+            yield str(file),f
+
+def _cache_file(file:Path,tzinfo,cache_dir:Path) -> Path:
+    """
+    Gives the cache entry of a file. Entry name is made of a hash of file's path and time zone, followed by a hash of file's size, modification time and cache version.
+    So any modification of the source file gives another entry, and entries of the same source read in other time zones are kept aside.
+    Each column of the entry is a file: <entry>.<column>.npy
+
+    :param file: Source file.
+    :type file: Path
+    :param tzinfo: Time zone of the times in file.
+    :type tzinfo: str
+    :param cache_dir: Directory of cache.
+    :type cache_dir: Path
+    :return: Cache entry of the file (without column and suffix).
+    :rtype: Path
+    """
+    stat=os.stat(file)
+    source=hashlib.sha1(f"{Path(file).resolve()}|{tzinfo}".encode()).hexdigest()[:16]
+    key=hashlib.sha1(f"{stat.st_size}|{stat.st_mtime_ns}|{CACHE_VERSION}".encode()).hexdigest()[:16]
+    return Path(cache_dir) / f"{source}-{key}"
+
+def _column_file(cache:Path,column:str) -> Path:
+    return cache.with_name(f"{cache.name}.{column}.npy")
+
+def _load_cache(cache:Path,meta:dict) -> TideSeries:
+    """
+    Loads a cache entry (memory mapped columns).
+
+    :param cache: Cache entry.
+    :type cache: Path
+    :param meta: Metadata of the series.
+    :type meta: dict
+    :return: The series, None if entry does not exist.
+    :rtype: TideSeries
+    """
+    files=[_column_file(cache,column) for column in _CACHE_COLUMNS]
+    if not all(f.is_file() for f in files):
+        return None
+    columns={column:numpy.load(f,mmap_mode='r') for column,f in zip(_CACHE_COLUMNS,files)}
+    return TideSeries(meta=meta,**columns)
+
+def _save_cache(series:TideSeries,cache:Path):
+    """
+    Saves a series in a cache entry, and removes older entries of the same source and time zone.
+
+    :param series: Series parsed from source file.
+    :type series: TideSeries
+    :param cache: Cache entry.
+    :type cache: Path
+    """
+    cache.parent.mkdir(parents=True,exist_ok=True)
+    # Write then rename, so a concurrent reader never sees a partial column.
+    for column in _CACHE_COLUMNS:
+        tmp=cache.with_name(f"{cache.name}.{column}.{os.getpid()}.tmp")
+        with open(tmp,'wb') as f:
+            numpy.save(f,getattr(series,column))
+        os.replace(tmp,_column_file(cache,column))
+    source=cache.name.split('-')[0]
+    for old in cache.parent.glob(f"{source}-*.npy"):
+        if not old.name.startswith(f"{cache.name}."):
+            logger.debug(f"Remove stale cache {old}")
+            old.unlink(missing_ok=True)
+
+def _filter(series:TideSeries,t_start=None,t_end=None,step=None,qualities=None) -> TideSeries:
+    """
+    Applies a time window, a sampling interval (see _select) and accepted quality flags to a series already read.
+    Window of a sorted series is a view (no copy).
+    """
+    if t_start is None and t_end is None and step is None:
+        return series.select(qualities)
+    if series.ordered:
+        series=series.slice(-math.inf if t_start is None else t_start,math.inf if t_end is None else t_end)
+        t_start=t_end=None
+    keep=_select(numpy.round(series.hours*3600).astype(numpy.int64),t_start,t_end,step)
+    return series.take(keep,ordered=series.ordered or None).select(qualities)
+
+def read_file(file:Path,tzinfo="UTC",cache_dir:Path=None,t_start=None,t_end=None,step=None,qualities=None) -> TideSeries:
+    """
+    Reads a single REFMAR file, which may be compressed (.gz, .bz2, .xz) or a zip archive of REFMAR files. If a cache directory is given, the parsed series (datas of all quality flags) is kept there in binary form, and read back (memory mapped) as long as file is not modified. A cache directory that cannot be written only disables the cache.
+    Partial reads (time window or sampling interval) use an existing cache entry, otherwise they parse only selected lines and do not create an entry.
+
+    :param file: REFMAR file to read (plain, compressed or zip archive).
+    :type file: Path
+    :param tzinfo: Time zone of the times in file.
+    :type tzinfo: str
+    :param cache_dir: Directory of cache, None for no cache.
+    :type cache_dir: Path
+    :param t_start: Start of window (included), None: no start.
+    :type t_start: datetime or float (hours from H.T0)
+    :param t_end: End of window (excluded), None: no end.
+    :type t_end: datetime or float (hours from H.T0)
+    :param step: Sampling interval, only times multiple of step from H.T0 are kept. None: all times.
+    :type step: timedelta or float (hours)
+    :param qualities: Accepted quality flags (ex: (3,) for validated datas). None: all datas.
+    :type qualities: list[int]
+    :return: The series of datas read.
+    :rtype: TideSeries
+    """
+    partial=t_start is not None or t_end is not None or step is not None
+    cache=None
+    if cache_dir is not None:
+        cache=_cache_file(file,tzinfo,cache_dir)
+        series=_load_cache(cache,{"files":[file]})
+        if series is not None:
+            logger.info(f"Read {file} from cache {cache}")
+            return _filter(series,t_start,t_end,step,qualities)
+    if cache is not None and not partial:
+        # Cache entry holds all quality flags, accepted ones are selected afterwards.
+        series=read_file(file,tzinfo,None)
+        try:
+            _save_cache(series,cache)
+        except OSError as e:
+            logger.warning(f"Cache {cache} not written ({e}), {file} will be parsed again")
+        return series.select(qualities)
+    series_list=[]
+    logger.debug(file)
+    for name,f in _open_streams(file):
+        logger.info(f"Read {name}")
+        for block in _read_blocks(f,BLOCK_SIZE):
+            series_list.append(parse(block,tzinfo,t_start,t_end,step,qualities))
+    return concatenate(series_list,{"files":[file]})
+
+def read_tail(file:Path,offset:int=0,tzinfo="UTC") -> tuple[TideSeries,int]:
+    """
+    Reads the lines of a growing REFMAR file from a byte offset. Only complete lines are read: a last line being written is left for next read.
+    Compressed files and zip archives cannot be read from an offset: they raise ValueError (read them whole with read_file).
+
+    :param file: REFMAR file to read.
+    :type file: Path
+    :param offset: Number of bytes already read (end of a line).
+    :type offset: int
+    :param tzinfo: Time zone of the times in file.
+    :type tzinfo: str
+    :return: The series of datas read (all quality flags) and the offset of the end of last line read.
+    :rtype: tuple(TideSeries,int)
+    """
+    if is_compressed(file):
+        raise ValueError(f"Compressed file {file} cannot be read from an offset")
+    series_list=[]
+    with open(file,'rb') as f:
+        f.seek(offset)
+        logger.info(f"Read {file} from byte {offset}")
+        for block in _read_blocks(f,BLOCK_SIZE):
+            if not block.endswith(b"\n"):
+                break
+            series_list.append(parse(block,tzinfo))
+            offset+=len(block)
+    return concatenate(series_list,{"files":[file]}),offset
+
+DUPLICATES_POLICIES=(None,"latest","quality")
+"Policies of merge for datas of same time: None keeps all, 'latest' keeps the one of the last series, 'quality' keeps the one of highest REFMAR quality flag, then of unknown quality (FLAG_UNKNOWN), then filled (FLAG_FILLED), then of the last series."
+
+def _positions(parts:list[TideSeries]) -> list:
+    """
+    Gives the position of each data of sorted series in their merge. At same time, datas of a series come after those of the series before it in list.
+    A series is only searched by series overlapping its period (binary searches), series before its period only shift it.
+
+    :return: For each series, slice of its datas in merge if no other series overlaps it, otherwise array of positions.
+    :rtype: list[slice or numpy.ndarray[int64]]
+    """
+    starts=numpy.array([s.hours[0] for s in parts])
+    ends=numpy.array([s.hours[-1] for s in parts])
+    lengths=numpy.array([len(s) for s in parts],dtype=numpy.int64)
+    index=numpy.arange(len(parts))
+    positions=[]
+    for p,series in enumerate(parts):
+        before=numpy.where(index<p,ends<=starts[p],ends<starts[p])
+        after=numpy.where(index<p,starts>ends[p],starts>=ends[p])
+        offset=int(lengths[before].sum())
+        overlapping=numpy.flatnonzero(~before & ~after & (index!=p))
+        if len(overlapping)==0:
+            positions.append(slice(offset,offset+len(series)))
+            continue
+        position=numpy.arange(offset,offset+len(series),dtype=numpy.int64)
+        for q in overlapping:
+            position+=numpy.searchsorted(parts[q].hours,series.hours,side='right' if q<p else 'left')
+        positions.append(position)
+    return positions
+
+def _deduplicate(series:TideSeries,sources,duplicates:str) -> TideSeries:
+    """
+    Keeps a single data for each time of a sorted series, according to duplicates policy (see DUPLICATES_POLICIES).
+    Only datas sharing their time with another one are examined.
+    """
+    same=numpy.flatnonzero(series.hours[1:]==series.hours[:-1])
+    if len(same)==0:
+        return series
+    duplicated=numpy.zeros(len(series),dtype=bool)
+    duplicated[same]=True
+    duplicated[same+1]=True
+    rows=numpy.flatnonzero(duplicated)
+    run=numpy.cumsum(numpy.concatenate(([0],series.hours[rows[1:]]!=series.hours[rows[:-1]])))
+    key=sources[rows].astype(numpy.int64)
+    if duplicates=="quality":
+        # Any measured data ranks above a filled one, any REFMAR flag above unknown quality.
+        flags=series.flags[rows]
+        rank=numpy.where(flags==FLAG_FILLED,0,flags.astype(numpy.int64)+1)
+        key+=rank*(int(sources.max())+1)
+    # Best key of each run, last one if several
+    order=numpy.lexsort((numpy.arange(len(rows)),key,run))
+    best=order[numpy.append(run[order][1:]!=run[order][:-1],True)]
+    keep=numpy.ones(len(series),dtype=bool)
+    keep[rows]=False
+    keep[rows[best]]=True
+    logger.info(f"{len(series)-numpy.count_nonzero(keep)} duplicated datas dropped")
+    return series.take(keep,ordered=True)
+
+def merge(series_list:list[TideSeries],meta:dict=None,duplicates:str=None) -> TideSeries:
+    """
+    Merges series in time order. Each series is sorted on its own (usually it already is), then the position of each data in the merged series is found by binary searches among the series overlapping its own, and columns are written once into the merged series: no sort of all datas at once, no intermediate merge.
+    Series of distinct periods are copied as whole slices.
+    Datas of same time (ex: files overlapping at year boundaries, files downloaded twice) are kept or reconciled according to duplicates policy.
+
+    :param series_list: Series to merge, in order of precedence for 'latest' policy (last wins).
+    :type series_list: list[TideSeries]
+    :param meta: Optional metadata of the resulting series.
+    :type meta: dict
+    :param duplicates: Policy for datas of same time, one of DUPLICATES_POLICIES. None: all datas are kept.
+    :type duplicates: str
+    :return: The series holding all datas in time order.
+    :rtype: TideSeries
+    """
+    if duplicates not in DUPLICATES_POLICIES:
+        raise ValueError(f"Unknown duplicates policy: {duplicates} (expected one of {DUPLICATES_POLICIES})")
+    parts=[(s.sort(),numpy.full(len(s),i,dtype=numpy.int32)) for i,s in enumerate(series_list) if len(s)>0]
+    if len(parts)==0:
+        return TideSeries([],[],meta)
+    if len(parts)==1:
+        # No copy: columns of a single file may be memory mapped from cache.
+        series,sources=parts[0]
+        series=TideSeries(series.hours,series.heights,meta,ordered=True,flags=series.flags)
+    else:
+        # Each data is written once, at its position in the merged series.
+        n=sum(len(s) for s,_ in parts)
+        columns=[numpy.empty(n,dtype=column.dtype) for column in (parts[0][0].hours,parts[0][0].heights,parts[0][0].flags,parts[0][1])]
+        for (s,source),position in zip(parts,_positions([s for s,_ in parts])):
+            for column,values in zip(columns,(s.hours,s.heights,s.flags,source)):
+                column[position]=values
+        series=TideSeries(columns[0],columns[1],meta,ordered=True,flags=columns[2])
+        sources=columns[3]
+    if duplicates is not None:
+        series=_deduplicate(series,sources,duplicates)
+    return series
+
+def reader(files:list[Path],tzinfo="UTC",cache_dir:Path=None,workers:int=1,chunksize:int=1,t_start=None,t_end=None,step=None,qualities=(FLAG_VALIDATED,),duplicates="latest") -> TideSeries:
+    """
+    Reads REFMAR files (format: dd/mm/YYYY HH:MM:SS;height;flag) and builds a series from their datas of accepted quality, in time order.
+    Files are read by blocks of BLOCK_SIZE bytes, each block being decoded by the bulk parser. Compressed files (.gz, .bz2, .xz) and zip archives are decompressed on the fly.
+    With several workers, files are parsed concurrently by a pool of processes.
+    A time window and a sampling interval may be given: they are applied while parsing, so excluded datas are never loaded.
+    Datas of all files are merged in time order, a single data is kept for each time (see merge).
+
+    :param files: REFMAR files to read.
+    :type files: list[Path]
+    :param tzinfo: Time zone of the times in files.
+    :type tzinfo: str
+    :param cache_dir: Directory of cache of parsed files. Default CACHE_DIR, False: no cache.
+    :type cache_dir: Path
+    :param workers: Number of processes parsing files. 1: files are parsed in current process. None: number of CPUs.
+    :type workers: int
+    :param chunksize: Number of files sent at once to a worker process.
+    :type chunksize: int
+    :param t_start: Start of window (included), None: no start.
+    :type t_start: datetime or float (hours from H.T0)
+    :param t_end: End of window (excluded), None: no end.
+    :type t_end: datetime or float (hours from H.T0)
+    :param step: Sampling interval, only times multiple of step from H.T0 are kept (ex: timedelta(hours=1) for hourly datas). None: all times.
+    :type step: timedelta or float (hours)
+    :param qualities: Accepted quality flags. Default: validated datas only. None: all datas.
+    :type qualities: list[int]
+    :param duplicates: Policy for datas of same time (see DUPLICATES_POLICIES). Default: data of last file in files wins. None: all datas are kept.
+    :type duplicates: str
+    :return: The series of datas read.
+    :rtype: TideSeries
+    """
+    if cache_dir is None:
+        cache_dir=CACHE_DIR
+    elif cache_dir is False:
+        cache_dir=None
+    files=list(files)
+    if workers==1 or len(files)<=1:
+        series_list=[read_file(file,tzinfo,cache_dir,t_start,t_end,step,qualities) for file in files]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            series_list=list(executor.map(read_file,files,repeat(tzinfo),repeat(cache_dir),repeat(t_start),repeat(t_end),repeat(step),repeat(qualities),chunksize=chunksize))
+    return merge(series_list,{"files":files},duplicates)
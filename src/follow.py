@@ -0,0 +1,274 @@
+# coding: utf-8
+"""
+This module contains the follow mode: datas of a growing REFMAR file, or of a stream (socket, FIFO), are compared to a model as soon as they are written.
+
+Residuals (observed - predicted heights) are kept over a rolling window of time. Each new data costs O(1) amortized, whatever the length of history:
+- mean: rolling sum,
+- min and max: monotonic queues,
+- percentiles of absolute residuals: histogram of ERROR_BIN bins, with counts of blocks of HISTOGRAM_BLOCK bins so that a percentile only scans a block list and a block.
+"""
+
+import conf_logging
+import logging
+from collections import deque
+from pathlib import Path
+import os
+import stat
+import time
+import numpy
+import datas
+from datas import TideSeries
+from models import Model
+import models
+
+logger=logging.getLogger(__name__)
+
+MAX_RESIDUAL=20.0
+"Absolute residuals (m) above this value are counted in the last bin of histogram."
+HISTOGRAM_BLOCK=128
+"Number of bins of histogram counted together (about the square root of the number of bins)."
+
+class ResidualMonitor:
+    """
+    This class keeps rolling statistics of residuals of a model over the last hours, and fires callbacks when a residual crosses a threshold.
+
+    :param model: Model predicting heights.
+    :type model: Model
+    :param window: Duration of rolling window (h).
+    :type window: float
+    :param N: Number of residuals in window.
+    :type N: int
+    :param mean: Mean residual of window (NaN before first data).
+    :type mean: float
+    :param min: Minimal residual of window.
+    :type min: float
+    :param max: Maximal residual of window.
+    :type max: float
+    :param last: Hour, observed height and residual of last data, None before first data.
+    :type last: tuple(float,float,float)
+    """
+
+    def __init__(self,model:Model,window:float=24.0):
+        """
+        Constructor of a monitor without data.
+
+        :param model: Model predicting heights.
+        :type model: Model
+        :param window: Duration of rolling window (h).
+        :type window: float
+        """
+        self.model=model
+        self.window=window
+        self.N=0
+        self.last=None
+        self.mean=numpy.nan
+        self.min=numpy.nan
+        self.max=numpy.nan
+        self._samples=deque() # (hour, residual, bin)
+        self._sum=0.0
+        self._max=deque() # residuals decreasing
+        self._min=deque() # residuals increasing
+        self._histogram=numpy.zeros(int(MAX_RESIDUAL/models.ERROR_BIN)+2,dtype=numpy.int64)
+        self._blocks=numpy.zeros(-(-len(self._histogram)//HISTOGRAM_BLOCK),dtype=numpy.int64) # counts of blocks of bins
+        self._callbacks=[]
+
+    def on_threshold(self,threshold:float,callback):
+        """
+        Registers a callback fired for each data whose absolute residual is above threshold.
+
+        :param threshold: Threshold of absolute residual (m).
+        :type threshold: float
+        :param callback: Function called with hour, observed height and residual of the data.
+        :type callback: Callable[[float,float,float],None]
+        """
+        self._callbacks.append((threshold,callback))
+
+    def add(self,series:TideSeries):
+        """
+        Adds new datas (in time order). Predictions of all new datas are computed at once.
+
+        :param series: New datas.
+        :type series: TideSeries
+        """
+        if len(series)==0:
+            return
+        residuals=series.heights-self.model.predict(series.hours)
+        bins=numpy.minimum(numpy.ceil(numpy.absolute(residuals)/models.ERROR_BIN),len(self._histogram)-1).astype(numpy.int64)
+        for hour,height,residual,b in zip(series.hours.tolist(),series.heights.tolist(),residuals.tolist(),bins.tolist()):
+            self._push(hour,residual,b)
+            self.last=(hour,height,residual)
+            for threshold,callback in self._callbacks:
+                if abs(residual)>threshold:
+                    callback(hour,height,residual)
+        self._evict(self.last[0]-self.window)
+        self.mean=self._sum/self.N
+        self.max=self._max[0][1]
+        self.min=self._min[0][1]
+
+    def _push(self,hour:float,residual:float,b:int):
+        self._samples.append((hour,residual,b))
+        self._sum+=residual
+        self._histogram[b]+=1
+        self._blocks[b//HISTOGRAM_BLOCK]+=1
+        self.N+=1
+        while self._max and self._max[-1][1]<=residual:
+            self._max.pop()
+        self._max.append((hour,residual))
+        while self._min and self._min[-1][1]>=residual:
+            self._min.pop()
+        self._min.append((hour,residual))
+
+    def _evict(self,oldest:float):
+        """
+        Removes datas whose time is not after oldest.
+        """
+        while self._samples and self._samples[0][0]<=oldest:
+            hour,residual,b=self._samples.popleft()
+            self._sum-=residual
+            self._histogram[b]-=1
+            self._blocks[b//HISTOGRAM_BLOCK]-=1
+            self.N-=1
+        while self._max and self._max[0][0]<=oldest:
+            self._max.popleft()
+        while self._min and self._min[0][0]<=oldest:
+            self._min.popleft()
+
+    def percentile(self,perc:float) -> float:
+        """
+        Gives a percentile of absolute residuals of window, rounded up to models.ERROR_BIN (as StreamingModelError).
+        The block holding the percentile is found from counts of blocks, then the bin inside the block: cost does not depend on the number of datas.
+
+        :param perc: Percentile (0 to 100).
+        :type perc: float
+        :return: Percentile of absolute residuals (NaN if empty).
+        :rtype: float
+        """
+        if self.N==0:
+            return numpy.nan
+        rank=numpy.ceil(perc/100*(self.N-1))+1
+        cumulated=numpy.cumsum(self._blocks)
+        block=int(numpy.searchsorted(cumulated,rank))
+        if block>0:
+            rank-=cumulated[block-1]
+        start=block*HISTOGRAM_BLOCK
+        return (start+numpy.searchsorted(numpy.cumsum(self._histogram[start:start+HISTOGRAM_BLOCK]),rank))*models.ERROR_BIN
+
+    def __str__(self):
+        return f"N:{self.N}, mean:{self.mean:0.4f}, min:{self.min:0.4f}, max:{self.max:0.4f}, p50:{self.percentile(50):0.4f}, p99:{self.percentile(99):0.4f}"
+
+class Follower:
+    """
+    This class parses new bytes of a REFMAR source as they come, and passes new datas to a monitor.
+
+    :param monitor: Monitor receiving new datas.
+    :type monitor: ResidualMonitor
+    :param tzinfo: Time zone of the times of source.
+    :type tzinfo: str
+    :param qualities: Accepted quality flags. None: all datas (real time datas are not validated yet).
+    :type qualities: list[int]
+    :param offset: Number of bytes of followed file already read.
+    :type offset: int
+    """
+
+    def __init__(self,monitor:ResidualMonitor,tzinfo="UTC",qualities=None):
+        """
+        Constructor of a follower at beginning of source.
+
+        :param monitor: Monitor receiving new datas.
+        :type monitor: ResidualMonitor
+        :param tzinfo: Time zone of the times of source.
+        :type tzinfo: str
+        :param qualities: Accepted quality flags. None: all datas.
+        :type qualities: list[int]
+        """
+        self.monitor=monitor
+        self.tzinfo=tzinfo
+        self.qualities=qualities
+        self.offset=0
+        self._remainder=b""
+
+    def feed(self,data:bytes) -> int:
+        """
+        Parses bytes received from a stream. A last incomplete line is kept until its end is received.
+
+        :param data: Bytes received.
+        :type data: bytes
+        :return: Number of new datas.
+        :rtype: int
+        """
+        data=self._remainder+data
+        last=data.rfind(b"\n")
+        self._remainder=data[last+1:]
+        if last<0:
+            return 0
+        series=datas.parse(data[:last+1],self.tzinfo,qualities=self.qualities)
+        self.monitor.add(series)
+        return len(series)
+
+    def poll(self,file:Path) -> int:
+        """
+        Parses bytes appended to a file since last poll. A file shorter than bytes already read (rotated or truncated) is read again from its beginning.
+        Compressed files and zip archives cannot be followed: they raise ValueError.
+
+        :param file: Followed file.
+        :type file: Path
+        :return: Number of new datas.
+        :rtype: int
+        """
+        if datas.is_compressed(file):
+            raise ValueError(f"Compressed file {file} cannot be followed")
+        if os.stat(file).st_size<self.offset:
+            logger.warning(f"{file} was truncated, read again from beginning")
+            self.offset=0
+        series,self.offset=datas.read_tail(file,self.offset,self.tzinfo)
+        series=series.select(self.qualities)
+        self.monitor.add(series)
+        return len(series)
+
+def follow(source,monitor:ResidualMonitor,tzinfo="UTC",qualities=None,interval:float=1.0,start_at_end:bool=True,stop=None) -> Follower:
+    """
+    Follows a source until it ends (stream) or stop() is True.
+
+    :param source: Growing REFMAR file (polled every interval, not compressed), FIFO, or binary stream such as socket.makefile('rb') (read as bytes come).
+    :type source: Path or BinaryIO
+    :param monitor: Monitor receiving new datas.
+    :type monitor: ResidualMonitor
+    :param tzinfo: Time zone of the times of source.
+    :type tzinfo: str
+    :param qualities: Accepted quality flags. None: all datas.
+    :type qualities: list[int]
+    :param interval: Delay between two polls of a file (s).
+    :type interval: float
+    :param start_at_end: For a file, ignore its current content and follow only appended datas.
+    :type start_at_end: bool
+    :param stop: Function telling when to stop following. None: never for a file, end of stream for a stream.
+    :type stop: Callable[[],bool]
+    :return: The follower (offset reached in file).
+    :rtype: Follower
+    """
+    follower=Follower(monitor,tzinfo,qualities)
+    if isinstance(source,(str,Path)) and datas.is_compressed(source):
+        raise ValueError(f"Compressed file {source} cannot be followed")
+    if isinstance(source,(str,Path)) and stat.S_ISFIFO(os.stat(source).st_mode):
+        with open(source,'rb') as f:
+            return _follow_stream(follower,f,stop)
+    if isinstance(source,(str,Path)):
+        if start_at_end:
+            follower.offset=os.stat(source).st_size
+        while stop is None or not stop():
+            if follower.poll(source)==0:
+                time.sleep(interval)
+        return follower
+    return _follow_stream(follower,source,stop)
+
+def _follow_stream(follower:Follower,stream,stop) -> Follower:
+    """
+    Feeds a follower with bytes of a stream as they come, until end of stream or stop() is True.
+    """
+    read=stream.read1 if hasattr(stream,"read1") else stream.read
+    while stop is None or not stop():
+        data=read(datas.BLOCK_SIZE)
+        if not data:
+            break
+        follower.feed(data)
+    return follower
@@ -0,0 +1,238 @@
+# coding: utf-8
+"""
+This module deals with regular time grids: series resampled at a fixed interval, with an explicit mask of missing datas, reports of gaps, and filling of gaps with a model.
+
+Grid times are multiples of the interval from H.T0 (so aligned on midnight UTC for divisors of a day), as sampling of datas.reader.
+"""
+
+import conf_logging
+import logging
+import datetime
+import numpy
+from datas import TideSeries
+import datas
+from models import Model
+
+logger=logging.getLogger(__name__)
+
+def _interval_seconds(interval) -> int:
+    """
+    Converts an interval to a positive number of seconds.
+
+    :param interval: Interval of grid.
+    :type interval: timedelta or float (hours)
+    :return: Interval in seconds.
+    :rtype: int
+    """
+    seconds=round(interval.total_seconds()) if isinstance(interval,datetime.timedelta) else round(interval*3600)
+    if seconds<=0:
+        raise ValueError(f"Interval must be positive: {interval}")
+    return seconds
+
+class RegularSeries:
+    """
+    This class holds datas on a regular time grid. Missing datas are explicit: mask is False and height is NaN.
+
+    :param start: Time of first point as seconds elapsed from H.T0.
+    :type start: int
+    :param interval: Interval between points (s).
+    :type interval: int
+    :param hours: Times of points as hours elapsed from H.T0 (same values as datas read by datas.reader).
+    :type hours: numpy.ndarray[float64]
+    :param heights: Tide's heights, NaN where missing.
+    :type heights: numpy.ndarray[float64]
+    :param mask: True where a data is present.
+    :type mask: numpy.ndarray[bool]
+    :param flags: Quality flags, datas.FLAG_UNKNOWN where missing.
+    :type flags: numpy.ndarray[uint8]
+    """
+
+    def __init__(self,start:int,interval:int,heights,mask,flags=None):
+        """
+        Constructor of a regular series.
+
+        :param start: Time of first point as seconds elapsed from H.T0.
+        :type start: int
+        :param interval: Interval between points (s).
+        :type interval: int
+        :param heights: Tide's heights of points.
+        :type heights: array like of float
+        :param mask: True where a data is present.
+        :type mask: array like of bool
+        :param flags: Quality flags of points. Default datas.FLAG_UNKNOWN for all points.
+        :type flags: array like of int
+        """
+        self.start=int(start)
+        self.interval=int(interval)
+        self.heights=numpy.asarray(heights,dtype=numpy.float64)
+        self.mask=numpy.asarray(mask,dtype=bool)
+        if flags is None:
+            flags=numpy.full(self.heights.shape,datas.FLAG_UNKNOWN,dtype=numpy.uint8)
+        self.flags=numpy.asarray(flags,dtype=numpy.uint8)
+        if self.heights.shape!=self.mask.shape or self.heights.shape!=self.flags.shape:
+            raise ValueError(f"Columns length differ: heights={self.heights.shape}, mask={self.mask.shape}, flags={self.flags.shape}")
+        # Same computation as parser, so that grid times equal times read.
+        self.hours=datas._to_hours(self.start+numpy.arange(len(self.heights),dtype=numpy.int64)*self.interval)
+
+    def __len__(self):
+        return len(self.heights)
+
+    def to_series(self) -> TideSeries:
+        """
+        Gives present datas as a series.
+
+        :return: The series of present datas, in time order.
+        :rtype: TideSeries
+        """
+        return TideSeries(self.hours[self.mask],self.heights[self.mask],ordered=True,flags=self.flags[self.mask])
+
+    def gaps(self) -> "GapReport":
+        """
+        Reports the gaps (runs of missing points) of the grid.
+
+        :return: The report of gaps.
+        :rtype: GapReport
+        """
+        return GapReport(self)
+
+    def __str__(self):
+        if len(self)==0:
+            return "RegularSeries(empty)"
+        return f"RegularSeries({len(self)} points every {self.interval}s from {datas.get_time(self.hours[0])} to {datas.get_time(self.hours[-1])}, {numpy.count_nonzero(self.mask)} present)"
+
+class GapReport:
+    """
+    This class holds the gaps of a regular series: runs of consecutive missing points.
+
+    :param count: Number of gaps.
+    :type count: int
+    :param starts: Times of first missing point of each gap (hours from H.T0).
+    :type starts: numpy.ndarray[float64]
+    :param durations: Durations of gaps (h), i.e number of missing points times interval.
+    :type durations: numpy.ndarray[float64]
+    :param longest: Duration of longest gap (h), 0 if there is no gap.
+    :type longest: float
+    :param coverage: Fraction of present points of grid for each year (UTC) of grid.
+    :type coverage: dict[int,float]
+    """
+
+    def __init__(self,regular:RegularSeries):
+        """
+        Constructor of the report. It computes all measures of gaps.
+
+        :param regular: The regular series to examine.
+        :type regular: RegularSeries
+        """
+        missing=numpy.concatenate(([0],(~regular.mask).astype(numpy.int8),[0]))
+        edges=numpy.diff(missing)
+        first=numpy.flatnonzero(edges==1)
+        last=numpy.flatnonzero(edges==-1)
+        self.count=len(first)
+        self.starts=regular.hours[first]
+        self.durations=(last-first)*regular.interval/3600
+        self.longest=float(self.durations.max()) if self.count>0 else 0.0
+        seconds=regular.start+numpy.arange(len(regular),dtype=numpy.int64)*regular.interval
+        years=(datas._EPOCH_DAY+seconds//86400).astype('datetime64[Y]').astype(numpy.int64)+1970
+        self.coverage={}
+        if len(years)>0:
+            first_year=int(years[0])
+            totals=numpy.bincount(years-first_year)
+            presents=numpy.bincount(years-first_year,weights=regular.mask)
+            for i in numpy.flatnonzero(totals):
+                self.coverage[first_year+int(i)]=float(presents[i]/totals[i])
+
+    def __str__(self):
+        coverage_str=""
+        for year,fraction in self.coverage.items():
+            coverage_str+=f"\n\t{year}:{fraction:0.4f}"
+        return f"count:{self.count}, longest:{self.longest:0.2f}h\ncoverage:{coverage_str}"
+
+def to_grid(series:TideSeries,interval,t_start=None,t_end=None) -> RegularSeries:
+    """
+    Resamples a series on a regular grid. A point of grid takes the data read at its exact time (to the second), it is missing if there is none.
+    Datas between points of grid are ignored (ex: 10mn datas on a 1h grid), points without data are missing (ex: 1h datas on a 10mn grid).
+
+    :param series: Datas to resample.
+    :type series: TideSeries
+    :param interval: Interval of grid.
+    :type interval: timedelta or float (hours)
+    :param t_start: Start of grid (included, rounded up to the grid). None: first data.
+    :type t_start: datetime or float (hours from H.T0)
+    :param t_end: End of grid (excluded). None: after last data.
+    :type t_end: datetime or float (hours from H.T0)
+    :return: The regular series.
+    :rtype: RegularSeries
+    """
+    step=_interval_seconds(interval)
+    seconds=numpy.round(series.hours*3600).astype(numpy.int64)
+    if len(seconds)==0 and (t_start is None or t_end is None):
+        return RegularSeries(0,step,[],[])
+    start=round(datas.as_hour(t_start)*3600) if t_start is not None else int(seconds.min())
+    end=round(datas.as_hour(t_end)*3600) if t_end is not None else int(seconds.max())+1
+    start=-(-start//step)*step
+    n=max(0,-(-(end-start)//step))
+    heights=numpy.full(n,numpy.nan)
+    mask=numpy.zeros(n,dtype=bool)
+    flags=numpy.full(n,datas.FLAG_UNKNOWN,dtype=numpy.uint8)
+    offset=seconds-start
+    on_grid=(offset>=0) & (offset%step==0) & (offset<n*step)
+    index=offset[on_grid]//step
+    heights[index]=series.heights[on_grid]
+    flags[index]=series.flags[on_grid]
+    mask[index]=True
+    logger.debug(f"{len(series)-len(index)} datas off the grid")
+    return RegularSeries(start,step,heights,mask,flags)
+
+def fill(regular:RegularSeries,model:Model,blend=6.0) -> RegularSeries:
+    """
+    Fills missing points of a regular series with heights predicted by a model (Model.predict), all gaps at once.
+    Residuals (observed - predicted) at both edges of a gap are blended in the filling, so that filled heights join observed ones:
+    filled = predicted + w0*r0 + w1*r1
+    where r0, r1: residuals of last point before and first point after the gap
+    and w0, w1: weights decreasing linearly from 1 at the edge to 0 at blend duration from it (blend is reduced to the gap for short gaps, which gives a linear interpolation of residuals).
+
+    :param regular: Regular series with missing points.
+    :type regular: RegularSeries
+    :param model: Model predicting heights.
+    :type model: Model
+    :param blend: Duration over which an edge residual fades.
+    :type blend: timedelta or float (hours)
+    :return: The regular series without missing points, filled points having flag datas.FLAG_FILLED.
+    :rtype: RegularSeries
+    """
+    n=len(regular)
+    missing=~regular.mask
+    if not numpy.any(missing):
+        return regular
+    if not numpy.any(regular.mask):
+        raise ValueError("No data to blend filling with")
+    edges=numpy.diff(numpy.concatenate(([0],missing.astype(numpy.int8),[0])))
+    first=numpy.flatnonzero(edges==1)
+    last=numpy.flatnonzero(edges==-1)
+    before=first-1
+    after=last
+    has_before=before>=0
+    has_after=after<n
+    # Residuals at edges, 0 where gap is at an end of the series
+    edge_index=numpy.concatenate((before[has_before],after[has_after]))
+    edge_residuals=regular.heights[edge_index]-model.predict(regular.hours[edge_index])
+    r0=numpy.zeros(len(first))
+    r1=numpy.zeros(len(first))
+    r0[has_before]=edge_residuals[:numpy.count_nonzero(has_before)]
+    r1[has_after]=edge_residuals[numpy.count_nonzero(has_before):]
+    # Distances (in intervals) of each missing point to both edges of its gap
+    index=numpy.flatnonzero(missing)
+    gap=numpy.cumsum(edges[:-1]==1)[missing]-1
+    d0=index-before[gap]
+    d1=after[gap]-index
+    span=numpy.where(has_before & has_after,last-before,numpy.iinfo(numpy.int64).max)[gap]
+    width=numpy.minimum(_interval_seconds(blend)/regular.interval,span)
+    w0=numpy.where(has_before[gap],numpy.clip(1-d0/width,0,1),0)
+    w1=numpy.where(has_after[gap],numpy.clip(1-d1/width,0,1),0)
+    predicted=model.predict(regular.hours[index])
+    heights=regular.heights.copy()
+    heights[index]=predicted+w0*r0[gap]+w1*r1[gap]
+    flags=regular.flags.copy()
+    flags[index]=datas.FLAG_FILLED
+    logger.info(f"{len(index)} points filled in {len(first)} gaps")
+    return RegularSeries(regular.start,regular.interval,heights,numpy.ones(n,dtype=bool),flags)
@@ -37,23 +37,107 @@ APPLY_TIME_CORRECTION=True
 T0=datetime(1900,1,1,hour=0,minute=0,second=0,tzinfo=timezone.utc)
 "All times origin for whole program."
 
-_t=0
-if APPLY_TIME_CORRECTION:
-    # As we compute number of ceturies, we don't care about seconds which materilizes a fraction of day
-    _t=(datetime.now(timezone.utc)-T0).days/36525
-
-ds=(481267.8906+2*0.0020*_t)/36525/24
-"Speed of longitude of the Moon (°/h)."
-dh=(36000.7689+2*0.0003*_t)/36525/24
-"Speed of longitude of the Sun (°/h)."
-dp=(4069.0340+2*0.0103*_t)/36525/24
-"Speed of longitude of the Moon's mean perigee (°/h)."
-dN=(1934.420+2*0.0021*_t)/36525/24
-"Negative speed of longitude of the Moon's mean ascending node on the ecliptic (°/h)."
-dp1=(1.71920+2*0.0005*_t)/36525/24
-"Speed of longitude of the Sun's mean perigee (°/h)."
-dtau=15+dh-ds
-"Speed of moon (°/h)."
+DEFAULT_EPOCH=datetime(2025,1,1,hour=0,minute=0,second=0,tzinfo=timezone.utc)
+"Epoch of speeds of harmonics when none is given. Fixed, so that speeds (and models) do not depend on the day the program runs."
+
+class SpeedTable:
+    """
+    This class holds the speeds of the Doodson arguments at an epoch. Terms in T^2 of arguments make their speeds slowly vary with time (see APPLY_TIME_CORRECTION).
+    Tables are memoized by epoch (see speed_table).
+
+    :param epoch: Time when speeds are computed.
+    :type epoch: datetime
+    :param ds: Speed of longitude of the Moon (°/h).
+    :type ds: float
+    :param dh: Speed of longitude of the Sun (°/h).
+    :type dh: float
+    :param dp: Speed of longitude of the Moon's mean perigee (°/h).
+    :type dp: float
+    :param dN: Negative speed of longitude of the Moon's mean ascending node on the ecliptic (°/h).
+    :type dN: float
+    :param dp1: Speed of longitude of the Sun's mean perigee (°/h).
+    :type dp1: float
+    :param dtau: Speed of moon (°/h).
+    :type dtau: float
+    :param rates: Speeds of the 6 Doodson arguments in order of Doodson numbers: dtau, ds, dh, dp, dN, dp1 (°/h).
+    :type rates: tuple[float]
+    """
+
+    def __init__(self,epoch:datetime):
+        """
+        Constructor of the speeds at an epoch.
+
+        :param epoch: Time when speeds are computed. MUST be aware.
+        :type epoch: datetime
+        """
+        self.epoch=epoch
+        t=0
+        if APPLY_TIME_CORRECTION:
+            # As we compute number of ceturies, we don't care about seconds which materilizes a fraction of day
+            t=(epoch-T0).days/36525
+        self.ds=(481267.8906+2*0.0020*t)/36525/24
+        self.dh=(36000.7689+2*0.0003*t)/36525/24
+        self.dp=(4069.0340+2*0.0103*t)/36525/24
+        self.dN=(1934.420+2*0.0021*t)/36525/24
+        self.dp1=(1.71920+2*0.0005*t)/36525/24
+        self.dtau=15+self.dh-self.ds
+        self.rates=(self.dtau,self.ds,self.dh,self.dp,self.dN,self.dp1)
+
+    def get_speed(self,n:list[int]) -> float:
+        """
+        Returns rotation speed in °/h of an harmonic at epoch of table (see Harmonic.get_speed).
+
+        :param n: Doodson numbers of harmonic.
+        :type n: list[int]
+        :return: Rotation speed in °/h.
+        :rtype: float
+        """
+        return n[0]*self.dtau + n[1]*self.ds + n[2]*self.dh + n[3]*self.dp + n[4]*self.dN + n[5]*self.dp1
+
+    def get_speeds(self,harmonics:list["Harmonic"]) -> list[float]:
+        """
+        Returns rotation speeds in °/h of harmonics at epoch of table, computed once for all (ex: by models).
+
+        :param harmonics: Harmonics.
+        :type harmonics: list[Harmonic]
+        :return: Rotation speeds in °/h, same order as harmonics.
+        :rtype: list[float]
+        """
+        return [self.get_speed(h.n) for h in harmonics]
+
+_speed_tables={}
+"Speed tables already computed, by epoch."
+
+def speed_table(epoch:datetime=None) -> SpeedTable:
+    """
+    Gives the speed table of an epoch, computed at first call.
+
+    :param epoch: Time when speeds are computed. Default DEFAULT_EPOCH.
+    :type epoch: datetime
+    :return: The speed table.
+    :rtype: SpeedTable
+    """
+    if epoch is None:
+        epoch=DEFAULT_EPOCH
+    table=_speed_tables.get(epoch)
+    if table is None:
+        table=SpeedTable(epoch)
+        _speed_tables[epoch]=table
+    return table
+
+_default=speed_table(DEFAULT_EPOCH)
+ds=_default.ds
+"Speed of longitude of the Moon (°/h) at DEFAULT_EPOCH."
+dh=_default.dh
+"Speed of longitude of the Sun (°/h) at DEFAULT_EPOCH."
+dp=_default.dp
+"Speed of longitude of the Moon's mean perigee (°/h) at DEFAULT_EPOCH."
+dN=_default.dN
+"Negative speed of longitude of the Moon's mean ascending node on the ecliptic (°/h) at DEFAULT_EPOCH."
+dp1=_default.dp1
+"Speed of longitude of the Sun's mean perigee (°/h) at DEFAULT_EPOCH."
+dtau=_default.dtau
+"Speed of moon (°/h) at DEFAULT_EPOCH."
 
 class HarmonicException(Exception):
     pass
@@ -108,9 +192,9 @@ class Harmonic:
         self.n=n
         self.name=name
 
-    def get_speed(self) -> float:
+    def get_speed(self,epoch:datetime=None) -> float:
         """
-        Returns rotation speed in °/h for the current harmonic.
+        Returns rotation speed in °/h for the current harmonic (see SpeedTable).
 
         Documentation
         -------------
@@ -136,10 +220,12 @@ class Harmonic:
         - [Lecture 1: Introduction to ocean tides](https://www.whoi.edu/cms/files/lecture01_21351.pdf)
         - [Chapitre 4 Le potentiel générateur des marées](http://fabien.lefevre.free.fr/These_HTML/doc0004.htm)
 
+        :param epoch: Time when speed is computed. Default DEFAULT_EPOCH.
+        :type epoch: datetime
         :return: Rotation speed in °/h.
         :rtype: float
         """
-        return self.n[0]*dtau + self.n[1]*ds + self.n[2]*dh + self.n[3]*dp + self.n[4]*dN + self.n[5]*dp1
+        return speed_table(epoch).get_speed(self.n)
     
     def __str__(self):
         return f"{self.name}({self.get_speed():0.2f}°/h)"
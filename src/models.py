@@ -8,17 +8,34 @@ import logging
 from harmonics import Harmonic
 import harmonics as H
 from datetime import datetime
+from datetime import timedelta
 import math
 from deprecated import deprecated
 from harmonics import HarmonicException
 from datas import Data
+from datas import TideSeries
+import datas
 import numpy
 from pathlib import Path
 import pickle
 import copy
+import json
+import os
+import struct
+import hashlib
+from collections import OrderedDict
 
 logger=logging.getLogger(__name__)
 
+CHUNK_SIZE=65536
+"Number of times computed at once by vectorized computations. Memory used is about CHUNK_SIZE*len(harmonics) floats."
+DOODSON_CHUNK_SIZE=2048
+"Number of times computed at once by predict_doodson, small so that tables of powers stay in CPU cache."
+FLOAT32_CHUNK_SIZE=4096
+"Number of times computed at once by predict_float32. Error of float32 angles grows with the time span of a chunk."
+ANCHOR_STEPS=4096
+"Number of steps of a regular grid predicted from a single anchor (see Model.predict_grid)."
+
 class Model:
     """
     This class holds a fixed list of harmonics, and computerized list of amplitudes (cosinus ans sinus).
@@ -29,9 +46,13 @@ class Model:
     :type amplitudes_cos: list[float]
     :param amplitudes_sin: List of consinus amplitudes using same order as harmonics list.
     :type amplitudes_sin: list[float]
+    :param epoch: Time of speeds of harmonics (see harmonics.SpeedTable).
+    :type epoch: datetime
+    :param speeds: Rotation speeds of harmonics at epoch (°/h), computed once for all predictions.
+    :type speeds: numpy.ndarray[float64]
     """
 
-    def __init__(self,harmonics:list[Harmonic],min_delta=0.5):
+    def __init__(self,harmonics:list[Harmonic],min_delta=0.5,epoch:datetime=None):
         """
         Constructor of Model given its harmonics. Amplitudes are initialy zeroed.
 
@@ -39,9 +60,13 @@ class Model:
         :type harmonics: list[Harmonic]
         :param min_delta: Minimum space between two harmonics (°/h)
         :type min_delta: float
+        :param epoch: Time of speeds of harmonics. Default H.DEFAULT_EPOCH.
+        :type epoch: datetime
         """
         self.harmonics=harmonics
-        check_harmonics(harmonics,min_delta)
+        self.epoch=epoch if epoch is not None else H.DEFAULT_EPOCH
+        self.speeds=numpy.array(H.speed_table(self.epoch).get_speeds(harmonics),dtype=numpy.float64)
+        check_harmonics(harmonics,min_delta,self.epoch)
         self.amplitudes_cos=[0.0]*len(harmonics)
         self.amplitudes_sin=[0.0]*len(harmonics)
 
@@ -63,25 +88,179 @@ class Model:
         """
         return self.amplitudes_sin
     
-    def get_height(self,t:datetime):
+    def get_height(self,t:datetime|float):
         """
         Computes height with this model for time passed as parameter.  
         h=Ʃ Ac(i) * cos(w(i)*dh) + As(i) * sin(w(i)*dh)
         where w: rotation speed (°/h)
 
         :param t: We estimate tide's height at this time with the model.
-        :type datetime: MUST be aware (oposite to naive).
+        :type datetime: MUST be aware (oposite to naive). Or hours elapsed from H.T0 already computed.
         """
         height=0.0
+        dh=datas.as_hour(t) # time from T0 in hours, computed once for all harmonics
         for n in range(len(self.harmonics)):
             # speed is °/h
             # dh is h
             # speed*dh is °
-            dh=get_hour(t) # time from T0 in hours 
-            angle=math.radians(self.harmonics[n].get_speed()*dh)
+            angle=math.radians(self.speeds[n]*dh)
             height+=self.amplitudes_cos[n] * math.cos(angle) + self.amplitudes_sin[n] * math.sin(angle)
         return height
+
+    def get_heights(self,data) -> numpy.ndarray:
+        """
+        Computes heights with this model for all times of a series (vectorized version of get_height, see predict).
+
+        :param data: Datas whose times are used to estimate tide's heights, or times (see datas.as_hours) such as hours already computed.
+        :type data: TideSeries or list[Data] or numpy.ndarray or list[datetime]
+        :return: Heights estimated, same order as data.
+        :rtype: numpy.ndarray
+        """
+        return self.predict(datas.as_hours(data))
+
+    def predict(self,hours,chunk_size:int=CHUNK_SIZE) -> numpy.ndarray:
+        """
+        Computes heights with this model for many times at once. All harmonics are evaluated for a chunk of times with numpy operations.
+        Angles are computed as in get_height (degrees then radians), so that heights match get_height (differences below 1e-9 m).
+
+        :param hours: Times as hours elapsed from H.T0.
+        :type hours: numpy.ndarray[float64]
+        :param chunk_size: Number of times computed at once. Memory used is about 3*chunk_size*len(harmonics) floats.
+        :type chunk_size: int
+        :return: Heights estimated, same order as hours.
+        :rtype: numpy.ndarray
+        """
+        hours=numpy.asarray(hours,dtype=numpy.float64)
+        speeds=self.speeds
+        amplitudes_cos=numpy.asarray(self.amplitudes_cos,dtype=numpy.float64)
+        amplitudes_sin=numpy.asarray(self.amplitudes_sin,dtype=numpy.float64)
+        heights=numpy.empty(len(hours))
+        for start in range(0,len(hours),chunk_size):
+            angles=numpy.radians(numpy.outer(hours[start:start+chunk_size],speeds))
+            heights[start:start+chunk_size]=numpy.cos(angles)@amplitudes_cos+numpy.sin(angles)@amplitudes_sin
+        return heights
     
+    def predict_doodson(self,hours,chunk_size:int=DOODSON_CHUNK_SIZE) -> numpy.ndarray:
+        """
+        Computes heights with this model for many times at once, building phasors of harmonics from the phasors of the 6 Doodson arguments.
+        Speed of an harmonic is Ʃ n(k)*d(k) (see Harmonic.get_speed), so its phasor is the product of integer powers of phasors of arguments:
+        exp(j*w*dh) = Π exp(j*d(k)*dh)^n(k)
+        where d: dtau, ds, dh, dp, dN, dp1 (°/h)
+        Only 6 exponentials are computed for each time whatever the number of harmonics, then powers and products are multiplications.
+
+        Accuracy: differences to get_height are below 1e-8 m (measured 1e-9 m with Model_N32, amplitudes of 1 m, present-day times).
+        Speed: numpy's vectorized cos and sin are cheap, so this is about as fast as predict for Model_N32 and slower for small models; it pays when harmonics are many more than 6.
+
+        :param hours: Times as hours elapsed from H.T0.
+        :type hours: numpy.ndarray[float64]
+        :param chunk_size: Number of times computed at once. Memory used is about chunk_size*len(harmonics) complex.
+        :type chunk_size: int
+        :return: Heights estimated, same order as hours.
+        :rtype: numpy.ndarray
+        """
+        hours=numpy.asarray(hours,dtype=numpy.float64)
+        rates=numpy.array(H.speed_table(self.epoch).rates)
+        numbers=numpy.array([h.n for h in self.harmonics],dtype=numpy.int64).reshape(len(self.harmonics),6)
+        amplitudes=numpy.asarray(self.amplitudes_cos,dtype=numpy.float64)-1j*numpy.asarray(self.amplitudes_sin,dtype=numpy.float64)
+        heights=numpy.empty(len(hours))
+        for start in range(0,len(hours),chunk_size):
+            arguments=numpy.exp(1j*numpy.radians(numpy.outer(hours[start:start+chunk_size],rates)))
+            phasors=numpy.ones((len(arguments),len(self.harmonics)),dtype=numpy.complex128)
+            for k in range(6):
+                highest=int(numpy.abs(numbers[:,k]).max(initial=0))
+                if highest==0:
+                    continue
+                # Powers -highest..highest of argument k (phasors have modulus 1: negative powers are conjugates)
+                powers=numpy.empty((len(arguments),2*highest+1),dtype=numpy.complex128)
+                powers[:,highest]=1
+                for exponent in range(1,highest+1):
+                    powers[:,highest+exponent]=powers[:,highest+exponent-1]*arguments[:,k]
+                    powers[:,highest-exponent]=numpy.conj(powers[:,highest+exponent])
+                # Only harmonics using argument k are multiplied (few ones use p, N or p1)
+                columns=numpy.flatnonzero(numbers[:,k])
+                phasors[:,columns]*=powers[:,numbers[columns,k]+highest]
+            heights[start:start+chunk_size]=(phasors@amplitudes).real
+        return heights
+
+    def predict_float32(self,hours,chunk_size:int=FLOAT32_CHUNK_SIZE) -> numpy.ndarray:
+        """
+        Computes heights with this model for many times at once in single precision (float32), for bulk predictions.
+        Times are hours from 1900 (about 1e6 h), too large for float32 angles: each chunk is rebased to an epoch e at the middle of its times, phases at e being folded into amplitudes (in float64):
+        A*cos(w*t)+B*sin(w*t) = a*cos(w*(t-e))+b*sin(w*(t-e))
+        where a = A*cos(w*e)+B*sin(w*e), b = B*cos(w*e)-A*sin(w*e)
+        Then angles, cos, sin and sums are computed in float32: about half the memory and much faster than predict (SIMD).
+
+        Accuracy: the error is bounded by about Ʃ|amplitude|*w*span*2^-24, where span: time span of a chunk (h), w: highest speed (rad/h).
+        Ex: Model_N32 with amplitudes of 1 m (Ʃ|amplitude| 25 m), hourly datas (span 4096 h): bound 9 mm, error measured 0.7 mm; 10mn datas: 0.13 mm.
+        Real tides (Ʃ|amplitude| of a few meters) give errors below 1 mm. Use a smaller chunk_size for a tighter bound.
+
+        :param hours: Times as hours elapsed from H.T0.
+        :type hours: numpy.ndarray[float64]
+        :param chunk_size: Number of times computed at once (sharing an epoch).
+        :type chunk_size: int
+        :return: Heights estimated, same order as hours.
+        :rtype: numpy.ndarray[float32]
+        """
+        hours=numpy.asarray(hours,dtype=numpy.float64)
+        speeds=self.speeds
+        speeds_rad=numpy.radians(speeds).astype(numpy.float32)
+        amplitudes_cos=numpy.asarray(self.amplitudes_cos,dtype=numpy.float64)
+        amplitudes_sin=numpy.asarray(self.amplitudes_sin,dtype=numpy.float64)
+        heights=numpy.empty(len(hours),dtype=numpy.float32)
+        for start in range(0,len(hours),chunk_size):
+            chunk=hours[start:start+chunk_size]
+            epoch=(chunk.min()+chunk.max())/2
+            phases=numpy.radians(speeds*epoch)
+            cos_phases=numpy.cos(phases)
+            sin_phases=numpy.sin(phases)
+            a=(amplitudes_cos*cos_phases+amplitudes_sin*sin_phases).astype(numpy.float32)
+            b=(amplitudes_sin*cos_phases-amplitudes_cos*sin_phases).astype(numpy.float32)
+            angles=numpy.outer((chunk-epoch).astype(numpy.float32),speeds_rad)
+            heights[start:start+chunk_size]=numpy.cos(angles)@a+numpy.sin(angles)@b
+        return heights
+
+    def predict_grid(self,start,step,count:int,anchor:int=ANCHOR_STEPS) -> numpy.ndarray:
+        """
+        Computes heights with this model on a regular grid of times, using phasors instead of evaluating cos and sin at each time.
+        Each harmonic is a phasor rotating by a constant angle at each step:
+        h(t0+j*dt) = Re( Ʃ (Ac(i) - j*As(i)) * exp(j*w(i)*t0) * exp(j*w(i)*dt)^j )
+        Powers of the rotation of a step are computed once for anchor steps. Phasors are anchored again (exact angle of time) every anchor steps, which bounds the drift:
+        each block of anchor steps costs len(harmonics) exponentials and one matrix product.
+
+        Accuracy: differences to get_height are below 1e-8 m (Model_N32, amplitudes of 1 m, 10mn or 1mn steps, present-day times), i.e the rounding of angles of about 1e7 radians.
+
+        :param start: Time of first height.
+        :type start: datetime or float (hours from H.T0)
+        :param step: Interval between heights.
+        :type step: timedelta or float (hours)
+        :param count: Number of heights.
+        :type count: int
+        :param anchor: Number of steps computed from an anchor.
+        :type anchor: int
+        :return: Heights at start, start+step, ..., start+(count-1)*step.
+        :rtype: numpy.ndarray
+        """
+        t0=datas.as_hour(start)
+        dt=step.total_seconds()/3600 if isinstance(step,timedelta) else float(step)
+        speeds=self.speeds
+        amplitudes=numpy.asarray(self.amplitudes_cos,dtype=numpy.float64)-1j*numpy.asarray(self.amplitudes_sin,dtype=numpy.float64)
+        powers=numpy.exp(1j*numpy.radians(numpy.outer(numpy.arange(min(anchor,count))*dt,speeds)))
+        heights=numpy.empty(count)
+        for first in range(0,count,anchor):
+            n=min(anchor,count-first)
+            phasors=amplitudes*numpy.exp(1j*numpy.radians(speeds*(t0+first*dt)))
+            heights[first:first+n]=(powers[:n]@phasors).real
+        return heights
+
+    def compact(self) -> "CompactModel":
+        """
+        Gives an immutable copy of this model, whose variants are cheap (see CompactModel).
+
+        :return: The compact model.
+        :rtype: CompactModel
+        """
+        return CompactModel(harmonic_table(self.harmonics,self.epoch),self.amplitudes_cos,self.amplitudes_sin)
+
     def __str__(self):
         str=""
         for i in range(len(self.harmonics)):
@@ -96,71 +275,233 @@ class Model:
         for i in range(N):
             logger.debug(f"i={i}")
             _harmonics[i]=copy.copy(self.harmonics[i])
-        _model=Model(_harmonics,min_delta=0.0)
+        _model=Model(_harmonics,min_delta=0.0,epoch=self.epoch)
         _model.amplitudes_cos=copy.copy(self.amplitudes_cos)
         _model.amplitudes_sin=copy.copy(self.amplitudes_sin)
         return _model
     
     def __eq__(self,other):
-        return self.harmonics==other.harmonics and self.amplitudes_cos==other.amplitudes_cos and self.amplitudes_sin==other.amplitudes_sin 
+        return self.harmonics==other.harmonics and self.amplitudes_cos==other.amplitudes_cos and self.amplitudes_sin==other.amplitudes_sin and self.epoch==other.epoch
+
+    def __setstate__(self,state):
+        """
+        Restores a pickled model. Models pickled before epochs had speeds of the day they were loaded: they get H.DEFAULT_EPOCH.
+        """
+        self.__dict__.update(state)
+        if "epoch" not in state:
+            self.epoch=H.DEFAULT_EPOCH
+            self.speeds=numpy.array(H.speed_table(self.epoch).get_speeds(self.harmonics),dtype=numpy.float64)
     
 class Model_N3(Model):
     """
     Model N3 (3 harmonics with a non nul frequency): (M0), M2, S2, N2.
     """
-    def __init__(self):
-        super().__init__([H.M0,H.M2,H.S2,H.N2])
+    def __init__(self,epoch:datetime=None):
+        super().__init__([H.M0,H.M2,H.S2,H.N2],epoch=epoch)
 
 class Model_N6(Model):
     """
     Model N6 (6 harmonics with a non nul frequency): (M0), M2, S2, N2, K1, M4, O1.
     """
-    def __init__(self):
+    def __init__(self,epoch:datetime=None):
         super().__init__([H.M0,H.M2,H.S2,H.N2,
-                          H.K1,H.M4,H.O1])
+                          H.K1,H.M4,H.O1],epoch=epoch)
 
 class Model_N10(Model):
     """
     Model N10 (10 harmonics with a non nul frequency): (M0), M2, S2, N2, K1, M4, O1, M6, MK3, S4, MN4.
     """
-    def __init__(self):
+    def __init__(self,epoch:datetime=None):
         super().__init__([H.M0,H.M2,H.S2,H.N2,
                           H.K1,H.M4,H.O1,
-                          H.M6,H.MK3,H.S4,H.MN4])
+                          H.M6,H.MK3,H.S4,H.MN4],epoch=epoch)
 
 class Model_N16(Model):
     """
     Model N16 (16 harmonics with a non nul frequency): (M0), M2, S2, N2, K1, M4, O1, M6, MK3, S4, MN4, mu2, _2N2, OO1, lambda2.
     """
-    def __init__(self):
+    def __init__(self,epoch:datetime=None):
         super().__init__([H.M0,H.M2,H.S2,H.N2,
                           H.K1,H.M4,H.O1,
                           H.M6,H.MK3,H.S4,H.MN4,
-                          H.nu2,H.mu2,H._2N2,H.OO1,H.lambda2],min_delta=0.05)
+                          H.nu2,H.mu2,H._2N2,H.OO1,H.lambda2],min_delta=0.05,epoch=epoch)
 
 class Model_N24(Model):
     """
     Model N24 (24 harmonics with a non nul frequency): (M0), M2, S2, N2, K1, M4, O1, M6, MK3, S4, MN4, nu2, mu2, _2N2, OO1, lambda2, S1, M1, J1, Mm, Ssa, Sa, Msf, Mf.
     """
-    def __init__(self):
+    def __init__(self,epoch:datetime=None):
         super().__init__([H.M0,H.M2,H.S2,H.N2,
                           H.K1,H.M4,H.O1,
                           H.M6,H.MK3,H.S4,H.MN4,
                           H.nu2,H.mu2,H._2N2,H.OO1,H.lambda2,
-                          H.S1,H.M1,H.J1,H.Mm,H.Ssa,H.Sa,H.Msf,H.Mf],min_delta=0.04)
+                          H.S1,H.M1,H.J1,H.Mm,H.Ssa,H.Sa,H.Msf,H.Mf],min_delta=0.04,epoch=epoch)
 
 class Model_N32(Model):
     """
     Model N32 (32 harmonics with a non nul frequency): (M0), M2, S2, N2, K1, M4, O1, M6, MK3, S4, MN4, nu2, mu2, _2N2, OO1, lambda2, S1, M1, J1, Mm, Ssa, Sa, Msf, Mf,  rau1, Q1, T2, R2, _2Q1, P1, _2SM2, M3.
     """
-    def __init__(self):
+    def __init__(self,epoch:datetime=None):
         super().__init__([H.M0,H.M2,H.S2,H.N2,
                           H.K1,H.M4,H.O1,
                           H.M6,H.MK3,H.S4,H.MN4,
                           H.nu2,H.mu2,H._2N2,H.OO1,H.lambda2,
                           H.S1,H.M1,H.J1,H.Mm,H.Ssa,H.Sa,H.Msf,H.Mf,
-                          H.rau1,H.Q1,H.T2,H.R2,H._2Q1,H.P1,H._2SM2,H.M3],min_delta=0.03)
+                          H.rau1,H.Q1,H.T2,H.R2,H._2Q1,H.P1,H._2SM2,H.M3],min_delta=0.03,epoch=epoch)
         
+_MODEL_CLASSES={model_class.__name__:model_class for model_class in (Model_N3,Model_N6,Model_N10,Model_N16,Model_N24,Model_N32)}
+"Classes of models restored by read."
+
+class HarmonicTable:
+    """
+    This class holds an immutable list of harmonics with their Doodson numbers and speeds as read-only arrays. A table is shared by all compact models having same harmonics and epoch (see harmonic_table).
+
+    :param harmonics: Harmonics of table.
+    :type harmonics: tuple[Harmonic]
+    :param epoch: Time of speeds of harmonics.
+    :type epoch: datetime
+    :param numbers: Doodson numbers of harmonics (one row per harmonic).
+    :type numbers: numpy.ndarray[int64] (K×6)
+    :param speeds: Rotation speeds of harmonics at epoch (°/h).
+    :type speeds: numpy.ndarray[float64]
+    """
+    __slots__=("harmonics","epoch","numbers","speeds")
+
+    def __init__(self,harmonics:list[Harmonic],epoch:datetime=None):
+        """
+        Constructor of a table. Harmonics are not checked (see check_harmonics).
+
+        :param harmonics: Harmonics of table.
+        :type harmonics: list[Harmonic]
+        :param epoch: Time of speeds of harmonics. Default H.DEFAULT_EPOCH.
+        :type epoch: datetime
+        """
+        self.harmonics=tuple(harmonics)
+        self.epoch=epoch if epoch is not None else H.DEFAULT_EPOCH
+        self.numbers=numpy.array([h.n for h in self.harmonics],dtype=numpy.int64).reshape(len(self.harmonics),6)
+        self.speeds=numpy.array(H.speed_table(self.epoch).get_speeds(self.harmonics),dtype=numpy.float64)
+        self.numbers.flags.writeable=False
+        self.speeds.flags.writeable=False
+
+    def __len__(self):
+        return len(self.harmonics)
+
+_tables={}
+"Harmonic tables already built, by Doodson numbers of their harmonics and epoch."
+
+def harmonic_table(harmonics:list[Harmonic],epoch:datetime=None) -> HarmonicTable:
+    """
+    Gives the shared table of a list of harmonics, built at first call.
+
+    :param harmonics: Harmonics of table.
+    :type harmonics: list[Harmonic]
+    :param epoch: Time of speeds of harmonics. Default H.DEFAULT_EPOCH.
+    :type epoch: datetime
+    :return: The table of harmonics.
+    :rtype: HarmonicTable
+    """
+    if epoch is None:
+        epoch=H.DEFAULT_EPOCH
+    key=(tuple(tuple(h.n) for h in harmonics),epoch)
+    table=_tables.get(key)
+    if table is None:
+        table=HarmonicTable(harmonics,epoch)
+        _tables[key]=table
+    return table
+
+class CompactModel:
+    """
+    This class holds an immutable model: a shared harmonic table, and read-only arrays of amplitudes.
+    Variants with an harmonic changed (see with_amplitude) share the table: no copy of harmonics, no check of harmonics, only amplitudes are copied.
+    It predicts heights as Model (same methods).
+
+    :param table: Harmonics of model.
+    :type table: HarmonicTable
+    :param harmonics: Harmonics of model (those of table).
+    :type harmonics: tuple[Harmonic]
+    :param epoch: Time of speeds of harmonics (that of table).
+    :type epoch: datetime
+    :param speeds: Rotation speeds of harmonics (those of table).
+    :type speeds: numpy.ndarray[float64]
+    :param amplitudes_cos: Cosinus amplitudes using same order as harmonics.
+    :type amplitudes_cos: numpy.ndarray[float64]
+    :param amplitudes_sin: Sinus amplitudes using same order as harmonics.
+    :type amplitudes_sin: numpy.ndarray[float64]
+    """
+    __slots__=("table","harmonics","epoch","speeds","amplitudes_cos","amplitudes_sin")
+
+    def __init__(self,table:HarmonicTable,amplitudes_cos,amplitudes_sin):
+        """
+        Constructor of a compact model.
+
+        :param table: Harmonics of model.
+        :type table: HarmonicTable
+        :param amplitudes_cos: Cosinus amplitudes using same order as harmonics.
+        :type amplitudes_cos: array like of float
+        :param amplitudes_sin: Sinus amplitudes using same order as harmonics.
+        :type amplitudes_sin: array like of float
+        """
+        self.table=table
+        self.harmonics=table.harmonics
+        self.epoch=table.epoch
+        self.speeds=table.speeds
+        self.amplitudes_cos=numpy.array(amplitudes_cos,dtype=numpy.float64)
+        self.amplitudes_sin=numpy.array(amplitudes_sin,dtype=numpy.float64)
+        if self.amplitudes_cos.shape!=(len(table),) or self.amplitudes_sin.shape!=(len(table),):
+            raise ValueError(f"Amplitudes length differ from harmonics: {len(table)}, cos={self.amplitudes_cos.shape}, sin={self.amplitudes_sin.shape}")
+        self.amplitudes_cos.flags.writeable=False
+        self.amplitudes_sin.flags.writeable=False
+
+    def with_amplitude(self,harmonic_index:int,amplitude_cos:float,amplitude_sin:float) -> "CompactModel":
+        """
+        Gives a variant of this model with amplitudes of a single harmonic changed.
+        Both amplitude arrays are copied: O(K) for K harmonics (2*K float64), harmonics and their table are shared. Tunings derive a single variant, once their candidates were evaluated.
+
+        :param harmonic_index: Index of harmonic changed.
+        :type harmonic_index: int
+        :param amplitude_cos: New cosinus amplitude of harmonic.
+        :type amplitude_cos: float
+        :param amplitude_sin: New sinus amplitude of harmonic.
+        :type amplitude_sin: float
+        :return: The variant, sharing the harmonic table of this model.
+        :rtype: CompactModel
+        """
+        variant=CompactModel.__new__(CompactModel)
+        variant.table=self.table
+        variant.harmonics=self.harmonics
+        variant.epoch=self.epoch
+        variant.speeds=self.speeds
+        variant.amplitudes_cos=self.amplitudes_cos.copy()
+        variant.amplitudes_sin=self.amplitudes_sin.copy()
+        variant.amplitudes_cos[harmonic_index]=amplitude_cos
+        variant.amplitudes_sin[harmonic_index]=amplitude_sin
+        variant.amplitudes_cos.flags.writeable=False
+        variant.amplitudes_sin.flags.writeable=False
+        return variant
+
+    def to_model(self) -> Model:
+        """
+        Gives a mutable Model with same harmonics and amplitudes.
+
+        :return: The model.
+        :rtype: Model
+        """
+        model=Model(list(self.harmonics),min_delta=0.0,epoch=self.epoch)
+        model.amplitudes_cos=self.amplitudes_cos.tolist()
+        model.amplitudes_sin=self.amplitudes_sin.tolist()
+        return model
+
+    get_height=Model.get_height
+    get_heights=Model.get_heights
+    predict=Model.predict
+    predict_doodson=Model.predict_doodson
+    predict_float32=Model.predict_float32
+    predict_grid=Model.predict_grid
+    __str__=Model.__str__
+
+    def __eq__(self,other):
+        return list(self.harmonics)==list(other.harmonics) and numpy.array_equal(self.amplitudes_cos,other.amplitudes_cos) and numpy.array_equal(self.amplitudes_sin,other.amplitudes_sin) and self.epoch==other.epoch
+
 class ModelError():
     """
     This class holds datas resulting in measurement comparing a model and a set of datas.
@@ -179,24 +520,21 @@ class ModelError():
     :param abs: Absolute error
     :type abs: float
     """
-    def __init__(self,model:Model,data_list:list[Data]):
+    def __init__(self,model:Model,data_list:TideSeries|list[Data]|tuple,heights:numpy.ndarray=None):
         """
         Constructor of the model's error measurment. It computes all errors (measures) data.
 
         :param model: Model to measure
         :type model: Model
-        :param data_list: Reference datas the model is tested against
-        :type data_list: list[Data]
-        """
-        delta_list=[]
-#        self.wrong=[]
-        for data in data_list:
-            height_ref=data.height
-            height_mod=model.get_height(data.t)
-            delta=height_mod-height_ref
-            delta_list.append(delta)
-#            if math.fabs(delta) > 1.0:
-#                self.wrong.append((data,delta))
+        :param data_list: Reference datas the model is tested against, or pair of hours and heights
+        :type data_list: TideSeries or list[Data] or tuple(numpy.ndarray,numpy.ndarray)
+        :param heights: Heights predicted by model at times of data_list, if already known. None: computed with Model.predict.
+        :type heights: numpy.ndarray
+        """
+        series=datas.as_series(data_list)
+        if heights is None:
+            heights=model.predict(series.hours)
+        delta_list=heights-series.heights
 
         abs_delta_list=numpy.absolute(delta_list)
         self.p=[]
@@ -219,6 +557,70 @@ class ModelError():
         return f"mean:{self.mean:0.4f}, min:{self.min:0.4f}, max:{self.max:0.4f}, var:{self.var:0.4f}, abs:{self.abs:0.4f}\npercentiles:{p_str}"
 #        return f"mean: {self.mean:0.4f}, min: {self.min:0.4f}, max: {self.max:0.4f}, var: {self.var:0.4f}, abs: {self.abs:0.4f}\npercentiles:{p_str}\nwrongs:{w_str}"
 
+ERROR_BIN=0.001
+"Width (m) of bins of absolute errors used by StreamingModelError to compute percentiles."
+
+class StreamingModelError(ModelError):
+    """
+    This class measures the error of a model on datas given by parts, with a memory independent of the number of datas.
+    Mean, min, max, var and abs are exact. Percentiles are computed from an histogram of absolute errors, rounded up to ERROR_BIN.
+    """
+    def __init__(self,model:Model):
+        """
+        Constructor of an empty measurement (no call to ModelError constructor, which needs all datas at once).
+
+        :param model: Model to measure
+        :type model: Model
+        """
+        self.model=model
+        self.N=0
+        self.histogram=numpy.zeros(0,dtype=numpy.int64)
+        self._m2=0.0
+        self._sum_abs=0.0
+        self.p=[]
+        self.mean=math.nan
+        self.min=math.inf
+        self.max=-math.inf
+        self.var=math.nan
+        self.abs=math.nan
+
+    def add(self,data_list:TideSeries|list[Data]|tuple):
+        """
+        Adds datas to the measurement.
+
+        :param data_list: Reference datas the model is tested against, or pair of hours and heights
+        :type data_list: TideSeries or list[Data] or tuple(numpy.ndarray,numpy.ndarray)
+        """
+        series=datas.as_series(data_list)
+        if len(series)==0:
+            return
+        delta_list=self.model.predict(series.hours)-series.heights
+        abs_delta_list=numpy.absolute(delta_list)
+        bins=numpy.bincount(numpy.ceil(abs_delta_list/ERROR_BIN).astype(numpy.int64))
+        if len(bins)>len(self.histogram):
+            self.histogram=numpy.concatenate((self.histogram,numpy.zeros(len(bins)-len(self.histogram),dtype=numpy.int64)))
+        self.histogram[:len(bins)]+=bins
+        # Mean and variance merged with Chan's formula
+        n=len(delta_list)
+        mean=numpy.mean(delta_list)
+        m2=numpy.sum((delta_list-mean)**2)
+        total=self.N+n
+        previous=0.0 if self.N==0 else self.mean
+        self._m2+=m2+(mean-previous)**2*self.N*n/total
+        self.mean=previous+(mean-previous)*n/total
+        self.N=total
+        self.var=self._m2/total
+        self._sum_abs+=numpy.sum(abs_delta_list)
+        self.abs=self._sum_abs/total
+        self.min=min(self.min,numpy.min(delta_list))
+        self.max=max(self.max,numpy.max(delta_list))
+        cumulated=numpy.cumsum(self.histogram)
+        self.p=[]
+        for perc in list(range(10,100,10))+[99]:
+            # Bin of the data following percentile position (same position as numpy.percentile)
+            rank=math.ceil(perc/100*(total-1))+1
+            self.p.append((perc,numpy.searchsorted(cumulated,rank)*ERROR_BIN))
+
 def get_hour(t:datetime)->float:
     """
     Computes the number of hours (float) elapsed from H.T0.
@@ -228,15 +630,20 @@ def get_hour(t:datetime)->float:
     :return: Number of hours (decimal) eplapsed from T0 to t.
     :rtype: float.
     """
-    if t.tzinfo is None:
-        raise ValueError("t is not datetime aware")
-    # dt=(t-H.T0) is timedelta
-    # dh=dt.days*24+dt.seconds/3600 is hours (float) from H.T0.
-    dt=t-H.T0
-    dh=dt.days*24+dt.seconds/3600
-    return dh
+    return datas.get_hour(t)
+
+def get_hours(times) -> numpy.ndarray:
+    """
+    Computes the number of hours elapsed from H.T0 of many times at once (see datas.get_hours).
+
+    :param times: Times to convert: numpy array of datetime64 (UTC), or list of aware date times.
+    :type times: numpy.ndarray[datetime64] or list[datetime]
+    :return: Number of hours (decimal) eplapsed from T0 to each time.
+    :rtype: numpy.ndarray[float64]
+    """
+    return datas.get_hours(times)
 
-def check_harmonics(harmonics:list[Harmonic],min_delta=0.5):
+def check_harmonics(harmonics:list[Harmonic],min_delta=0.5,epoch:datetime=None):
     """
     Checks there is no harmonics too close each other.
 
@@ -256,30 +663,116 @@ def check_harmonics(harmonics:list[Harmonic],min_delta=0.5):
     :type harmonics: list[Harmonic]
     :param min_delta: Minimum space between two harmonics (°/h)
     :type min_delta: float
+    :param epoch: Time of speeds of harmonics. Default H.DEFAULT_EPOCH.
+    :type epoch: datetime
     """
+    speeds=H.speed_table(epoch).get_speeds(harmonics)
     for i in range(len(harmonics)):
         for j in range(len(harmonics)):
             if i < j:
-                delta=math.fabs(harmonics[i].get_speed()-harmonics[j].get_speed())
+                delta=math.fabs(speeds[i]-speeds[j])
                 if delta < min_delta:
-                    raise HarmonicException(f"Harmonics are too close to each other: {i}:{harmonics[i].get_speed()}, {j}:{harmonics[j].get_speed()} (delta={delta})")
+                    raise HarmonicException(f"Harmonics are too close to each other: {i}:{speeds[i]}, {j}:{speeds[j]} (delta={delta})")
                 
-def save(model:Model,file:Path):
+MODEL_FORMAT_VERSION=1
+"Version of layout of model files and model bundles."
+_MODEL_MAGIC=b"TIDEMDL\x00"
+"First bytes of a model file."
+_BUNDLE_MAGIC=b"TIDEBDL\x00"
+"First bytes of a model bundle."
+
+class ModelFileException(Exception):
+    pass
+
+def _write_container(file:Path,magic:bytes,header:dict,arrays:list[numpy.ndarray]):
+    """
+    Writes a file made of magic bytes, length of header (uint32), JSON header padded to a multiple of 8 bytes, then arrays (little endian float64).
+    The file is written aside then renamed, so that it is replaced at once (a bundle mapped elsewhere keeps mapping the former file).
+    """
+    file=Path(file)
+    header_bytes=json.dumps(header).encode()
+    header_bytes+=b" "*(-(len(magic)+4+len(header_bytes))%8)
+    tmp=file.with_name(f"{file.name}.{os.getpid()}.tmp")
+    with open(tmp,"wb") as f:
+        f.write(magic)
+        f.write(struct.pack("<I",len(header_bytes)))
+        f.write(header_bytes)
+        for array in arrays:
+            f.write(numpy.ascontiguousarray(array,dtype="<f8").tobytes())
+    os.replace(tmp,file)
+
+def _read_header(f,magic:bytes) -> tuple[dict,int]:
+    """
+    Reads the header of a file written by _write_container.
+
+    :return: The header, and the position of arrays in file.
+    :rtype: tuple(dict,int)
+    """
+    start=f.read(len(magic)+4)
+    if len(start)<len(magic)+4 or start[:len(magic)]!=magic:
+        raise ModelFileException(f"{f.name} is not a file of type {magic[:-1].decode()} (models saved before version 0.0.7 were pickled, see read_pickle)")
+    length=struct.unpack("<I",start[len(magic):])[0]
+    header=json.loads(f.read(length))
+    if header.get("version")!=MODEL_FORMAT_VERSION:
+        raise ModelFileException(f"{f.name}: version {header.get('version')} not supported (expected {MODEL_FORMAT_VERSION})")
+    return header,len(magic)+4+length
+
+def _harmonics_header(harmonics:list[Harmonic],epoch:datetime) -> dict:
+    """
+    Describes harmonics of a model (Doodson numbers, names and epoch of speeds) for a file header.
+    """
+    return {"epoch":epoch.isoformat(),"names":[h.name for h in harmonics],"numbers":[list(h.n) for h in harmonics]}
+
+def _harmonics_from_header(header:dict) -> tuple[list[Harmonic],datetime]:
     """
-    Saves (serialize) the model in a file.
+    Restores harmonics and epoch described by _harmonics_header.
+    """
+    return [Harmonic(list(n),name=name) for name,n in zip(header["names"],header["numbers"])],datetime.fromisoformat(header["epoch"])
+
+def save(model:Model|CompactModel,file:Path):
+    """
+    Saves the model in a file. Only Doodson numbers and names of harmonics, epoch and amplitudes are written (no pickle):
+    - magic bytes b"TIDEMDL\\0" and length of header (uint32, little endian),
+    - JSON header: version (MODEL_FORMAT_VERSION), class of model, epoch, names and Doodson numbers of harmonics,
+    - amplitudes of cosinus then of sinus (float64, little endian).
 
     :param model: The model to save. 
-    :type model: Model
-    :param file: The destination file where model is serialized.
+    :type model: Model or CompactModel
+    :param file: The destination file where model is saved.
     :type file: Path
     """
-    f=open(file,"wb")
-    pickle.dump(model,f,protocol=pickle.DEFAULT_PROTOCOL)
-    f.close()
+    header={"version":MODEL_FORMAT_VERSION,"class":type(model).__name__}
+    header.update(_harmonics_header(model.harmonics,model.epoch))
+    _write_container(file,_MODEL_MAGIC,header,[model.amplitudes_cos,model.amplitudes_sin])
 
 def read(file:Path) -> Model:
     """
-    Loads (deserialize) the model from a file.
+    Loads the model from a file written by save. Models of classes Model_N3 to Model_N32 are restored with their class.
+
+    :param file: The file from where model is read.
+    :type file: Path
+    :return model: The model to restore. 
+    :rtype: Model
+    """
+    with open(file,"rb") as f:
+        header,start=_read_header(f,_MODEL_MAGIC)
+        amplitudes=numpy.frombuffer(f.read(),dtype="<f8")
+    harmonics,epoch=_harmonics_from_header(header)
+    K=len(harmonics)
+    if len(amplitudes)!=2*K:
+        raise ModelFileException(f"{file}: {len(amplitudes)} amplitudes for {K} harmonics")
+    model_class=_MODEL_CLASSES.get(header["class"])
+    model=model_class(epoch=epoch) if model_class is not None else None
+    if model is None or model.harmonics!=harmonics:
+        model=Model(harmonics,min_delta=0.0,epoch=epoch)
+    model.amplitudes_cos=amplitudes[:K].tolist()
+    model.amplitudes_sin=amplitudes[K:].tolist()
+    return model
+
+@deprecated(version='0.0.7', reason="Models are no more pickled: convert former files with read_pickle then save. Only read trusted files.")
+def read_pickle(file:Path) -> Model:
+    """
+    Loads a model pickled by former versions of save.
 
     :param file: The serialization file from where model is read.
     :type file: Path
@@ -290,3 +783,253 @@ def read(file:Path) -> Model:
     model=pickle.load(f)
     f.close()
     return model
+
+def save_bundle(models:dict[str,Model|CompactModel],file:Path):
+    """
+    Saves models of many stations in a single file, to be memory mapped by ModelBundle. Models having same harmonics and epoch share a table:
+    - magic bytes b"TIDEBDL\\0" and length of header (uint32, little endian),
+    - JSON header: version (MODEL_FORMAT_VERSION), tables (epoch, names and Doodson numbers of harmonics, position of amplitudes and number of stations), and index of stations (table and row),
+    - for each table, matrix of amplitudes of cosinus then of sinus (stations×harmonics, float64, little endian).
+
+    :param models: Model of each station.
+    :type models: dict[str,Model or CompactModel]
+    :param file: The destination file.
+    :type file: Path
+    """
+    groups={}
+    stations={}
+    for station,model in models.items():
+        key=(tuple(tuple(h.n) for h in model.harmonics),model.epoch)
+        table_index,model,names=groups.setdefault(key,(len(groups),model,[]))
+        stations[station]=[table_index,len(names)]
+        names.append(station)
+    tables=[]
+    arrays=[]
+    offset=0
+    for table_index,model,names in groups.values():
+        K=len(model.harmonics)
+        table=_harmonics_header(model.harmonics,model.epoch)
+        table.update({"offset":offset,"stations":len(names)})
+        tables.append(table)
+        arrays.append(numpy.array([models[station].amplitudes_cos for station in names],dtype=numpy.float64).reshape(len(names),K))
+        arrays.append(numpy.array([models[station].amplitudes_sin for station in names],dtype=numpy.float64).reshape(len(names),K))
+        offset+=2*len(names)*K*8
+    _write_container(file,_BUNDLE_MAGIC,{"version":MODEL_FORMAT_VERSION,"tables":tables,"stations":stations},arrays)
+    logger.info(f"Bundle {file} saved with {len(stations)} models in {len(tables)} tables")
+
+class ModelBundle:
+    """
+    This class gives access to models of a bundle file (see save_bundle). Opening reads the header only: amplitudes are memory mapped, so only pages of stations used are read.
+
+    :param file: The bundle file.
+    :type file: Path
+    :param stations: Stations of bundle.
+    :type stations: list[str]
+    :param index: Table and row of amplitudes of each station.
+    :type index: dict[str,list[int]]
+    :param tables: Harmonic table and amplitudes matrices (stations×harmonics, memory mapped) of cosinus and sinus of each group of stations.
+    :type tables: list[tuple(HarmonicTable,numpy.ndarray,numpy.ndarray)]
+    """
+
+    def __init__(self,file:Path):
+        """
+        Opens a bundle.
+
+        :param file: The bundle file.
+        :type file: Path
+        """
+        self.file=Path(file)
+        with open(self.file,"rb") as f:
+            header,start=_read_header(f,_BUNDLE_MAGIC)
+        self.index=header["stations"]
+        self.stations=list(self.index)
+        if self.file.stat().st_size>start:
+            data=numpy.memmap(self.file,dtype="<f8",mode="r",offset=start)
+        else:
+            data=numpy.empty(0,dtype="<f8")
+        self.tables=[]
+        for table in header["tables"]:
+            harmonics,epoch=_harmonics_from_header(table)
+            K=len(harmonics)
+            count=table["stations"]
+            first=table["offset"]//8
+            amplitudes_cos=data[first:first+count*K].reshape(count,K)
+            amplitudes_sin=data[first+count*K:first+2*count*K].reshape(count,K)
+            if amplitudes_sin.shape!=(count,K):
+                raise ModelFileException(f"{self.file} is truncated")
+            self.tables.append((harmonic_table(harmonics,epoch),amplitudes_cos,amplitudes_sin))
+
+    def __len__(self):
+        return len(self.stations)
+
+    def __contains__(self,station:str):
+        return station in self.index
+
+    def __getitem__(self,station:str) -> CompactModel:
+        """
+        Gives the model of a station (reads its amplitudes only).
+
+        :param station: Station.
+        :type station: str
+        :return: The model of station.
+        :rtype: CompactModel
+        """
+        table_index,row=self.index[station]
+        table,amplitudes_cos,amplitudes_sin=self.tables[table_index]
+        return CompactModel(table,amplitudes_cos[row],amplitudes_sin[row])
+
+CACHE_STEP=1/6
+"Default interval (h) between heights of a tile of PredictionCache (10mn)."
+CACHE_TILE=24.0
+"Default duration (h) of a tile of PredictionCache (a day)."
+CACHE_TILES=4096
+"Default maximum number of tiles kept by PredictionCache."
+GRID_TOLERANCE=1e-6
+"Tolerance (fraction of step) for a time to be considered on the grid of PredictionCache."
+
+def fingerprint(model:Model|CompactModel) -> str:
+    """
+    Identifies a model by its harmonics, epoch and amplitudes: models predicting same heights have same fingerprint.
+    It is computed at each call, as a Model may be modified.
+
+    :param model: The model.
+    :type model: Model or CompactModel
+    :return: Hexadecimal digest.
+    :rtype: str
+    """
+    digest=hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([[list(h.n) for h in model.harmonics],model.epoch.isoformat()]).encode())
+    digest.update(numpy.asarray(model.amplitudes_cos,dtype=numpy.float64).tobytes())
+    digest.update(numpy.asarray(model.amplitudes_sin,dtype=numpy.float64).tobytes())
+    return digest.hexdigest()
+
+class PredictionCache:
+    """
+    This class keeps heights predicted by models on tiles of a regular grid (ex: a day every 10mn), so that repeated queries of same stations and windows are array slices.
+    Tiles are identified by fingerprint of model and index of tile (tile k starts at k*tile hours from H.T0), computed with Model.predict_grid, and evicted least recently used first.
+
+    Heights at times off the grid are computed by the model, or interpolated linearly in cached tiles when allowed.
+    Error of interpolation is below step²/8 * Ʃ|amplitude|*w² (w: speed in rad/h), ex: a few mm for real tides with 10mn steps.
+
+    :param step: Interval (h) between heights of a tile.
+    :type step: float
+    :param tile: Duration (h) of a tile, a multiple of step.
+    :type tile: float
+    :param points: Number of intervals of a tile (tiles hold points+1 heights, last one being the first of next tile).
+    :type points: int
+    :param max_tiles: Maximum number of tiles kept.
+    :type max_tiles: int
+    :param hits: Number of tiles found in cache.
+    :type hits: int
+    :param misses: Number of tiles computed.
+    :type misses: int
+    """
+
+    def __init__(self,step:float=CACHE_STEP,tile:float=CACHE_TILE,max_tiles:int=CACHE_TILES):
+        """
+        Constructor of an empty cache.
+
+        :param step: Interval (h) between heights of a tile.
+        :type step: float
+        :param tile: Duration (h) of a tile, a multiple of step.
+        :type tile: float
+        :param max_tiles: Maximum number of tiles kept.
+        :type max_tiles: int
+        """
+        self.step=float(step)
+        self.tile=float(tile)
+        self.points=round(self.tile/self.step)
+        if self.points<1 or abs(self.points*self.step-self.tile)>GRID_TOLERANCE*self.step:
+            raise ValueError(f"Tile duration {tile} is not a multiple of step {step}")
+        self.max_tiles=max_tiles
+        self.hits=0
+        self.misses=0
+        self._tiles=OrderedDict() # (fingerprint, tile index) -> heights
+
+    def __len__(self):
+        return len(self._tiles)
+
+    def get_tile(self,model:Model|CompactModel,index:int,key:str=None) -> numpy.ndarray:
+        """
+        Gives heights of a tile, computed at first call.
+
+        :param model: Model predicting heights.
+        :type model: Model or CompactModel
+        :param index: Index of tile.
+        :type index: int
+        :param key: Fingerprint of model, if already known.
+        :type key: str
+        :return: Heights at index*tile+i*step, i from 0 to points (read-only).
+        :rtype: numpy.ndarray
+        """
+        key=(fingerprint(model) if key is None else key,index)
+        heights=self._tiles.get(key)
+        if heights is not None:
+            self._tiles.move_to_end(key)
+            self.hits+=1
+            return heights
+        self.misses+=1
+        heights=model.predict_grid(index*self.tile,self.step,self.points+1)
+        heights.flags.writeable=False
+        self._tiles[key]=heights
+        if len(self._tiles)>self.max_tiles:
+            self._tiles.popitem(last=False)
+        return heights
+
+    def window(self,model:Model|CompactModel,t_start,t_end) -> tuple[numpy.ndarray,numpy.ndarray]:
+        """
+        Gives heights at points of the grid in a window of time. A window within a tile is a slice of the tile (no copy).
+
+        :param model: Model predicting heights.
+        :type model: Model or CompactModel
+        :param t_start: Start of window (included).
+        :type t_start: datetime or float (hours from H.T0)
+        :param t_end: End of window (excluded).
+        :type t_end: datetime or float (hours from H.T0)
+        :return: Times (hours from H.T0) and heights of points of grid in window.
+        :rtype: tuple(numpy.ndarray,numpy.ndarray)
+        """
+        first=math.ceil(datas.as_hour(t_start)/self.step-GRID_TOLERANCE)
+        last=max(first,math.ceil(datas.as_hour(t_end)/self.step-GRID_TOLERANCE))
+        key=fingerprint(model)
+        parts=[]
+        for index in range(first//self.points,(last-1)//self.points+1):
+            heights=self.get_tile(model,index,key)
+            parts.append(heights[max(first-index*self.points,0):min(last-index*self.points,self.points)])
+        if len(parts)==1:
+            heights=parts[0]
+        else:
+            heights=numpy.concatenate(parts) if parts else numpy.empty(0)
+        return numpy.arange(first,last)*self.step,heights
+
+    def heights(self,model:Model|CompactModel,hours,interpolate:bool=False) -> numpy.ndarray:
+        """
+        Gives heights at any times. Times on the grid are read from tiles. Other times are interpolated linearly in tiles if interpolate, otherwise computed by the model (not cached).
+
+        :param model: Model predicting heights.
+        :type model: Model or CompactModel
+        :param hours: Times as hours elapsed from H.T0.
+        :type hours: numpy.ndarray[float64]
+        :param interpolate: Interpolate heights off the grid.
+        :type interpolate: bool
+        :return: Heights, same order as hours.
+        :rtype: numpy.ndarray
+        """
+        hours=numpy.asarray(hours,dtype=numpy.float64)
+        position=hours/self.step
+        nearest=numpy.round(position)
+        on_grid=numpy.abs(position-nearest)<GRID_TOLERANCE
+        lower=numpy.where(on_grid,nearest,numpy.floor(position)).astype(numpy.int64)
+        fraction=numpy.where(on_grid,0.0,position-lower)
+        cached=numpy.ones(len(hours),dtype=bool) if interpolate else on_grid
+        tiles=lower//self.points
+        heights=numpy.empty(len(hours))
+        key=fingerprint(model)
+        for index in numpy.unique(tiles[cached]).tolist():
+            select=cached & (tiles==index)
+            tile=self.get_tile(model,index,key)
+            i=lower[select]-index*self.points
+            heights[select]=tile[i]*(1-fraction[select])+tile[i+1]*fraction[select]
+        if not interpolate and not numpy.all(on_grid):
+            heights[~on_grid]=model.predict(hours[~on_grid])
+        return heights
@@ -0,0 +1,152 @@
+# coding: utf-8
+"""
+This module contains the ingest-to-fit pipeline: models of all stations of a directory are computed from their REFMAR files, file by file.
+
+Stages are asyncio tasks connected by bounded queues:
+- discovery of files of each station,
+- parsing of files by workers of an executor,
+- accumulation of Fourier sums (fit), then of model errors (second reading of files, from cache).
+
+Parsing of a file overlaps accumulation of former ones. At most queue_size+workers parsed files are held in memory, whatever the size of archive.
+Datas of each file are fitted as they come: files overlapping each other are not deduplicated (see datas.merge to read a station at once).
+"""
+
+import conf_logging
+import logging
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import datas
+from models import Model
+from models import Model_N10
+from models import StreamingModelError
+from compute import FourierSums
+
+logger=logging.getLogger(__name__)
+
+QUEUE_SIZE=4
+"Default number of parsed files waiting for accumulation."
+
+_END=None
+"Marker of end of a queue."
+
+def discover(directory:Path,pattern:str="*.txt") -> dict[str,list[Path]]:
+    """
+    Finds REFMAR files of a directory, grouped by station. Station of a file is the beginning of its name up to first '_' (ex: 111_1991.txt is a file of station 111).
+
+    :param directory: Directory of REFMAR files.
+    :type directory: Path
+    :param pattern: Pattern of names of REFMAR files.
+    :type pattern: str
+    :return: Files of each station, sorted by name.
+    :rtype: dict[str,list[Path]]
+    """
+    stations={}
+    for file in sorted(Path(directory).glob(pattern)):
+        if file.is_file():
+            stations.setdefault(file.name.split("_")[0],[]).append(file)
+    return stations
+
+async def _produce(stations:dict[str,list[Path]],files:asyncio.Queue,workers:int):
+    """
+    Puts files of all stations in queue of files, then one end marker per parsing worker.
+    """
+    for station,station_files in stations.items():
+        for file in station_files:
+            await files.put((station,file))
+    for _ in range(workers):
+        await files.put(_END)
+
+async def _parse(files:asyncio.Queue,parsed:asyncio.Queue,executor,tzinfo,cache_dir,qualities):
+    """
+    Parses files of queue of files in executor, and puts series read in queue of parsed files.
+    """
+    loop=asyncio.get_running_loop()
+    while True:
+        item=await files.get()
+        if item is _END:
+            await parsed.put(_END)
+            return
+        station,file=item
+        series=await loop.run_in_executor(executor,datas.read_file,file,tzinfo,cache_dir,None,None,None,qualities)
+        await parsed.put((station,series))
+
+async def _consume(parsed:asyncio.Queue,workers:int,accumulators:dict,executor):
+    """
+    Adds series of queue of parsed files to accumulator of their station, until all parsing workers are ended.
+    """
+    loop=asyncio.get_running_loop()
+    ended=0
+    while ended<workers:
+        item=await parsed.get()
+        if item is _END:
+            ended+=1
+            continue
+        station,series=item
+        await loop.run_in_executor(executor,accumulators[station].add,series)
+
+async def _run_stage(stations:dict[str,list[Path]],accumulators:dict,tzinfo,cache_dir,qualities,workers:int,queue_size:int):
+    """
+    Runs discovery, parsing and accumulation of all files of stations.
+    """
+    files=asyncio.Queue(maxsize=queue_size)
+    parsed=asyncio.Queue(maxsize=queue_size)
+    parse_executor=ProcessPoolExecutor(max_workers=workers) if workers>1 else ThreadPoolExecutor(max_workers=1)
+    # A single thread accumulates, so that accumulators are never updated concurrently.
+    math_executor=ThreadPoolExecutor(max_workers=1)
+    try:
+        await asyncio.gather(_produce(stations,files,workers),
+                             *[_parse(files,parsed,parse_executor,tzinfo,cache_dir,qualities) for _ in range(workers)],
+                             _consume(parsed,workers,accumulators,math_executor))
+    finally:
+        parse_executor.shutdown()
+        math_executor.shutdown()
+
+async def run(directory:Path,model_class=Model_N10,tzinfo="UTC",cache_dir:Path=None,qualities=(datas.FLAG_VALIDATED,),workers:int=1,queue_size:int=QUEUE_SIZE) -> dict[str,tuple[Model,StreamingModelError]]:
+    """
+    Computes a model of each station of a directory with Fourier transformation (see compute.fourier_transform), and its error.
+    Files are read twice: once to fit models, once to measure errors (from the cache of parsed files).
+
+    :param directory: Directory of REFMAR files.
+    :type directory: Path
+    :param model_class: Class of models to compute (ex: Model_N10).
+    :type model_class: type
+    :param tzinfo: Time zone of the times in files.
+    :type tzinfo: str
+    :param cache_dir: Directory of cache of parsed files. Default datas.CACHE_DIR, False: no cache.
+    :type cache_dir: Path
+    :param qualities: Accepted quality flags. Default: validated datas only. None: all datas.
+    :type qualities: list[int]
+    :param workers: Number of files parsed concurrently (processes when more than 1).
+    :type workers: int
+    :param queue_size: Number of items waiting in each queue.
+    :type queue_size: int
+    :return: Model and error of each station.
+    :rtype: dict[str,tuple(Model,StreamingModelError)]
+    """
+    if cache_dir is None:
+        cache_dir=datas.CACHE_DIR
+    elif cache_dir is False:
+        cache_dir=None
+    stations=discover(directory)
+    models={station:model_class() for station in stations}
+    sums={station:FourierSums(model) for station,model in models.items()}
+    await _run_stage(stations,sums,tzinfo,cache_dir,qualities,workers,queue_size)
+    for station,model in models.items():
+        sums[station].apply(model)
+        logger.info(f"Station {station}: model computed with {sums[station].N} datas")
+    errors={station:StreamingModelError(model) for station,model in models.items()}
+    await _run_stage(stations,errors,tzinfo,cache_dir,qualities,workers,queue_size)
+    return {station:(models[station],errors[station]) for station in stations}
+
+def ingest(directory:Path,**kwargs) -> dict[str,tuple[Model,StreamingModelError]]:
+    """
+    Runs the pipeline in a new event loop (see run for parameters).
+
+    :param directory: Directory of REFMAR files.
+    :type directory: Path
+    :return: Model and error of each station.
+    :rtype: dict[str,tuple(Model,StreamingModelError)]
+    """
+    return asyncio.run(run(directory,**kwargs))
@@ -0,0 +1,134 @@
+# coding: utf-8
+"""
+This module contains the registry of models of many stations, predicting heights of all stations at once.
+
+Models of stations are held over the union of their harmonics: amplitudes are matrices stations×harmonics (0 where a station has no such harmonic).
+For each chunk of times, cos and sin of each harmonic are computed once for all stations, then heights of all stations are one matrix product.
+"""
+
+import conf_logging
+import logging
+import numpy
+from models import Model
+from models import CompactModel
+from models import ModelBundle
+import models
+
+logger=logging.getLogger(__name__)
+
+class ModelRegistry:
+    """
+    This class holds models of many stations over a union harmonic table.
+    Harmonics with same Doodson numbers but different epochs (see harmonics.SpeedTable) are distinct columns, as their speeds differ.
+
+    :param stations: Stations of registry, in order of rows of amplitudes.
+    :type stations: list[str]
+    :param harmonics: Union of harmonics of models.
+    :type harmonics: list[Harmonic]
+    :param speeds: Rotation speeds of harmonics (°/h), at epoch of their models.
+    :type speeds: numpy.ndarray[float64]
+    :param amplitudes_cos: Cosinus amplitudes (stations×harmonics).
+    :type amplitudes_cos: numpy.ndarray[float64]
+    :param amplitudes_sin: Sinus amplitudes (stations×harmonics).
+    :type amplitudes_sin: numpy.ndarray[float64]
+    """
+
+    def __init__(self,station_models:dict[str,Model|CompactModel]=None):
+        """
+        Constructor of a registry of models.
+
+        :param station_models: Model of each station. None: empty registry.
+        :type station_models: dict[str,Model or CompactModel]
+        """
+        groups=[]
+        for station,model in (station_models or {}).items():
+            groups.append((model.harmonics,model.epoch,model.speeds,[station],[model.amplitudes_cos],[model.amplitudes_sin]))
+        self._build(groups)
+
+    @classmethod
+    def from_bundle(cls,bundle:ModelBundle):
+        """
+        Creates a registry of all models of a bundle, reading amplitudes table by table.
+
+        :param bundle: Opened bundle of models.
+        :type bundle: ModelBundle
+        :return: The registry.
+        :rtype: ModelRegistry
+        """
+        names=[[] for _ in bundle.tables]
+        rows=[[] for _ in bundle.tables]
+        for station in bundle.stations:
+            table_index,row=bundle.index[station]
+            names[table_index].append(station)
+            rows[table_index].append(row)
+        groups=[]
+        for (table,amplitudes_cos,amplitudes_sin),table_names,table_rows in zip(bundle.tables,names,rows):
+            groups.append((table.harmonics,table.epoch,table.speeds,table_names,amplitudes_cos[table_rows],amplitudes_sin[table_rows]))
+        registry=cls.__new__(cls)
+        registry._build(groups)
+        return registry
+
+    def _build(self,groups:list):
+        """
+        Fills union harmonic table and amplitude matrices from groups of stations sharing harmonics: (harmonics, epoch, speeds, stations, amplitudes cos, amplitudes sin).
+        """
+        columns={} # (Doodson numbers, epoch) -> column
+        self.harmonics=[]
+        speeds=[]
+        group_columns=[]
+        for harmonics,epoch,harmonic_speeds,_,_,_ in groups:
+            indexes=[]
+            for harmonic,speed in zip(harmonics,harmonic_speeds):
+                key=(tuple(harmonic.n),epoch)
+                if key not in columns:
+                    columns[key]=len(self.harmonics)
+                    self.harmonics.append(harmonic)
+                    speeds.append(speed)
+                indexes.append(columns[key])
+            group_columns.append(numpy.array(indexes,dtype=numpy.int64))
+        self.speeds=numpy.array(speeds,dtype=numpy.float64)
+        self.stations=[station for group in groups for station in group[3]]
+        self._index={station:row for row,station in enumerate(self.stations)}
+        self.amplitudes_cos=numpy.zeros((len(self.stations),len(self.harmonics)))
+        self.amplitudes_sin=numpy.zeros((len(self.stations),len(self.harmonics)))
+        first=0
+        for (_,_,_,stations,amplitudes_cos,amplitudes_sin),indexes in zip(groups,group_columns):
+            rows=numpy.arange(first,first+len(stations))[:,None]
+            self.amplitudes_cos[rows,indexes]=amplitudes_cos
+            self.amplitudes_sin[rows,indexes]=amplitudes_sin
+            first+=len(stations)
+        logger.debug(f"Registry of {len(self.stations)} stations over {len(self.harmonics)} harmonics")
+
+    def __len__(self):
+        return len(self.stations)
+
+    def __contains__(self,station:str):
+        return station in self._index
+
+    def predict(self,hours,stations:list[str]=None,chunk_size:int=models.CHUNK_SIZE) -> numpy.ndarray:
+        """
+        Computes heights of stations for many times at once (see Model.predict, same values).
+        Only harmonics used by stations asked are computed, once for all stations.
+
+        :param hours: Times as hours elapsed from H.T0.
+        :type hours: numpy.ndarray[float64]
+        :param stations: Stations to predict. None: all stations of registry.
+        :type stations: list[str]
+        :param chunk_size: Number of times computed at once. Memory used is about chunk_size*(2*len(harmonics)+len(stations)) floats.
+        :type chunk_size: int
+        :return: Heights estimated (stations×times), rows in order of stations.
+        :rtype: numpy.ndarray
+        """
+        hours=numpy.asarray(hours,dtype=numpy.float64)
+        rows=numpy.arange(len(self.stations)) if stations is None else numpy.array([self._index[station] for station in stations],dtype=numpy.int64)
+        amplitudes_cos=self.amplitudes_cos[rows]
+        amplitudes_sin=self.amplitudes_sin[rows]
+        used=numpy.flatnonzero(numpy.any(amplitudes_cos!=0,axis=0) | numpy.any(amplitudes_sin!=0,axis=0))
+        amplitudes_cos=amplitudes_cos[:,used]
+        amplitudes_sin=amplitudes_sin[:,used]
+        speeds=self.speeds[used]
+        heights=numpy.empty((len(rows),len(hours)))
+        for start in range(0,len(hours),chunk_size):
+            angles=numpy.radians(numpy.outer(speeds,hours[start:start+chunk_size]))
+            heights[:,start:start+chunk_size]=amplitudes_cos@numpy.cos(angles)+amplitudes_sin@numpy.sin(angles)
+        return heights
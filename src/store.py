@@ -0,0 +1,219 @@
+# coding: utf-8
+"""
+This module contains the station store: all datas of a station kept on disk in binary columns, sorted by time and memory mapped.
+
+Files of a store directory:
+- hours.f8: times as hours elapsed from H.T0 (float64), sorted.
+- heights.f8: tide's heights (float64), same order as hours.
+- flags.u1: quality flags (uint8), same order as hours.
+- days.i8: index of first row of each day (int64), from first day of store, plus total number of rows.
+- store.json: metadata (version, first day, number of rows, high-water mark of each source file).
+
+store.json is written last: columns may hold more rows than recorded (append in progress), only recorded rows are used.
+"""
+
+import conf_logging
+import logging
+import json
+import math
+import os
+import numpy
+from pathlib import Path
+from datas import TideSeries
+import datas
+
+logger=logging.getLogger(__name__)
+
+STORE_VERSION=2
+"Version of store's layout."
+
+class StoreException(Exception):
+    pass
+
+def _load_column(file:Path,dtype) -> numpy.ndarray:
+    """
+    Memory maps a binary column. Empty files cannot be mapped, an empty array is given instead.
+    """
+    if file.stat().st_size==0:
+        return numpy.empty(0,dtype=dtype)
+    return numpy.memmap(file,dtype=dtype,mode='r')
+
+def _replace(file:Path,content:bytes):
+    """
+    Writes a file in a temporary file then renames it, so the file is replaced at once.
+    """
+    tmp=file.with_name(f"{file.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(content)
+    os.replace(tmp,file)
+
+class StationStore:
+    """
+    This class gives access to datas of a station store. Datas are not loaded in memory: columns are memory mapped, so only pages touched by queries are read.
+
+    :param path: Directory of the store.
+    :type path: Path
+    :param hours: Times as hours elapsed from H.T0 (memory mapped).
+    :type hours: numpy.ndarray[float64]
+    :param heights: Tide's heights (memory mapped).
+    :type heights: numpy.ndarray[float64]
+    :param flags: Quality flags (memory mapped).
+    :type flags: numpy.ndarray[uint8]
+    :param days: Index of first row of each day from first_day (memory mapped).
+    :type days: numpy.ndarray[int64]
+    :param first_day: First day of the store as number of days elapsed from H.T0.
+    :type first_day: int
+    :param sources: High-water mark of each source file appended: offset (bytes read), size and modification time.
+    :type sources: dict[str,dict]
+    """
+
+    def __init__(self,path:Path):
+        """
+        Opens an existing store.
+
+        :param path: Directory of the store.
+        :type path: Path
+        """
+        self.path=Path(path)
+        meta_file=self.path / "store.json"
+        if not meta_file.is_file():
+            raise StoreException(f"No store in {self.path}")
+        meta=json.loads(meta_file.read_text())
+        if meta["version"]!=STORE_VERSION:
+            raise StoreException(f"Store version {meta['version']} not supported (expected {STORE_VERSION})")
+        self.first_day=meta["first_day"]
+        self.sources=meta.get("sources",{})
+        rows=meta["rows"]
+        self.hours=_load_column(self.path / "hours.f8",numpy.float64)[:rows]
+        self.heights=_load_column(self.path / "heights.f8",numpy.float64)[:rows]
+        self.flags=_load_column(self.path / "flags.u1",numpy.uint8)[:rows]
+        self.days=_load_column(self.path / "days.i8",numpy.int64)
+        if len(self.hours)!=rows or len(self.heights)!=rows or len(self.flags)!=rows:
+            raise StoreException(f"Store {self.path} is being written, columns do not match {rows} rows")
+
+    @classmethod
+    def create(cls,path:Path,series:TideSeries,sources:dict=None):
+        """
+        Creates (or overwrites) a store from a series.
+
+        :param path: Directory of the store.
+        :type path: Path
+        :param series: Datas of the station.
+        :type series: TideSeries
+        :param sources: High-water marks of source files of datas (see append).
+        :type sources: dict[str,dict]
+        :return: The store opened.
+        :rtype: StationStore
+        """
+        path=Path(path)
+        path.mkdir(parents=True,exist_ok=True)
+        series=series.sort()
+        hours=series.hours
+        first_day=int(math.floor(hours[0]/24)) if len(hours)>0 else 0
+        last_day=int(math.floor(hours[-1]/24)) if len(hours)>0 else -1
+        days=numpy.searchsorted(hours,numpy.arange(first_day,last_day+2)*24.0,side='left').astype(numpy.int64)
+        # Files are written aside then renamed: a store opened elsewhere keeps mapping the former files.
+        _replace(path / "hours.f8",numpy.ascontiguousarray(hours,dtype=numpy.float64).tobytes())
+        _replace(path / "heights.f8",numpy.ascontiguousarray(series.heights,dtype=numpy.float64).tobytes())
+        _replace(path / "flags.u1",numpy.ascontiguousarray(series.flags,dtype=numpy.uint8).tobytes())
+        _replace(path / "days.i8",days.tobytes())
+        _replace(path / "store.json",json.dumps({"version":STORE_VERSION,"first_day":first_day,"rows":len(hours),"sources":sources or {}}).encode())
+        logger.info(f"Store {path} created with {len(hours)} datas")
+        return cls(path)
+
+    def append(self,files:list[Path],tzinfo="UTC"):
+        """
+        Appends new datas of source files: only files not yet appended, or bytes added at the end of files already appended, are parsed.
+        The high-water mark of each file is recorded in store.json, in the same write as the new number of rows.
+        Datas following the last data of the store are appended to columns, otherwise (ex: a file of a former year) the store is rewritten in time order. Datas of same time are replaced by the latest ones.
+
+        :param files: REFMAR files of the station (all quality flags are kept).
+        :type files: list[Path]
+        :param tzinfo: Time zone of the times in files.
+        :type tzinfo: str
+        :return: The store opened with appended datas.
+        :rtype: StationStore
+        """
+        sources=dict(self.sources)
+        series_list=[]
+        for file in files:
+            name=str(Path(file).resolve())
+            stat=os.stat(file)
+            mark=sources.get(name)
+            if mark is not None and mark["size"]==stat.st_size and mark["mtime_ns"]==stat.st_mtime_ns:
+                continue
+            offset=0
+            if mark is not None:
+                if stat.st_size<mark["offset"] or datas.is_compressed(file):
+                    raise StoreException(f"Source {file} was rewritten, store {self.path} must be created again")
+                offset=mark["offset"]
+            if datas.is_compressed(file):
+                series,offset=datas.read_file(file,tzinfo),stat.st_size
+            else:
+                series,offset=datas.read_tail(file,offset,tzinfo)
+            series_list.append(series)
+            sources[name]={"offset":offset,"size":stat.st_size,"mtime_ns":stat.st_mtime_ns}
+        new=datas.merge(series_list,duplicates="latest")
+        if len(new)>0 and len(self.hours)>0 and new.hours[0]<=self.hours[-1]:
+            logger.info(f"Store {self.path}: datas before end of store, store is rewritten")
+            return StationStore.create(self.path,datas.merge([self.series(),new],duplicates="latest"),sources)
+        rows=len(self.hours)
+        if rows==0:
+            return StationStore.create(self.path,new,sources)
+        first_day=self.first_day
+        last_day=first_day+len(self.days)-2
+        new_last_day=int(math.floor(new.hours[-1]/24)) if len(new)>0 else last_day
+        days=numpy.concatenate((self.days[:last_day-first_day+1],rows+numpy.searchsorted(new.hours,numpy.arange(last_day+1,new_last_day+2)*24.0,side='left'))).astype(numpy.int64)
+        # Rows beyond recorded ones (interrupted append) are dropped before appending.
+        for name,column,dtype in [("hours.f8",new.hours,numpy.float64),("heights.f8",new.heights,numpy.float64),("flags.u1",new.flags,numpy.uint8)]:
+            with open(self.path / name,'r+b') as f:
+                f.truncate(rows*numpy.dtype(dtype).itemsize)
+                f.seek(0,os.SEEK_END)
+                f.write(numpy.ascontiguousarray(column,dtype=dtype).tobytes())
+        _replace(self.path / "days.i8",days.tobytes())
+        _replace(self.path / "store.json",json.dumps({"version":STORE_VERSION,"first_day":first_day,"rows":rows+len(new),"sources":sources}).encode())
+        logger.info(f"Store {self.path}: {len(new)} datas appended")
+        return StationStore(self.path)
+
+    def __len__(self):
+        return len(self.hours)
+
+    def _row(self,hour:float) -> int:
+        """
+        Finds the first row whose time is not before hour: day index gives the rows of the day, then binary search is done among them only.
+        """
+        if len(self.days)==0:
+            return 0
+        day=math.floor(hour/24)-self.first_day
+        if day<0:
+            return 0
+        if day>=len(self.days)-1:
+            return int(self.days[-1])
+        lo=int(self.days[day])
+        hi=int(self.days[day+1])
+        return lo+int(numpy.searchsorted(self.hours[lo:hi],hour,side='left'))
+
+    def window(self,t_start,t_end,qualities=None) -> TideSeries:
+        """
+        Gives datas of the store from t_start (included) to t_end (excluded). The series returned is a view on memory mapped columns (no copy), unless some datas are rejected by qualities.
+
+        :param t_start: Start of window.
+        :type t_start: datetime or float (hours from H.T0)
+        :param t_end: End of window.
+        :type t_end: datetime or float (hours from H.T0)
+        :param qualities: Accepted quality flags (ex: (3,) for validated datas). None: all datas.
+        :type qualities: list[int]
+        :return: Datas of the window.
+        :rtype: TideSeries
+        """
+        lo=self._row(datas.as_hour(t_start))
+        hi=max(lo,self._row(datas.as_hour(t_end)))
+        return TideSeries(self.hours[lo:hi],self.heights[lo:hi],{"store":self.path},ordered=True,flags=self.flags[lo:hi]).select(qualities)
+
+    def series(self) -> TideSeries:
+        """
+        Gives all datas of the store as a series (view on memory mapped columns).
+
+        :return: All datas of the store.
+        :rtype: TideSeries
+        """
+        return TideSeries(self.hours,self.heights,{"store":self.path},ordered=True,flags=self.flags)
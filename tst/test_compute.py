@@ -15,7 +15,10 @@ import compute
 import datas
 from pathlib import Path
 import random
+import math
+import numpy
 from models import ModelError
+from models import CompactModel
 import matplotlib.pyplot as plt
 import copy
 from progress.bar import Bar
@@ -24,12 +27,13 @@ logger=logging.getLogger(__name__)
 
 ROOT_DIR=Path(__file__).parents[1]
 REFMAR_DIR=ROOT_DIR / "data" / "REFMAR"
+CACHE_DIR=ROOT_DIR / "data" / "cache"
 
 class TestCompute(unittest.TestCase):
     @classmethod
     def setUpClass(self):
         files=[f for f in REFMAR_DIR.glob("111_*.txt")]
-        self.data_list=datas.reader(files)
+        self.data_list=datas.reader(files,cache_dir=CACHE_DIR)
 
 
     def test_fourier_transform_N3_c100(self):
@@ -61,6 +65,42 @@ class TestCompute(unittest.TestCase):
             self.assertAlmostEqual(model_test.amplitudes_cos[i],model.amplitudes_cos[i],delta=0.01)
             self.assertAlmostEqual(model_test.amplitudes_sin[i],model.amplitudes_sin[i],delta=0.01)
 
+    def test_fourier_transform_empty(self):
+        with self.assertRaises(ValueError):
+            compute.fourier_transform(Model_N3(),[])
+
+    def test_fourier_transform_hours(self):
+        t0=datetime(2000,1,1,tzinfo=timezone.utc)
+        data_test=[Data(t0+timedelta(minutes=15*i),math.cos(i/10)) for i in range(5000)]
+        model=Model_N3()
+        error=compute.fourier_transform(model,data_test)
+        model_hours=Model_N3()
+        hours=numpy.array([datas.get_hour(d.t) for d in data_test])
+        error_hours=compute.fourier_transform(model_hours,(hours,[d.height for d in data_test]))
+        self.assertEqual(model_hours,model)
+        self.assertEqual(error_hours.mean,error.mean)
+
+    def test_tune_harmonic_synthetic(self):
+        t0=datetime(2020,1,1,tzinfo=timezone.utc)
+        hours=datas.get_hours([t0+timedelta(minutes=30*i) for i in range(24*2*60)])
+        reference=Model_N3()
+        reference.amplitudes_cos=[0.5,2.0,0.7,0.4]
+        reference.amplitudes_sin=[0.0,1.0,-0.2,0.1]
+        series=datas.TideSeries(hours,reference.predict(hours)+numpy.sin(hours/7)*0.05)
+        model=Model_N3()
+        compute.fourier_transform(model,series)
+        for tune in [compute.tune_harmonic_grid,compute.tune_harmonic_amp,compute.tune_harmonic_ang]:
+            model_best,err_best=tune(model,1,0.1,4,series)
+            self.assertNotIsInstance(model_best,CompactModel)
+            self.assertEqual(model_best.amplitudes_cos[2],model.amplitudes_cos[2])
+            model_again,err_again=tune(model_best.compact(),1,0.1,4,series)
+            self.assertIsInstance(model_again,CompactModel)
+            self.assertLessEqual(max(err_again.max,-err_again.min),max(err_best.max,-err_best.min))
+            expected=ModelError(model_best,series)
+            self.assertAlmostEqual(err_best.max,expected.max,delta=1e-9)
+            self.assertAlmostEqual(err_best.min,expected.min,delta=1e-9)
+            self.assertLessEqual(max(err_best.max,-err_best.min),max(ModelError(model,series).max,-ModelError(model,series).min)+1e-9)
+
     def test_fourier_transform_N3_c010(self):
         model=Model_N3()
         model.amplitudes_cos[0]=0.0 # M0
@@ -281,11 +321,11 @@ class TestCompute(unittest.TestCase):
             r_m=random.randrange(0,60,10)
             t=t0+timedelta(days=r_d,hours=r_h,minutes=r_m)
             height_est=model.get_height(t)
-            for d in self.data_list:
-                if d.t==t:                    
-                    height_ref=d.height
-                    logger.info(f"{t}: {height_est:0.3f} / {height_ref:0.3f} (delta={height_est-height_ref:0.3f})")
-#                    self.assertLess(height_est-height_ref,1.0)
+            d=self.data_list.at(t)
+            if d is not None:
+                height_ref=d.height
+                logger.info(f"{t}: {height_est:0.3f} / {height_ref:0.3f} (delta={height_est-height_ref:0.3f})")
+#                self.assertLess(height_est-height_ref,1.0)
 
     def test_fourier_transform_N10_spot111(self):
         model=Model_N10()
@@ -299,15 +339,15 @@ class TestCompute(unittest.TestCase):
             r_m=random.randrange(0,60,10)
             t=t0+timedelta(days=r_d,hours=r_h,minutes=r_m)
             height_est=model.get_height(t)
-            for d in self.data_list:
-                if d.t==t:                    
-                    height_ref=d.height
-                    logger.info(f"{t}: {height_est:0.3f} / {height_ref:0.3f} (delta={height_est-height_ref:0.3f})")
-#                    self.assertLess(height_est-height_ref,1.0)
+            d=self.data_list.at(t)
+            if d is not None:
+                height_ref=d.height
+                logger.info(f"{t}: {height_est:0.3f} / {height_ref:0.3f} (delta={height_est-height_ref:0.3f})")
+#                self.assertLess(height_est-height_ref,1.0)
                     
         t_start=datetime(2025,3,1,hour=0,minute=0,second=0,tzinfo=timezone.utc)
         t_end=datetime(2025,3,5,hour=0,minute=0,second=0,tzinfo=timezone.utc)
-        data_ref=[d for d in self.data_list if d.t>=t_start and d.t<t_end]
+        data_ref=self.data_list.slice(t_start,t_end)
         data_mod=[]
         delta_list=[]
         for d in data_ref:
@@ -335,15 +375,15 @@ class TestCompute(unittest.TestCase):
             r_m=random.randrange(0,60,10)
             t=t0+timedelta(days=r_d,hours=r_h,minutes=r_m)
             height_est=model.get_height(t)
-            for d in self.data_list:
-                if d.t==t:                    
-                    height_ref=d.height
-                    logger.info(f"{t}: {height_est:0.3f} / {height_ref:0.3f} (delta={height_est-height_ref:0.3f})")
-#                    self.assertLess(height_est-height_ref,1.0)
+            d=self.data_list.at(t)
+            if d is not None:
+                height_ref=d.height
+                logger.info(f"{t}: {height_est:0.3f} / {height_ref:0.3f} (delta={height_est-height_ref:0.3f})")
+#                self.assertLess(height_est-height_ref,1.0)
                     
         t_start=datetime(2025,3,1,hour=0,minute=0,second=0,tzinfo=timezone.utc)
         t_end=datetime(2025,3,5,hour=0,minute=0,second=0,tzinfo=timezone.utc)
-        data_ref=[d for d in self.data_list if d.t>=t_start and d.t<t_end]
+        data_ref=self.data_list.slice(t_start,t_end)
         data_mod=[]
         delta_list=[]
         for d in data_ref:
@@ -410,7 +450,7 @@ class TestCompute(unittest.TestCase):
         # We do tuning on a restricted set of data
         t_start=datetime(2025,3,1,hour=0,minute=0,second=0,tzinfo=timezone.utc)
         t_end=datetime(2025,3,5,hour=0,minute=0,second=0,tzinfo=timezone.utc)
-        data_ref=[d for d in self.data_list if d.t>=t_start and d.t<t_end]
+        data_ref=self.data_list.slice(t_start,t_end)
 
         # data_mod is reference model's data (initial model before tuning) on the restricted period of work.
         data_mod=[]
@@ -469,7 +509,7 @@ class TestCompute(unittest.TestCase):
         # We do tuning on a restricted set of data
         t_start=datetime(2025,3,1,hour=0,minute=0,second=0,tzinfo=timezone.utc)
         t_end=datetime(2025,3,5,hour=0,minute=0,second=0,tzinfo=timezone.utc)
-        data_ref=[d for d in self.data_list if d.t>=t_start and d.t<t_end]
+        data_ref=self.data_list.slice(t_start,t_end)
 
         # data_mod is reference model's data (initial model before tuning) on the restricted period of work.
         data_mod=[]
@@ -528,7 +568,7 @@ class TestCompute(unittest.TestCase):
         # We do tuning on a restricted set of data
         t_start=datetime(2025,3,1,hour=0,minute=0,second=0,tzinfo=timezone.utc)
         t_end=datetime(2025,3,5,hour=0,minute=0,second=0,tzinfo=timezone.utc)
-        data_ref=[d for d in self.data_list if d.t>=t_start and d.t<t_end]
+        data_ref=self.data_list.slice(t_start,t_end)
 
         # data_mod is reference model's data (initial model before tuning) on the restricted period of work.
         data_mod=[]
@@ -586,7 +626,7 @@ class TestCompute(unittest.TestCase):
         # Restricted set of data
         t_start=datetime(2024,1,1,hour=0,minute=0,second=0,tzinfo=timezone.utc)
         t_end=datetime(2024,2,1,hour=0,minute=0,second=0,tzinfo=timezone.utc)
-        data_list_limited=[d for d in self.data_list if d.t>=t_start and d.t<t_end]
+        data_list_limited=self.data_list.slice(t_start,t_end)
 
         model_tuned=copy.copy(model)
         err=ModelError(model_tuned,data_list_limited)
@@ -655,7 +695,7 @@ class TestCompute(unittest.TestCase):
         # Restricted set of data (year 2024)
         t_start=datetime(2024,1,1,hour=0,minute=0,second=0,tzinfo=timezone.utc)
         t_end=datetime(2025,1,1,hour=0,minute=0,second=0,tzinfo=timezone.utc)
-        data_list_limited=[d for d in self.data_list if d.t>=t_start and d.t<t_end]
+        data_list_limited=self.data_list.slice(t_start,t_end)
 
         # Do a grid tuning 20% on all harmonics data set full year (2024) 
         bar = Bar("2/7 Grid year 2024:", max=len(model_tuned.harmonics))
@@ -720,7 +760,7 @@ class TestCompute(unittest.TestCase):
         # We do tuning on a restricted set of data
         t_start=datetime(2025,3,1,hour=0,minute=0,second=0,tzinfo=timezone.utc)
         t_end=datetime(2025,3,5,hour=0,minute=0,second=0,tzinfo=timezone.utc)
-        data_ref=[d for d in self.data_list if d.t>=t_start and d.t<t_end]
+        data_ref=self.data_list.slice(t_start,t_end)
         data_mod_tuned=[]
         data_mod=[]
         for d in data_ref:
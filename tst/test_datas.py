@@ -4,8 +4,19 @@ import unittest
 from datas import Data
 from datetime import datetime
 from datetime import timezone
+from datetime import timedelta
 from pathlib import Path
 import datas
+from datas import TideSeries
+import harmonics
+import tempfile
+import gzip
+import bz2
+import lzma
+import zipfile
+import os
+import numpy
+from unittest import mock
 
 logger=logging.getLogger(__name__)
 
@@ -40,4 +51,300 @@ class TestDatas(unittest.TestCase):
         self.assertIn(data3,data_list)
         self.assertIn(data4,data_list)
         self.assertIn(data5,data_list)
-        
\ No newline at end of file
+
+    def test_reader_series(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            file=Path(tmp) / "111_test.txt"
+            file.write_text("# Comment line\n01/01/2022 11:10:00;7.624;3\n01/01/2022 11:20:00;7.5;3\n")
+            series=datas.reader([file],cache_dir=False)
+        self.assertIsInstance(series,TideSeries)
+        self.assertEqual(len(series),2)
+        self.assertIn(Data(datetime(2022,1,1,hour=11,minute=10,second=0,tzinfo=timezone.utc),7.624),series)
+        self.assertNotIn(Data(datetime(2022,1,1,hour=11,minute=10,second=0,tzinfo=timezone.utc),7.5),series)
+        self.assertEqual(series[1],Data(datetime(2022,1,1,hour=11,minute=20,second=0,tzinfo=timezone.utc),7.5))
+
+    def test_series_from_list(self):
+        t0=datetime(2000,1,1,tzinfo=timezone.utc)
+        data_list=[Data(t0+timedelta(minutes=10*i),float(i)) for i in range(100)]
+        series=TideSeries.from_list(data_list)
+        self.assertEqual(len(series),100)
+        self.assertEqual(series.to_list(),data_list)
+        self.assertAlmostEqual(series.hours[0],datas.get_hour(t0),delta=0.000001)
+
+    def test_series_slice_is_view(self):
+        series=TideSeries([0.0,1.0,2.0,3.0],[1.0,2.0,3.0,4.0])
+        sub=series[1:3]
+        self.assertEqual(len(sub),2)
+        self.assertTrue(sub.hours.base is series.hours)
+        self.assertEqual(sub[0],Data(harmonics.T0+timedelta(hours=1),2.0))
+
+    def test_series_wrong_columns(self):
+        with self.assertRaises(ValueError):
+            TideSeries([0.0,1.0],[1.0])
+
+    def test_get_time(self):
+        t=datetime(2024,11,26,hour=19,minute=20,second=0,tzinfo=timezone.utc)
+        self.assertEqual(datas.get_time(datas.get_hour(t)),t)
+
+    def test_get_hours(self):
+        times=[datetime(1960,1,1,tzinfo=timezone.utc)+timedelta(seconds=12345.6*i) for i in range(-50,5000)]
+        expected=[datas.get_hour(t) for t in times]
+        self.assertEqual(datas.get_hours(times).tolist(),expected)
+        times64=numpy.array([t.replace(tzinfo=None) for t in times],dtype='datetime64[us]')
+        self.assertEqual(datas.get_hours(times64).tolist(),expected)
+        self.assertEqual(datas.get_hours_posix([t.timestamp() for t in times]).tolist(),expected)
+        self.assertEqual(datas.as_hours(times64).tolist(),expected)
+        self.assertEqual(datas.as_hours([Data(t,0.0) for t in times]).tolist(),expected)
+        hours=numpy.array(expected)
+        self.assertIs(datas.as_hours(hours),hours)
+        self.assertEqual(datas.as_series((times64,numpy.zeros(len(times)))).hours.tolist(),expected)
+
+    def test_parse(self):
+        buffer=b"# Comment\r\n01/01/2022 11:10:00;7.624;3\r\n  22/06/1991 18:42:00;7.106;3\n20/09/2006 22:00:00;8.062;3"
+        series=datas.parse(buffer)
+        self.assertEqual(len(series),3)
+        self.assertEqual(series[0],Data(datetime(2022,1,1,hour=11,minute=10,second=0,tzinfo=timezone.utc),7.624))
+        self.assertEqual(series[1],Data(datetime(1991,6,22,hour=18,minute=42,second=0,tzinfo=timezone.utc),7.106))
+        self.assertEqual(series[2],Data(datetime(2006,9,20,hour=22,minute=0,second=0,tzinfo=timezone.utc),8.062))
+
+    def test_parse_same_as_regex(self):
+        lines=[]
+        t=datetime(2023,3,20,tzinfo=timezone.utc)
+        for i in range(2000):
+            lines.append(f"{t.strftime('%d/%m/%Y %H:%M:%S')};{i/1000:.3f};3")
+            t+=timedelta(minutes=10)
+        for tzinfo in ["UTC","Europe/Paris"]:
+            series=datas.parse("\n".join(lines).encode(),tzinfo)
+            expected=[datas._parse_line(line,tzinfo) for line in lines]
+            self.assertEqual(series.hours.tolist(),[e[0] for e in expected])
+            self.assertEqual(series.heights.tolist(),[e[1] for e in expected])
+
+    def test_parse_errors(self):
+        with self.assertLogs(datas.logger,level=logging.WARNING) as cm:
+            series=datas.parse(b"01/01/2022 11:10:00;7.624;3\n01/01/2022 11:20:00;-7.624;3\n")
+        self.assertEqual(len(series),1)
+        self.assertIn("ERROR: '01/01/2022 11:20:00;-7.624;3'",cm.output[0])
+        with self.assertLogs(datas.logger,level=logging.WARNING) as cm:
+            series=datas.parse(b"31/02/2022 11:10:00;7.624;3\n01/03/2022 11:10:00;7.6.2;3\n01/03/2022 11:20:00;7.5;3\n")
+        self.assertEqual(len(series),1)
+        self.assertIn("ERROR: '31/02/2022 11:10:00;7.624;3'",cm.output[0])
+        self.assertIn("ERROR: '01/03/2022 11:10:00;7.6.2;3'",cm.output[1])
+
+    def test_reader_blocks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            file=Path(tmp) / "111_test.txt"
+            file.write_text("".join(f"01/01/2022 11:{m:02d}:00;{m}.5;3\n" for m in range(60)))
+            with open(file,'rb') as f:
+                blocks=list(datas._read_blocks(f,block_size=100))
+        self.assertGreater(len(blocks),1)
+        self.assertTrue(all(b.endswith(b"\n") for b in blocks))
+        series=datas.concatenate([datas.parse(b) for b in blocks])
+        self.assertEqual(series.heights.tolist(),[m+0.5 for m in range(60)])
+
+    def test_reader_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            file=Path(tmp) / "111_test.txt"
+            cache_dir=Path(tmp) / "cache"
+            file.write_text("01/01/2022 11:10:00;7.624;3\n01/01/2022 11:20:00;7.5;3\n")
+            series=datas.reader([file],cache_dir=cache_dir)
+            self.assertEqual(len(list(cache_dir.glob("*.npy"))),3)
+            # Second read must not parse again
+            with mock.patch("datas.parse",side_effect=AssertionError("parse called")):
+                series_cached=datas.reader([file],cache_dir=cache_dir)
+            self.assertEqual(series_cached,series)
+            # Single file from cache is not copied
+            self.assertIsInstance(series_cached.hours.base,numpy.memmap)
+            # Modified file invalidates cache
+            file.write_text("01/01/2022 11:10:00;7.624;3\n01/01/2022 11:20:00;7.5;3\n01/01/2022 11:30:00;7.4;3\n")
+            series_modified=datas.reader([file],cache_dir=cache_dir)
+            self.assertEqual(len(series_modified),3)
+            self.assertEqual(len(list(cache_dir.glob("*.npy"))),3)
+            # Entries of other time zones are kept
+            series_paris=datas.reader([file],tzinfo="Europe/Paris",cache_dir=cache_dir)
+            self.assertEqual(len(list(cache_dir.glob("*.npy"))),6)
+            with mock.patch("datas.parse",side_effect=AssertionError("parse called")):
+                self.assertEqual(datas.reader([file],cache_dir=cache_dir),series_modified)
+                self.assertEqual(datas.reader([file],tzinfo="Europe/Paris",cache_dir=cache_dir),series_paris)
+            # No cache
+            datas.reader([file],cache_dir=False)
+            self.assertEqual(len(list(cache_dir.glob("*.npy"))),6)
+            # Cache that cannot be written is not used
+            not_a_dir=Path(tmp) / "cache.txt"
+            not_a_dir.write_text("")
+            self.assertEqual(datas.reader([file],cache_dir=not_a_dir / "cache"),series_modified)
+
+    def test_reader_workers(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files=[]
+            for year in range(2020,2024):
+                file=Path(tmp) / f"111_{year}.txt"
+                file.write_text("".join(f"{d:02d}/01/{year} 00:00:00;{year-2000}.{d};3\n" for d in range(1,29)))
+                files.append(file)
+            files.reverse()
+            series=datas.reader(files,cache_dir=False)
+            series_workers=datas.reader(files,cache_dir=False,workers=2,chunksize=2)
+        self.assertEqual(series_workers,series)
+        self.assertEqual(len(series),4*28)
+        # Time order whatever files order
+        self.assertTrue(all(series.hours[1:]>series.hours[:-1]))
+
+    def test_series_lookup(self):
+        t0=datetime(2025,3,1,tzinfo=timezone.utc)
+        series=TideSeries.from_list([Data(t0+timedelta(minutes=10*i),float(i)) for i in range(1000)])
+        self.assertEqual(series.at(t0+timedelta(minutes=100)),Data(t0+timedelta(minutes=100),10.0))
+        self.assertIsNone(series.at(t0+timedelta(minutes=105)))
+        self.assertIsNone(series.at(t0-timedelta(minutes=10)))
+        self.assertEqual(series.nearest(t0+timedelta(minutes=104)).height,10.0)
+        self.assertEqual(series.nearest(t0+timedelta(minutes=106)).height,11.0)
+        self.assertEqual(series.nearest(t0-timedelta(days=10)).height,0.0)
+        self.assertEqual(series.nearest(t0+timedelta(days=100)).height,999.0)
+        with self.assertRaises(ValueError):
+            TideSeries([],[]).nearest(t0)
+
+    def test_series_slice(self):
+        t0=datetime(2025,3,1,tzinfo=timezone.utc)
+        data_list=[Data(t0+timedelta(minutes=10*i),float(i)) for i in range(1000)]
+        series=TideSeries.from_list(data_list)
+        t_start=t0+timedelta(hours=5)
+        t_end=t0+timedelta(days=4)
+        self.assertEqual(series.slice(t_start,t_end).to_list(),[d for d in data_list if d.t>=t_start and d.t<t_end])
+        self.assertEqual(len(series.slice(t_end,t_start)),0)
+
+    def test_series_sort(self):
+        series=TideSeries([3.0,1.0,2.0,1.0],[1.0,2.0,3.0,4.0])
+        self.assertFalse(series.is_sorted())
+        sorted_series=series.sort()
+        self.assertTrue(sorted_series.is_sorted())
+        self.assertEqual(sorted_series.heights.tolist(),[2.0,4.0,3.0,1.0])
+
+    def test_series_lookup_unsorted(self):
+        t0=datetime(2025,3,1,tzinfo=timezone.utc)
+        series=TideSeries.from_list([Data(t0+timedelta(minutes=10*i),float(i)) for i in range(100,0,-1)])
+        self.assertFalse(series.is_sorted())
+        with self.assertRaises(ValueError):
+            series.at(t0)
+        with self.assertRaises(ValueError):
+            series.nearest(t0)
+        with self.assertRaises(ValueError):
+            series.slice(t0,t0+timedelta(days=1))
+        self.assertEqual(series.sort().at(t0+timedelta(minutes=100)).height,10.0)
+
+    def test_reader_window_step(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            file=Path(tmp) / "111_test.txt"
+            t=datetime(2024,3,1,tzinfo=timezone.utc)
+            lines=["# Comment"]
+            for i in range(6*24*10):
+                lines.append(f"{(t+timedelta(minutes=10*i)).strftime('%d/%m/%Y %H:%M:%S')};{i/100:.2f};3")
+            file.write_text("\n".join(lines)+"\n")
+            t_start=datetime(2024,3,2,hour=5,tzinfo=timezone.utc)
+            t_end=datetime(2024,3,4,tzinfo=timezone.utc)
+            full=datas.reader([file],cache_dir=False)
+            expected=[d for d in full if d.t>=t_start and d.t<t_end and d.t.minute==0]
+            series=datas.reader([file],cache_dir=False,t_start=t_start,t_end=t_end,step=timedelta(hours=1))
+            self.assertEqual(series.to_list(),expected)
+            # Same selection from a cache entry
+            cache_dir=Path(tmp) / "cache"
+            datas.reader([file],cache_dir=cache_dir)
+            with mock.patch("datas.parse",side_effect=AssertionError("parse called")):
+                series_cached=datas.reader([file],cache_dir=cache_dir,t_start=t_start,t_end=t_end,step=1.0)
+            self.assertEqual(series_cached,series)
+
+    def test_parse_flags(self):
+        buffer=b"01/01/2022 00:00:00;1.0;3\n01/01/2022 01:00:00;2.0;1\n 01/01/2022 02:00:00;3.0;4 \n01/01/2022 03:00:00;4.0;3\n"
+        series=datas.parse(buffer)
+        self.assertEqual(series.heights.tolist(),[1.0,2.0,3.0,4.0])
+        self.assertEqual(series.flags.tolist(),[3,1,4,3])
+        series=datas.parse(buffer,qualities=(3,4))
+        self.assertEqual(series.heights.tolist(),[1.0,3.0,4.0])
+        self.assertEqual(series.flags.tolist(),[3,4,3])
+        self.assertEqual(series.select((4,)).heights.tolist(),[3.0])
+
+    def test_reader_qualities(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            file=Path(tmp) / "111_test.txt"
+            cache_dir=Path(tmp) / "cache"
+            file.write_text("01/01/2022 11:10:00;7.624;3\n01/01/2022 11:20:00;7.5;2\n01/01/2022 11:30:00;7.4;3\n")
+            self.assertEqual(datas.reader([file],cache_dir=False).heights.tolist(),[7.624,7.4])
+            self.assertEqual(datas.reader([file],cache_dir=False,qualities=None).heights.tolist(),[7.624,7.5,7.4])
+            # Cache entry holds all flags
+            self.assertEqual(datas.reader([file],cache_dir=cache_dir).heights.tolist(),[7.624,7.4])
+            with mock.patch("datas.parse",side_effect=AssertionError("parse called")):
+                series=datas.reader([file],cache_dir=cache_dir,qualities=(2,))
+            self.assertEqual(series.heights.tolist(),[7.5])
+            self.assertEqual(series.flags.tolist(),[2])
+
+    def test_reader_compressed(self):
+        lines=[f"{d:02d}/01/2022 00:00:00;{d}.5;3\n" for d in range(1,29)]
+        content="# Comment\n"+"".join(lines)
+        with tempfile.TemporaryDirectory() as tmp:
+            plain=Path(tmp) / "111_2022.txt"
+            plain.write_text(content)
+            expected=datas.reader([plain],cache_dir=False)
+            for suffix,opener in [(".gz",gzip.open),(".bz2",bz2.open),(".xz",lzma.open)]:
+                file=Path(tmp) / f"111_2022.txt{suffix}"
+                with opener(file,'wt') as f:
+                    f.write(content)
+                self.assertEqual(datas.reader([file],cache_dir=False),expected)
+                # No tail of a compressed file
+                with self.assertRaises(ValueError):
+                    datas.read_tail(file,0)
+            # Zip archive of two files
+            file=Path(tmp) / "111.zip"
+            with zipfile.ZipFile(file,'w',compression=zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr("111_2022_1.txt","".join(lines[:10]))
+                archive.writestr("111_2022_2.txt","".join(lines[10:]))
+            with mock.patch("datas.BLOCK_SIZE",64):
+                self.assertEqual(datas.reader([file],cache_dir=False),expected)
+            self.assertEqual(datas.reader([file],cache_dir=Path(tmp) / "cache"),expected)
+
+    def test_merge(self):
+        rng=numpy.random.default_rng(1)
+        series_list=[]
+        for i in range(5):
+            hours=numpy.sort(rng.integers(0,200,50)).astype(float)
+            series_list.append(TideSeries(hours,numpy.full(50,float(i)),flags=rng.integers(1,4,50)))
+        merged=datas.merge(series_list)
+        expected=datas.concatenate(series_list).sort()
+        self.assertEqual(merged.hours.tolist(),expected.hours.tolist())
+        self.assertEqual(sorted(zip(merged.hours,merged.heights,merged.flags)),sorted(zip(expected.hours,expected.heights,expected.flags)))
+        self.assertTrue(merged.is_sorted())
+        # Latest series wins
+        latest=datas.merge(series_list,duplicates="latest")
+        self.assertEqual(latest.hours.tolist(),numpy.unique(expected.hours).tolist())
+        for h,height in zip(latest.hours,latest.heights):
+            self.assertEqual(height,max(i for i,s in enumerate(series_list) if h in s.hours))
+        # Best quality wins, then latest series
+        quality=datas.merge(series_list,duplicates="quality")
+        self.assertEqual(quality.hours.tolist(),latest.hours.tolist())
+        for h,height,flag in zip(quality.hours,quality.heights,quality.flags):
+            best=max((f,i) for i,s in enumerate(series_list) for t,f in zip(s.hours,s.flags) if t==h)
+            self.assertEqual((flag,height),best)
+        # Filled and unknown datas rank below measured ones
+        validated=TideSeries([1.0,2.0,3.0],[1.0,2.0,3.0],flags=[datas.FLAG_VALIDATED,1,datas.FLAG_UNKNOWN])
+        filled=TideSeries([1.0,2.0,3.0],[-1.0,-2.0,-3.0],flags=[datas.FLAG_FILLED]*3)
+        for series_pair in [[validated,filled],[filled,validated]]:
+            quality=datas.merge(series_pair,duplicates="quality")
+            self.assertEqual(quality.heights.tolist(),[1.0,2.0,3.0])
+            self.assertEqual(quality.flags.tolist(),[datas.FLAG_VALIDATED,1,datas.FLAG_UNKNOWN])
+        unknown=TideSeries([1.0,2.0],[-1.0,-2.0],flags=[datas.FLAG_UNKNOWN]*2)
+        self.assertEqual(datas.merge([validated,unknown],duplicates="quality").heights.tolist(),[1.0,2.0,3.0])
+        with self.assertRaises(ValueError):
+            datas.merge(series_list,duplicates="first")
+
+    def test_reader_overlapping_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            file1=Path(tmp) / "111_2022.txt"
+            file2=Path(tmp) / "111_2022_again.txt"
+            file1.write_text("".join(f"{d:02d}/01/2022 00:00:00;{d}.0;3\n" for d in range(1,21)))
+            file2.write_text("".join(f"{d:02d}/01/2022 00:00:00;{d}.5;3\n" for d in range(11,29)))
+            series=datas.reader([file1,file2],cache_dir=False)
+            self.assertEqual(len(series),28)
+            self.assertEqual(series.heights.tolist(),[d+0.0 for d in range(1,11)]+[d+0.5 for d in range(11,29)])
+            self.assertEqual(len(datas.reader([file1,file2],cache_dir=False,duplicates=None)),38)
+
+    def test_parse_window_local_time(self):
+        # 01:00 in Paris (winter) is 00:00 UTC
+        buffer=b"01/01/2022 00:00:00;1.0;3\n01/01/2022 01:00:00;2.0;3\n01/01/2022 02:00:00;3.0;3\n"
+        series=datas.parse(buffer,"Europe/Paris",t_start=datetime(2022,1,1,tzinfo=timezone.utc))
+        self.assertEqual(series.heights.tolist(),[2.0,3.0])
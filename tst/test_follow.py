@@ -0,0 +1,116 @@
+import conf_logging
+import logging
+import unittest
+from datetime import datetime
+from datetime import timezone
+from pathlib import Path
+import tempfile
+import io
+import os
+import gzip
+import numpy
+import datas
+from datas import TideSeries
+import models
+from models import Model_N3
+import follow
+from follow import ResidualMonitor
+from follow import Follower
+
+logger=logging.getLogger(__name__)
+
+class TestFollow(unittest.TestCase):
+    def setUp(self):
+        self.model=Model_N3()
+        self.model.amplitudes_cos=[4.0,2.0,0.5,0.3]
+        self.model.amplitudes_sin=[0.0,1.0,-0.3,0.1]
+        rng=numpy.random.default_rng(0)
+        self.hours=datas.get_hour(datetime(2025,1,1,tzinfo=timezone.utc))+numpy.arange(6*24*5)/6
+        self.residuals=numpy.round(rng.normal(0,0.2,len(self.hours)),3)
+        self.heights=self.model.get_heights(TideSeries(self.hours,self.hours))+self.residuals
+
+    def lines(self,start,end):
+        return "".join(f"{datas.get_time(h).strftime('%d/%m/%Y %H:%M:%S')};{z:.3f};1\n" for h,z in zip(self.hours[start:end],self.heights[start:end])).encode()
+
+    def test_monitor(self):
+        monitor=ResidualMonitor(self.model,window=6.0)
+        self.assertTrue(numpy.isnan(monitor.mean))
+        alerts=[]
+        monitor.on_threshold(0.5,lambda hour,height,residual: alerts.append(hour))
+        for start in range(0,len(self.hours),37):
+            monitor.add(TideSeries(self.hours[start:start+37],self.heights[start:start+37]))
+            last=min(start+37,len(self.hours))
+            inside=self.hours[:last]>self.hours[last-1]-6.0
+            residuals=(self.heights[:last]-self.model.get_heights(TideSeries(self.hours[:last],self.hours[:last])))[inside]
+            self.assertEqual(monitor.N,len(residuals))
+            self.assertAlmostEqual(monitor.mean,numpy.mean(residuals))
+            self.assertEqual(monitor.max,numpy.max(residuals))
+            self.assertEqual(monitor.min,numpy.min(residuals))
+            p90=numpy.percentile(numpy.absolute(residuals),90)
+            self.assertGreaterEqual(monitor.percentile(90),p90-1e-9)
+            self.assertLessEqual(monitor.percentile(90),numpy.percentile(numpy.absolute(residuals),90,method='higher')+models.ERROR_BIN)
+        self.assertEqual(alerts,self.hours[numpy.absolute(self.residuals)>0.5+1e-9].tolist())
+        self.assertIn("p99",str(monitor))
+        # Residuals spread over many blocks of histogram
+        monitor=ResidualMonitor(self.model,window=1000.0)
+        residuals=numpy.round(numpy.random.default_rng(1).uniform(-25.0,25.0,len(self.hours)),3)
+        monitor.add(TideSeries(self.hours,self.model.get_heights(TideSeries(self.hours,self.hours))+residuals))
+        bins=numpy.sort(numpy.minimum(numpy.round(numpy.absolute(residuals)/models.ERROR_BIN),int(follow.MAX_RESIDUAL/models.ERROR_BIN)+1))
+        for perc in [0,1,50,90,99,100]:
+            rank=int(numpy.ceil(perc/100*(len(bins)-1)))
+            self.assertAlmostEqual(monitor.percentile(perc),bins[rank]*models.ERROR_BIN,delta=models.ERROR_BIN)
+
+    def test_feed(self):
+        monitor=ResidualMonitor(self.model)
+        follower=Follower(monitor)
+        buffer=self.lines(0,100)
+        self.assertEqual(follower.feed(buffer[:50]),1)
+        self.assertEqual(follower.feed(buffer[50:]),99)
+        self.assertEqual(monitor.N,100)
+        self.assertEqual(Follower(monitor,qualities=(3,)).feed(self.lines(100,200)),0)
+
+    def test_poll(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            file=Path(tmp) / "111_2025.txt"
+            file.write_bytes(self.lines(0,100))
+            monitor=ResidualMonitor(self.model)
+            follower=Follower(monitor)
+            self.assertEqual(follower.poll(file),100)
+            self.assertEqual(follower.poll(file),0)
+            with open(file,'ab') as f:
+                f.write(self.lines(100,150)+b"01/01/20")
+            self.assertEqual(follower.poll(file),50)
+            self.assertEqual(monitor.last[0],self.hours[149])
+            # Rotated file
+            file.write_bytes(self.lines(150,160))
+            self.assertEqual(follower.poll(file),10)
+            self.assertEqual(follower.offset,os.stat(file).st_size)
+            # Compressed file is not read again at each poll
+            file=Path(tmp) / "111_2025.txt.gz"
+            with gzip.open(file,'wb') as f:
+                f.write(self.lines(0,100))
+            with self.assertRaises(ValueError):
+                follower.poll(file)
+            with self.assertRaises(ValueError):
+                follow.follow(file,ResidualMonitor(self.model),stop=lambda: True)
+            self.assertEqual(monitor.last[0],self.hours[159])
+
+    def test_follow(self):
+        monitor=ResidualMonitor(self.model,window=1.0)
+        follower=follow.follow(io.BytesIO(self.lines(0,300)),monitor)
+        self.assertEqual(monitor.N,6)
+        self.assertEqual(monitor.last[0],self.hours[299])
+        with tempfile.TemporaryDirectory() as tmp:
+            file=Path(tmp) / "111_2025.txt"
+            file.write_bytes(self.lines(0,100))
+            polls=[]
+            def stop():
+                if len(polls)==1:
+                    with open(file,'ab') as f:
+                        f.write(self.lines(100,110))
+                polls.append(1)
+                return len(polls)>3
+            monitor=ResidualMonitor(self.model)
+            follower=follow.follow(file,monitor,interval=0.01,stop=stop)
+            # Only appended datas
+            self.assertEqual(monitor.N,10)
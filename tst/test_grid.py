@@ -0,0 +1,108 @@
+import conf_logging
+import logging
+import unittest
+from datetime import datetime
+from datetime import timezone
+from datetime import timedelta
+import numpy
+import datas
+from datas import TideSeries
+import grid
+import harmonics
+from models import Model
+from grid import RegularSeries
+
+logger=logging.getLogger(__name__)
+
+class TestGrid(unittest.TestCase):
+    def setUp(self):
+        # 1998: hourly datas, 1999: 10mn datas with a 1 day outage
+        t0=datetime(1998,1,1,tzinfo=timezone.utc)
+        t1=datetime(1999,1,1,tzinfo=timezone.utc)
+        t2=datetime(2000,1,1,tzinfo=timezone.utc)
+        hours=[datas.get_hour(t0+timedelta(hours=i)) for i in range(int((t1-t0)/timedelta(hours=1)))]
+        outage=(datetime(1999,6,1,tzinfo=timezone.utc),datetime(1999,6,2,tzinfo=timezone.utc))
+        for i in range(int((t2-t1)/timedelta(minutes=10))):
+            t=t1+timedelta(minutes=10*i)
+            if not outage[0]<=t<outage[1]:
+                hours.append(datas.get_hour(t))
+        hours=numpy.array(hours)
+        self.series=TideSeries(hours,numpy.sin(hours),flags=numpy.full(len(hours),3))
+        self.outage=outage
+
+    def test_to_grid_hourly(self):
+        regular=grid.to_grid(self.series,timedelta(hours=1))
+        self.assertEqual(len(regular),(365+365)*24)
+        self.assertEqual(numpy.count_nonzero(~regular.mask),24)
+        self.assertTrue(numpy.all(numpy.isnan(regular.heights[~regular.mask])))
+        series=regular.to_series()
+        expected=self.series.select((3,))
+        keep=numpy.round(expected.hours*3600).astype(numpy.int64)%3600==0
+        self.assertEqual(series.hours.tolist(),expected.hours[keep].tolist())
+        self.assertEqual(series.heights.tolist(),expected.heights[keep].tolist())
+        self.assertTrue(numpy.all(series.flags==3))
+        report=regular.gaps()
+        self.assertEqual(report.count,1)
+        self.assertEqual(report.longest,24.0)
+        self.assertEqual(datas.get_time(report.starts[0]),self.outage[0])
+        self.assertEqual(report.coverage[1998],1.0)
+        self.assertAlmostEqual(report.coverage[1999],1-1/365)
+
+    def test_to_grid_10mn(self):
+        regular=grid.to_grid(self.series,1/6,t_start=datetime(1998,12,31,tzinfo=timezone.utc),t_end=datetime(1999,1,2,tzinfo=timezone.utc))
+        self.assertEqual(len(regular),2*24*6)
+        self.assertEqual(datas.get_time(regular.hours[0]),datetime(1998,12,31,tzinfo=timezone.utc))
+        report=regular.gaps()
+        # 1998 is hourly: 5 points missing each hour
+        self.assertEqual(report.count,24)
+        self.assertAlmostEqual(report.longest,5/6)
+        self.assertAlmostEqual(report.coverage[1998],1/6)
+        self.assertEqual(report.coverage[1999],1.0)
+
+    def test_to_grid_empty(self):
+        regular=grid.to_grid(TideSeries([],[]),1.0)
+        self.assertEqual(len(regular),0)
+        self.assertEqual(regular.gaps().count,0)
+        self.assertEqual(regular.gaps().coverage,{})
+        regular=grid.to_grid(TideSeries([],[]),1.0,t_start=0.0,t_end=10.0)
+        self.assertEqual(len(regular),10)
+        self.assertEqual(regular.gaps().longest,10.0)
+        with self.assertRaises(ValueError):
+            grid.to_grid(self.series,0.0)
+
+    def test_regular_wrong_columns(self):
+        with self.assertRaises(ValueError):
+            RegularSeries(0,3600,[1.0,2.0],[True])
+
+    def test_fill(self):
+        model=Model([harmonics.M0,harmonics.M2,harmonics.S2])
+        model.amplitudes_cos=[0.1,2.0,0.5]
+        model.amplitudes_sin=[0.0,1.0,-0.3]
+        start=round(datas.get_hour(datetime(2020,1,1,tzinfo=timezone.utc)))*3600
+        regular=RegularSeries(start,600,numpy.zeros(6*24*10),numpy.ones(6*24*10,dtype=bool))
+        predicted=model.get_heights(TideSeries(regular.hours,regular.heights))
+        # Observations: model + 0.3 before long gap, + 0.5 after, short gap of 2 points, gap at end
+        heights=predicted+numpy.where(numpy.arange(len(regular))<500,0.3,0.5)
+        mask=numpy.ones(len(regular),dtype=bool)
+        mask[100:400]=False
+        mask[499:501]=False
+        mask[-10:]=False
+        heights[~mask]=numpy.nan
+        regular=RegularSeries(regular.start,regular.interval,heights,mask,numpy.full(len(mask),3))
+        filled=grid.fill(regular,model,blend=timedelta(hours=6))
+        self.assertTrue(numpy.all(filled.mask))
+        self.assertEqual(filled.flags[~mask].tolist(),[datas.FLAG_FILLED]*numpy.count_nonzero(~mask))
+        self.assertTrue(numpy.all(filled.flags[mask]==3))
+        self.assertEqual(filled.heights[mask].tolist(),heights[mask].tolist())
+        # Long gap: residual fades from edges over 36 points (6h)
+        self.assertAlmostEqual(filled.heights[100]-predicted[100],0.3*(1-1/36))
+        self.assertAlmostEqual(filled.heights[399]-predicted[399],0.3*(1-1/36))
+        self.assertAlmostEqual(filled.heights[250]-predicted[250],0.0)
+        # Short gap: linear interpolation of residuals
+        self.assertAlmostEqual(filled.heights[499]-predicted[499],0.3*2/3+0.5/3)
+        self.assertAlmostEqual(filled.heights[500]-predicted[500],0.3/3+0.5*2/3)
+        # Gap at end: only residual before
+        self.assertAlmostEqual(filled.heights[-10]-predicted[-10],0.5*(1-1/36))
+        self.assertAlmostEqual(filled.heights[-1]-predicted[-1],0.5*(1-10/36))
+        # Nothing to fill
+        self.assertIs(grid.fill(filled,model),filled)
@@ -5,6 +5,8 @@ import random
 import harmonics
 from harmonics import Harmonic
 from harmonics import HarmonicException
+from datetime import datetime
+from datetime import timezone
 
 logger=logging.getLogger(__name__)
 
@@ -265,5 +267,20 @@ class TestHarmonics(unittest.TestCase):
         # (2): Source [Theory of tides - Wikipedia](https://en.wikipedia.org/wiki/Theory_of_tides)
         # (3): Source [Lecture 1: Introduction to ocean tides, Myrl Hendershott](https://www.whoi.edu/cms/files/lecture01_21351.pdf)
 
+    def test_speed_table(self):
+        table=harmonics.speed_table()
+        self.assertIs(table,harmonics.speed_table(harmonics.DEFAULT_EPOCH))
+        self.assertEqual(table.rates,(harmonics.dtau,harmonics.ds,harmonics.dh,harmonics.dp,harmonics.dN,harmonics.dp1))
+        self.assertEqual(harmonics.M2.get_speed(),table.get_speed(harmonics.M2.n))
+        epoch=datetime(1990,1,1,tzinfo=timezone.utc)
+        old=harmonics.speed_table(epoch)
+        self.assertIs(old,harmonics.speed_table(datetime(1990,1,1,tzinfo=timezone.utc)))
+        self.assertEqual(old.ds,harmonics.SpeedTable(epoch).ds)
+        self.assertEqual(harmonics.M2.get_speed(epoch),old.get_speed(harmonics.M2.n))
+        self.assertAlmostEqual(harmonics.M2.get_speed(epoch),harmonics.M2.get_speed(),delta=1e-6)
+        if harmonics.APPLY_TIME_CORRECTION:
+            self.assertNotEqual(old.ds,table.ds)
+        self.assertEqual(table.get_speeds([harmonics.M0,harmonics.S2]),[0.0,harmonics.S2.get_speed()])
+
     def test_str(self):
         logger.info(harmonics.M3)
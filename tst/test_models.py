@@ -18,6 +18,9 @@ from pathlib import Path
 import copy
 import datas
 import harmonics
+import numpy
+import tempfile
+import pickle
 
 logger=logging.getLogger(__name__)
 
@@ -198,6 +201,142 @@ class TestModels(unittest.TestCase):
                 self.assertGreaterEqual(h,0)
                 self.assertLessEqual(h,2)
 
+    def test_get_heights(self):
+        m=Model_N10()
+        for i in range(len(m.harmonics)):
+            m.amplitudes_cos[i]=random.uniform(-1.0,1.0)
+            m.amplitudes_sin[i]=random.uniform(-1.0,1.0)
+        t0=datetime(2020,1,1,tzinfo=timezone.utc)
+        data_list=[datas.Data(t0+timedelta(minutes=10*i),0.0) for i in range(1000)]
+        heights=m.get_heights(data_list)
+        for i in range(len(data_list)):
+            self.assertAlmostEqual(heights[i],m.get_height(data_list[i].t),delta=0.000001)
+        # Hours already computed
+        hours=models.get_hours([d.t for d in data_list])
+        self.assertEqual(m.get_heights(hours).tolist(),heights.tolist())
+        self.assertEqual(m.get_height(hours[10]),m.get_height(data_list[10].t))
+
+    def test_predict(self):
+        m=Model_N32()
+        for i in range(len(m.harmonics)):
+            m.amplitudes_cos[i]=random.uniform(-1.0,1.0)
+            m.amplitudes_sin[i]=random.uniform(-1.0,1.0)
+        t0=datetime(2025,1,1,tzinfo=timezone.utc)
+        times=[t0+timedelta(minutes=10*i) for i in range(0,6*24*366,7)]
+        hours=models.get_hours(times)
+        heights=m.predict(hours,chunk_size=1000)
+        for i in range(len(times)):
+            self.assertAlmostEqual(heights[i],m.get_height(times[i]),delta=1e-9)
+        self.assertEqual(m.predict(hours).tolist(),heights.tolist())
+        self.assertEqual(len(m.predict(numpy.zeros(0))),0)
+
+    def test_predict_doodson(self):
+        m=Model_N32()
+        for i in range(len(m.harmonics)):
+            m.amplitudes_cos[i]=random.uniform(-1.0,1.0)
+            m.amplitudes_sin[i]=random.uniform(-1.0,1.0)
+        t0=datetime(2025,1,1,tzinfo=timezone.utc)
+        times=[t0+timedelta(minutes=10*i) for i in range(0,6*24*366,7)]
+        hours=models.get_hours(times)
+        heights=m.predict_doodson(hours,chunk_size=1000)
+        for i in range(len(times)):
+            self.assertAlmostEqual(heights[i],m.get_height(times[i]),delta=1e-8)
+        self.assertEqual(m.predict_doodson(hours).tolist(),heights.tolist())
+        self.assertEqual(len(m.predict_doodson(numpy.zeros(0))),0)
+
+    def test_predict_float32(self):
+        m=Model_N32()
+        for i in range(len(m.harmonics)):
+            m.amplitudes_cos[i]=random.uniform(-1.0,1.0)
+            m.amplitudes_sin[i]=random.uniform(-1.0,1.0)
+        hours=models.get_hour(datetime(2025,1,1,tzinfo=timezone.utc))+numpy.arange(0,24*366,1/6)
+        heights=m.predict_float32(hours)
+        self.assertEqual(heights.dtype,numpy.float32)
+        self.assertLess(numpy.abs(heights-m.predict(hours)).max(),0.001)
+        # Unordered times
+        shuffled=numpy.random.default_rng(1).permutation(len(hours))
+        self.assertLess(numpy.abs(m.predict_float32(hours[shuffled],chunk_size=100)-m.predict(hours[shuffled])).max(),0.005)
+        self.assertEqual(len(m.predict_float32(numpy.zeros(0))),0)
+
+    def test_predict_grid(self):
+        m=Model_N32()
+        for i in range(len(m.harmonics)):
+            m.amplitudes_cos[i]=random.uniform(-1.0,1.0)
+            m.amplitudes_sin[i]=random.uniform(-1.0,1.0)
+        t0=datetime(2025,1,1,tzinfo=timezone.utc)
+        heights=m.predict_grid(t0,timedelta(minutes=10),10000,anchor=1000)
+        for i in range(0,10000,37):
+            self.assertAlmostEqual(heights[i],m.get_height(t0+timedelta(minutes=10*i)),delta=1e-8)
+        self.assertEqual(m.predict_grid(models.get_hour(t0),1/6,10000,anchor=1000).tolist(),heights.tolist())
+        self.assertEqual(len(m.predict_grid(t0,1.0,0)),0)
+
+    def test_epoch(self):
+        m=Model_N10()
+        self.assertEqual(m.epoch,H.DEFAULT_EPOCH)
+        self.assertEqual(m.speeds.tolist(),[h.get_speed() for h in m.harmonics])
+        epoch=datetime(1990,1,1,tzinfo=timezone.utc)
+        m_1990=Model_N10(epoch=epoch)
+        self.assertEqual(m_1990.speeds.tolist(),[h.get_speed(epoch) for h in m_1990.harmonics])
+        self.assertNotEqual(m_1990,m)
+        self.assertEqual(copy.copy(m_1990).epoch,epoch)
+        self.assertEqual(m_1990.compact().epoch,epoch)
+        self.assertEqual(m_1990.compact().to_model(),m_1990)
+        # Models pickled without epoch get default one
+        m.amplitudes_cos[1]=1.0
+        state=dict(m.__dict__)
+        del state["epoch"]
+        del state["speeds"]
+        restored=Model.__new__(Model)
+        restored.__setstate__(state)
+        self.assertEqual(restored,m)
+        self.assertEqual(restored.speeds.tolist(),m.speeds.tolist())
+
+    def test_compact_model(self):
+        m=Model_N32()
+        for i in range(len(m.harmonics)):
+            m.amplitudes_cos[i]=random.uniform(-1.0,1.0)
+            m.amplitudes_sin[i]=random.uniform(-1.0,1.0)
+        compact=m.compact()
+        self.assertIs(compact.table,Model_N32().compact().table)
+        self.assertEqual(compact,m)
+        self.assertEqual(compact.to_model(),m)
+        hours=models.get_hour(datetime(2025,1,1,tzinfo=timezone.utc))+numpy.arange(0,1000,0.5)
+        self.assertEqual(compact.predict(hours).tolist(),m.predict(hours).tolist())
+        with self.assertRaises(ValueError):
+            compact.amplitudes_cos[0]=1.0
+        with self.assertRaises(AttributeError):
+            compact.name="M2"
+        variant=compact.with_amplitude(1,0.5,-0.5)
+        self.assertIs(variant.table,compact.table)
+        self.assertEqual((variant.amplitudes_cos[1],variant.amplitudes_sin[1]),(0.5,-0.5))
+        self.assertEqual(compact.amplitudes_cos[1],m.amplitudes_cos[1])
+        m.amplitudes_cos[1]=0.5
+        m.amplitudes_sin[1]=-0.5
+        self.assertEqual(variant,m)
+        with self.assertRaises(ValueError):
+            models.CompactModel(compact.table,[0.0],[0.0])
+
+    def test_streaming_model_error(self):
+        m=Model_N10()
+        for i in range(len(m.harmonics)):
+            m.amplitudes_cos[i]=random.uniform(-1.0,1.0)
+            m.amplitudes_sin[i]=random.uniform(-1.0,1.0)
+        t0=datetime(2020,1,1,tzinfo=timezone.utc)
+        data_list=[datas.Data(t0+timedelta(minutes=10*i),random.uniform(-3.0,3.0)) for i in range(3000)]
+        expected=models.ModelError(m,data_list)
+        error=models.StreamingModelError(m)
+        for start in range(0,len(data_list),700):
+            error.add(data_list[start:start+700])
+        self.assertEqual(error.N,len(data_list))
+        for attribute in ["mean","min","max","var","abs"]:
+            self.assertAlmostEqual(getattr(error,attribute),getattr(expected,attribute),places=9)
+        abs_delta_list=abs(m.get_heights(data_list)-datas.as_series(data_list).heights)
+        for (perc,value),(expected_perc,expected_value) in zip(error.p,expected.p):
+            self.assertEqual(perc,expected_perc)
+            self.assertGreaterEqual(value,expected_value)
+            self.assertLessEqual(value,numpy.percentile(abs_delta_list,perc,method='higher')+models.ERROR_BIN)
+        self.assertIn("percentiles",str(error))
+
     def test_get_height_naive(self):
         m=Model_N10()
         t=datetime.now()
@@ -234,6 +373,104 @@ class TestModels(unittest.TestCase):
             self.assertEqual(model.amplitudes_cos[i],model_ref.amplitudes_cos[i])
             self.assertEqual(model.amplitudes_sin[i],model_ref.amplitudes_sin[i])
 
+    def test_save_format(self):
+        epoch=datetime(1990,1,1,tzinfo=timezone.utc)
+        model_ref=Model_N10(epoch=epoch)
+        for i in range(len(model_ref.harmonics)):
+            model_ref.amplitudes_cos[i]=random.uniform(-2.0,2.0)
+            model_ref.amplitudes_sin[i]=random.uniform(-2.0,2.0)
+        custom=Model([H.M2,H.S2])
+        custom.amplitudes_cos=[1.0,0.5]
+        with tempfile.TemporaryDirectory() as tmp:
+            file=Path(tmp) / "model.tmod"
+            models.save(model_ref,file)
+            model=models.read(file)
+            self.assertIsInstance(model,Model_N10)
+            self.assertEqual(model,model_ref)
+            self.assertEqual([h.name for h in model.harmonics],[h.name for h in model_ref.harmonics])
+            models.save(model_ref.compact(),file)
+            self.assertEqual(models.read(file),model_ref)
+            models.save(custom,file)
+            self.assertEqual(models.read(file),custom)
+            # Former pickled files are refused, and converted with read_pickle
+            with open(file,"wb") as f:
+                pickle.dump(custom,f)
+            with self.assertRaises(models.ModelFileException):
+                models.read(file)
+            self.assertEqual(models.read_pickle(file),custom)
+            self.assertEqual(list(Path(tmp).glob("*.tmp")),[])
+
+    def test_bundle(self):
+        stations={}
+        for i in range(50):
+            model=Model_N3() if i%2==0 else Model_N10(epoch=datetime(1990,1,1,tzinfo=timezone.utc))
+            for j in range(len(model.harmonics)):
+                model.amplitudes_cos[j]=random.uniform(-2.0,2.0)
+                model.amplitudes_sin[j]=random.uniform(-2.0,2.0)
+            stations[f"{i:03d}"]=model if i%3 else model.compact()
+        with tempfile.TemporaryDirectory() as tmp:
+            file=Path(tmp) / "models.tbun"
+            models.save_bundle(stations,file)
+            bundle=models.ModelBundle(file)
+            self.assertEqual(len(bundle),50)
+            self.assertEqual(bundle.stations,list(stations))
+            self.assertEqual(len(bundle.tables),2)
+            self.assertIsInstance(bundle.tables[0][1],numpy.memmap)
+            for station,model in stations.items():
+                self.assertIn(station,bundle)
+                self.assertEqual(bundle[station],model)
+            self.assertIs(bundle["000"].table,bundle["002"].table)
+            self.assertNotIn("999",bundle)
+            with self.assertRaises(KeyError):
+                bundle["999"]
+            models.save_bundle({},file)
+            self.assertEqual(len(models.ModelBundle(file)),0)
+            with self.assertRaises(models.ModelFileException):
+                models.read(file)
+
+    def test_prediction_cache(self):
+        m=Model_N3()
+        for i in range(len(m.harmonics)):
+            m.amplitudes_cos[i]=random.uniform(-1.0,1.0)
+            m.amplitudes_sin[i]=random.uniform(-1.0,1.0)
+        cache=models.PredictionCache(max_tiles=2)
+        day=models.get_hour(datetime(2025,1,1,tzinfo=timezone.utc))
+        hours,heights=cache.window(m,day+1,day+3)
+        self.assertEqual(len(hours),12)
+        self.assertAlmostEqual(hours[0],day+1,delta=1e-9)
+        self.assertLess(numpy.abs(heights-m.predict(hours)).max(),1e-8)
+        self.assertEqual((cache.hits,cache.misses),(0,1))
+        # Repeated query is a slice of the cached tile
+        hours_again,heights_again=cache.window(m,datetime(2025,1,1,1,tzinfo=timezone.utc),datetime(2025,1,1,3,tzinfo=timezone.utc))
+        self.assertTrue(numpy.shares_memory(heights_again,cache.get_tile(m,int(day//24))))
+        self.assertEqual(heights_again.tolist(),heights.tolist())
+        self.assertEqual((cache.hits,cache.misses),(2,1))
+        # Window over 3 tiles, least recently used tiles evicted
+        hours,heights=cache.window(m,day-1,day+25)
+        self.assertEqual(len(hours),26*6)
+        self.assertLess(numpy.abs(heights-m.predict(hours)).max(),1e-8)
+        self.assertEqual(len(cache),2)
+        self.assertEqual((cache.hits,cache.misses),(3,3))
+        cache.window(m,day,day+1)
+        self.assertEqual((cache.hits,cache.misses),(4,3))
+        cache.window(m,day-1,day)
+        self.assertEqual((cache.hits,cache.misses),(4,4))
+        self.assertEqual(len(cache.window(m,day,day)[1]),0)
+        # Any times
+        times=day+numpy.sort(numpy.random.default_rng(0).uniform(0,48,500))
+        times[:100]=day+numpy.arange(100)/6
+        self.assertEqual(cache.heights(m,times)[100:].tolist(),m.predict(times[100:]).tolist())
+        self.assertLess(numpy.abs(cache.heights(m,times)[:100]-m.predict(times[:100])).max(),1e-8)
+        self.assertLess(numpy.abs(cache.heights(m,times,interpolate=True)-m.predict(times)).max(),0.01)
+        # Changed model has its own tiles
+        misses=cache.misses
+        m.amplitudes_cos[1]+=0.1
+        cache.heights(m,times[:100])
+        self.assertEqual(cache.misses,misses+1)
+        self.assertEqual(models.fingerprint(m),models.fingerprint(m.compact()))
+        with self.assertRaises(ValueError):
+            models.PredictionCache(step=0.25,tile=1.1)
+
     def test_copy_model(self):
         model_1=Model_N3()
         model_2=copy.copy(model_1)
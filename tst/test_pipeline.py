@@ -0,0 +1,58 @@
+import conf_logging
+import logging
+import unittest
+from datetime import datetime
+from datetime import timezone
+from datetime import timedelta
+from pathlib import Path
+import tempfile
+import numpy
+import datas
+import compute
+import pipeline
+from models import Model_N3
+from models import ModelError
+
+logger=logging.getLogger(__name__)
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp=tempfile.TemporaryDirectory()
+        self.directory=Path(self.tmp.name)
+        model=Model_N3()
+        model.amplitudes_cos=[4.0,2.0,0.5,0.3]
+        model.amplitudes_sin=[0.0,1.0,-0.3,0.1]
+        rng=numpy.random.default_rng(0)
+        for station,shift in [("111",0.0),("222",1.0)]:
+            for year in (2020,2021):
+                t=datetime(year,1,1,tzinfo=timezone.utc)
+                hours=datas.get_hour(t)+numpy.arange(0,24*60,0.5)
+                heights=model.get_heights(datas.TideSeries(hours,hours))+shift+rng.normal(0,0.05,len(hours))
+                lines=[f"{datas.get_time(h).strftime('%d/%m/%Y %H:%M:%S')};{z:.3f};3\n" for h,z in zip(hours,heights)]
+                (self.directory / f"{station}_{year}.txt").write_text("".join(lines))
+        (self.directory / "readme.md").write_text("Not a REFMAR file")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_discover(self):
+        stations=pipeline.discover(self.directory)
+        self.assertEqual(list(stations),["111","222"])
+        self.assertEqual([f.name for f in stations["111"]],["111_2020.txt","111_2021.txt"])
+
+    def test_ingest(self):
+        for workers in (1,2):
+            results=pipeline.ingest(self.directory,model_class=Model_N3,cache_dir=self.directory / "cache",workers=workers,queue_size=1)
+            self.assertEqual(list(results),["111","222"])
+            for station,(model,error) in results.items():
+                series=datas.reader(pipeline.discover(self.directory)[station],cache_dir=False)
+                expected=Model_N3()
+                expected_error=compute.fourier_transform(expected,series)
+                for a,b in zip(model.amplitudes_cos+model.amplitudes_sin,expected.amplitudes_cos+expected.amplitudes_sin):
+                    self.assertAlmostEqual(a,b,places=9)
+                self.assertEqual(error.N,len(series))
+                self.assertAlmostEqual(error.mean,expected_error.mean,places=9)
+                self.assertAlmostEqual(error.var,expected_error.var,places=9)
+                self.assertAlmostEqual(error.min,expected_error.min,places=9)
+                self.assertAlmostEqual(error.max,expected_error.max,places=9)
+            self.assertAlmostEqual(results["222"][0].amplitudes_cos[0]-results["111"][0].amplitudes_cos[0],1.0,places=2)
@@ -0,0 +1,70 @@
+import conf_logging
+import logging
+import unittest
+from datetime import datetime
+from datetime import timezone
+from pathlib import Path
+import random
+import tempfile
+import numpy
+import harmonics as H
+import models
+from models import Model
+from models import Model_N3
+from models import Model_N10
+from models import Model_N32
+from registry import ModelRegistry
+
+logger=logging.getLogger(__name__)
+
+def random_model(model:Model) -> Model:
+    for i in range(len(model.harmonics)):
+        model.amplitudes_cos[i]=random.uniform(-1.0,1.0)
+        model.amplitudes_sin[i]=random.uniform(-1.0,1.0)
+    return model
+
+class TestRegistry(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        logging.basicConfig(encoding='utf-8',level=logging.DEBUG)
+
+    def setUp(self):
+        self.models={"111":random_model(Model_N3()),
+                     "222":random_model(Model_N32()),
+                     "333":random_model(Model_N10()).compact(),
+                     "444":random_model(Model([H.M2,H.K2])),
+                     "555":random_model(Model_N3(epoch=datetime(1990,1,1,tzinfo=timezone.utc)))}
+        self.hours=models.get_hour(datetime(2025,1,1,tzinfo=timezone.utc))+numpy.arange(0,24*30,0.25)
+
+    def test_predict(self):
+        registry=ModelRegistry(self.models)
+        self.assertEqual(len(registry),5)
+        self.assertIn("333",registry)
+        self.assertNotIn("999",registry)
+        # Union: N32 harmonics, K2, and N3 harmonics at another epoch (M0 speed is 0 at any epoch but kept apart)
+        self.assertEqual(len(registry.harmonics),len(Model_N32().harmonics)+1+4)
+        self.assertEqual(registry.amplitudes_cos.shape,(5,len(registry.harmonics)))
+        heights=registry.predict(self.hours,chunk_size=1000)
+        self.assertEqual(heights.shape,(5,len(self.hours)))
+        for row,model in enumerate(self.models.values()):
+            self.assertLess(numpy.abs(heights[row]-model.predict(self.hours)).max(),1e-9)
+        subset=registry.predict(self.hours,["444","111"])
+        self.assertEqual(subset.tolist(),heights[[3,0]].tolist())
+        self.assertEqual(registry.predict(numpy.zeros(0)).shape,(5,0))
+        with self.assertRaises(KeyError):
+            registry.predict(self.hours,["999"])
+
+    def test_from_bundle(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            file=Path(tmp) / "models.tbun"
+            models.save_bundle(self.models,file)
+            registry=ModelRegistry.from_bundle(models.ModelBundle(file))
+            expected=ModelRegistry(self.models)
+            self.assertEqual(sorted(registry.stations),sorted(self.models))
+            heights=registry.predict(self.hours,list(self.models))
+            self.assertLess(numpy.abs(heights-expected.predict(self.hours)).max(),1e-12)
+
+    def test_empty(self):
+        registry=ModelRegistry()
+        self.assertEqual(len(registry),0)
+        self.assertEqual(registry.predict(self.hours).shape,(0,len(self.hours)))
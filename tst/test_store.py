@@ -0,0 +1,160 @@
+import conf_logging
+import logging
+import unittest
+from datetime import datetime
+from datetime import timezone
+from pathlib import Path
+import tempfile
+import numpy
+import os
+import gzip
+from unittest import mock
+import datas
+from datas import TideSeries
+import store
+from store import StationStore
+from store import StoreException
+
+logger=logging.getLogger(__name__)
+
+class TestStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp=tempfile.TemporaryDirectory()
+        self.path=Path(self.tmp.name) / "111"
+        # 10 days every 10mn, starting 2025-03-01
+        h0=datas.get_hour(datetime(2025,3,1,tzinfo=timezone.utc))
+        hours=h0+numpy.arange(10*24*6)/6
+        self.series=TideSeries(hours,numpy.sin(hours))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_create_open(self):
+        StationStore.create(self.path,self.series)
+        s=StationStore(self.path)
+        self.assertEqual(len(s),len(self.series))
+        self.assertEqual(s.series(),self.series)
+
+    def test_open_missing(self):
+        with self.assertRaises(StoreException):
+            StationStore(self.path)
+
+    def test_window(self):
+        s=StationStore.create(self.path,self.series)
+        t_start=datetime(2025,3,2,hour=3,minute=5,tzinfo=timezone.utc)
+        t_end=datetime(2025,3,6,tzinfo=timezone.utc)
+        window=s.window(t_start,t_end)
+        expected=[d for d in self.series if d.t>=t_start and d.t<t_end]
+        self.assertEqual(window.to_list(),expected)
+        # Zero copy: window is a view on memory mapped column
+        self.assertIsInstance(window.hours.base,numpy.memmap)
+
+    def test_window_qualities(self):
+        flags=numpy.where(numpy.arange(len(self.series))%3==0,1,3)
+        series=TideSeries(self.series.hours,self.series.heights,flags=flags)
+        s=StationStore.create(self.path,series)
+        self.assertEqual(StationStore(self.path).series(),series)
+        t_start=datetime(2025,3,2,tzinfo=timezone.utc)
+        t_end=datetime(2025,3,3,tzinfo=timezone.utc)
+        window=s.window(t_start,t_end,qualities=(3,))
+        self.assertEqual(len(window),24*6*2/3)
+        self.assertTrue(numpy.all(window.flags==3))
+        self.assertEqual(len(s.window(t_start,t_end)),24*6)
+
+    def test_window_bounds(self):
+        s=StationStore.create(self.path,self.series)
+        self.assertEqual(len(s.window(datetime(2000,1,1,tzinfo=timezone.utc),datetime(2001,1,1,tzinfo=timezone.utc))),0)
+        self.assertEqual(len(s.window(datetime(2030,1,1,tzinfo=timezone.utc),datetime(2031,1,1,tzinfo=timezone.utc))),0)
+        self.assertEqual(len(s.window(datetime(2000,1,1,tzinfo=timezone.utc),datetime(2031,1,1,tzinfo=timezone.utc))),len(self.series))
+        self.assertEqual(len(s.window(self.series.hours[10],self.series.hours[10])),0)
+        self.assertEqual(len(s.window(self.series.hours[10],self.series.hours[11])),1)
+
+    def test_create_unsorted(self):
+        reverse=TideSeries(self.series.hours[::-1],self.series.heights[::-1])
+        s=StationStore.create(self.path,reverse)
+        self.assertEqual(s.series(),self.series)
+
+    def test_empty(self):
+        s=StationStore.create(self.path,TideSeries([],[]))
+        self.assertEqual(len(s),0)
+        self.assertEqual(len(s.window(0.0,1e9)),0)
+
+    def test_recreate_while_open(self):
+        s=StationStore.create(self.path,self.series)
+        window=s.window(self.series.hours[0],self.series.hours[100])
+        StationStore.create(self.path,self.series[:10])
+        # Former store still readable
+        self.assertEqual(window.heights.tolist(),self.series.heights[:100].tolist())
+        self.assertEqual(len(StationStore(self.path)),10)
+        self.assertEqual(list(self.path.glob("*.tmp")),[])
+
+    def write_lines(self,file,hours,mode='w'):
+        with open(file,mode) as f:
+            for h in hours:
+                f.write(f"{datas.get_time(h).strftime('%d/%m/%Y %H:%M:%S')};{h%10:.3f};3\n")
+
+    def test_append(self):
+        hours=self.series.hours
+        file1=Path(self.tmp.name) / "111_2025_1.txt"
+        file2=Path(self.tmp.name) / "111_2025_2.txt"
+        self.write_lines(file1,hours[:500])
+        s=StationStore.create(self.path,TideSeries([],[])).append([file1])
+        self.assertEqual(s.hours.tolist(),hours[:500].tolist())
+        # Tail of a growing file, last line being written is left for next append
+        with open(file1,'a') as f:
+            f.write("# Comment\n")
+        self.write_lines(file1,hours[500:800],'a')
+        with open(file1,'a') as f:
+            f.write("01/03/2025 00")
+        with mock.patch("datas.parse",wraps=datas.parse) as parse:
+            s=s.append([file1])
+        self.assertEqual(sum(len(c.args[0]) for c in parse.call_args_list),(800-500)*28+10)
+        self.assertEqual(s.hours.tolist(),hours[:800].tolist())
+        # Unchanged file is not read, new file is
+        with open(file1,'r+') as f:
+            f.truncate(os.stat(file1).st_size-len("01/03/2025 00"))
+        self.write_lines(file2,hours[800:])
+        s=StationStore(self.path).append([file1,file2])
+        self.assertEqual(s.series().hours.tolist(),hours.tolist())
+        self.assertEqual(s.window(hours[700],hours[900]).hours.tolist(),hours[700:900].tolist())
+        with mock.patch("datas.parse",side_effect=AssertionError("parse called")):
+            s=s.append([file1,file2])
+        self.assertEqual(len(s),len(hours))
+        # Former datas rewrite the store in time order
+        file0=Path(self.tmp.name) / "111_2024.txt"
+        self.write_lines(file0,hours[:10]-24*365)
+        s=s.append([file0])
+        self.assertEqual(len(s),len(hours)+10)
+        self.assertTrue(numpy.all(numpy.diff(s.hours)>=0))
+        self.assertEqual(len(s.window(hours[0],hours[-1]+1)),len(hours))
+        # Rewritten file
+        self.write_lines(file2,hours[800:810])
+        with self.assertRaises(StoreException):
+            s.append([file2])
+
+    def test_append_compressed(self):
+        hours=self.series.hours
+        file=Path(self.tmp.name) / "111_2025.txt.gz"
+        plain=Path(self.tmp.name) / "111_2025.txt"
+        self.write_lines(plain,hours[:100])
+        with open(plain,'rb') as f_in, gzip.open(file,'wb') as f_out:
+            f_out.write(f_in.read())
+        s=StationStore.create(self.path,TideSeries([],[])).append([file])
+        self.assertEqual(s.hours.tolist(),hours[:100].tolist())
+        with mock.patch("datas.parse",side_effect=AssertionError("parse called")):
+            s=s.append([file])
+        # Compressed file modified
+        os.utime(file,ns=(0,0))
+        with self.assertRaises(StoreException):
+            s.append([file])
+
+    def test_append_interrupted(self):
+        s=StationStore.create(self.path,self.series[:100])
+        with open(self.path / "hours.f8",'ab') as f:
+            f.write(numpy.zeros(5).tobytes())
+        s=StationStore(self.path)
+        self.assertEqual(len(s),100)
+        file=Path(self.tmp.name) / "111_2025.txt"
+        self.write_lines(file,self.series.hours[100:200])
+        s=s.append([file])
+        self.assertEqual(s.hours.tolist(),self.series.hours[:200].tolist())